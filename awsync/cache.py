@@ -0,0 +1,122 @@
+"""
+A TTL and LRU bounded cache for responses of read-only operations.
+Opt-in with Client.response_cache, responses are only cached for idempotent reads.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+import time
+from typing import Any, Callable, Optional, Tuple
+
+from awsync.request import Request
+
+
+@dataclass(frozen=True)
+class CacheKey:
+    "Identifies a response by the canonical request it was received for."
+    service: str
+    "The service."
+    region: str
+    "The region."
+    operation: str
+    "The API operation."
+    method: str
+    "The HTTP method."
+    host: str
+    "The host."
+    path: str
+    "The path."
+    query: Tuple[Tuple[str, str], ...]
+    "Sorted query parameters."
+    content: bytes
+    "The request body bytes."
+    access_key_id: str
+    "The access key ID, so responses are not shared between identities."
+
+    @classmethod
+    def from_request(
+        cls, operation: str, service: str, region: str, request: Request
+    ) -> "CacheKey":
+        "The cache key for an unsigned request."
+        return cls(
+            service=service,
+            region=str(region),
+            operation=operation,
+            method=str(request.method),
+            host=request.host,
+            path=request.path,
+            query=tuple(sorted((request.query or {}).items())),
+            content=request.content or b"",
+            access_key_id=request.credentials.access_key_id,
+        )
+
+
+class ResponseCache:
+    "Caches responses for ttl seconds, evicting the least recently used response beyond maxsize."
+
+    def __init__(
+        self,
+        ttl: float = 60.0,
+        maxsize: int = 1024,
+        monotonic: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl
+        "Seconds a response is cached for."
+        self.maxsize = maxsize
+        "Maximum number of cached responses."
+        self.monotonic = monotonic
+        "A zero argument callable returning a monotonic time in seconds."
+        self.hits = 0
+        "Total number of lookups which found a cached response."
+        self.misses = 0
+        "Total number of lookups which found no cached response, including expired responses."
+        self.evictions = 0
+        "Total number of responses evicted because the cache was full."
+        self._responses: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    def get(self, key: CacheKey) -> Optional[Any]:
+        "Returns the cached response for a key, or None if missing or expired."
+        entry = self._responses.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires, response = entry
+        if self.monotonic() >= expires:
+            del self._responses[key]
+            self.misses += 1
+            return None
+        self._responses.move_to_end(key)
+        self.hits += 1
+        return response
+
+    def put(self, key: CacheKey, response: Any) -> None:
+        "Cache a response for a key."
+        self._responses[key] = (self.monotonic() + self.ttl, response)
+        self._responses.move_to_end(key)
+        while len(self._responses) > self.maxsize:
+            self._responses.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(
+        self,
+        service: Optional[str] = None,
+        region: Optional[str] = None,
+        operation: Optional[str] = None,
+    ) -> int:
+        """
+        Remove cached responses matching every given filter, ie. all responses for a service in a region.
+        Removes every response if no filters are given, returns the number removed.
+        """
+        keys = [
+            key
+            for key in self._responses
+            if (service is None or key.service == service)
+            and (region is None or key.region == str(region))
+            and (operation is None or key.operation == operation)
+        ]
+        for key in keys:
+            del self._responses[key]
+        return len(keys)
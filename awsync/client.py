@@ -1,16 +1,67 @@
 "Middle level abstraction async AWS client for API requests."
 import asyncio
-from dataclasses import dataclass
+from contextlib import aclosing
+from dataclasses import dataclass, field, replace
+from functools import cached_property, partial
 import datetime
-import json
-from typing import Any, Callable, Dict, List, Optional
+import time
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
 import logging
 
-from httpx import AsyncClient
+from httpx import AsyncClient, HTTPError, Response as HttpxResponse
 
+from awsync.cache import CacheKey, ResponseCache
+from awsync.clock import ClockSkew
+from awsync.codec import JsonCodec, default_codec, stdlib_json_codec
+from awsync.credentials import CachedCredentials
+from awsync.deadline import Deadline, within
+from awsync.endpoints import Endpoint, EndpointResolver
+from awsync.errors import (  # Re-exported, raised by Client methods.
+    AwsError as AwsError,
+    ClockSkewError as ClockSkewError,
+    DeadlineExceededException as DeadlineExceededException,
+    ErrorKind,
+    MaxRetriesException as MaxRetriesException,
+    RetryBudgetExhaustedException as RetryBudgetExhaustedException,
+    StatusError as StatusError,
+    ThrottlingError as ThrottlingError,
+    TransientError as TransientError,
+)
+from awsync.eventstream import decode_stream
+from awsync.metrics import Metrics
 from awsync.models.aws import Credentials, Region
 from awsync.models.http import Method
-from awsync.request import Request, _uri_encode
+from awsync.pagination import paginate
+from awsync.pool import ConnectionPools
+from awsync.ratelimit import AdaptiveRateLimiter, AdaptiveTokenBucket
+from awsync.retry import (
+    BackoffStrategy,
+    ExponentialBackoff,
+    FullJitterBackoff,
+    RetryBudget,
+)
+from awsync.request import (
+    Body,
+    Request,
+    SigningKeyCache,
+    _uri_encode,
+    default_signing_key_cache,
+)
+from awsync.singleflight import SingleFlight
+from awsync.tracing import Phase, Span, TraceContext, Tracer, combine, span
 
 
 @dataclass(frozen=True)
@@ -18,16 +69,130 @@ class Response:
     "An API response."
     status: int
     "Status code."
-    text: str
-    "Response context as text."
+    content: bytes
+    "Response content as raw bytes."
+    headers: Mapping[str, str] = field(default_factory=dict, compare=False)
+    "Response headers, not included in equality."
+    retries: int = field(default=0, compare=False)
+    "Number of retries made before receiving the response, not included in equality."
+    codec: JsonCodec = field(default=stdlib_json_codec, compare=False, repr=False)
+    "The JSON codec used by json()."
 
+    @cached_property
+    def text(self) -> str:
+        "Response content decoded as UTF-8 text, decoded on first access."
+        return self.content.decode(errors="replace")
 
-class MaxRetriesException(Exception):
-    "Maximum number of retries exceeded."
+    @cached_property
+    def _json(self) -> Any:
+        "Response content deserialized as JSON, deserialized on first access."
+        return self.codec.loads(self.content)
 
+    def json(self) -> Any:
+        "Response content deserialized as JSON, deserialized once and cached."
+        return self._json
 
-class StatusError(Exception):
-    "API responded with a non-2XX status code."
+    @property
+    def request_id(self) -> Optional[str]:
+        "The AWS request ID header if present."
+        return _request_id(self.headers)
+
+
+def _request_id(headers: Mapping[str, str]) -> Optional[str]:
+    "The AWS request ID header if present."
+    return headers.get("x-amzn-RequestId") or headers.get("x-amz-request-id")
+
+
+async def _send_with_retry(
+    send: Callable[[Dict[str, Any]], Awaitable[HttpxResponse]],
+    logger: logging.Logger,
+    retries: int,
+    backoff: BackoffStrategy,
+    retry_budget: Optional[RetryBudget],
+    rate_limit: Optional[AdaptiveTokenBucket],
+    trace: Optional[TraceContext] = None,
+    deadline: Optional[Deadline] = None,
+    call_span: Optional[Span] = None,
+    content_length: int = 0,
+) -> Tuple[HttpxResponse, int, Optional[AwsError]]:
+    """
+    Call send with httpx request extensions until it returns a response
+    which is not a retryable (throttling, transient or server) error.
+    Only non-2XX response bodies are parsed, into a typed error which decides if it is retried.
+    If a deadline is given each attempt, including its rate limit wait, is cancelled when the deadline passes,
+    and retries fail fast instead of sleeping past the deadline.
+    If a call_span is given its retries, bytes sent (content_length per attempt) and status are updated
+    as each attempt is made, so calls which raise are recorded with the attempts they made.
+    Returns the final response, the number of retries made, and its error if it is not a 2XX response.
+    """
+
+    async def send_attempt(attempt: int) -> Tuple[HttpxResponse, Optional[AwsError]]:
+        "Send a single attempt, returns the response and its error."
+        if rate_limit is not None:
+            with span(trace, Phase.rate_limit, attempt):
+                await rate_limit.acquire()
+        with span(trace, Phase.send, attempt) as send_span:
+            client_response = await send(
+                {} if trace is None else trace.httpx_extensions(attempt)
+            )
+            send_span.status = client_response.status_code
+            send_span.request_id = _request_id(client_response.headers)
+            if call_span is not None:
+                call_span.attempt = attempt
+                call_span.bytes_sent += content_length
+                call_span.status = send_span.status
+                call_span.request_id = send_span.request_id
+            error = (
+                None
+                if 200 <= client_response.status_code < 300
+                else AwsError.from_response(
+                    client_response.status_code,
+                    client_response.content,
+                    client_response.headers,
+                )
+            )
+            throttled = send_span.throttled = (
+                error is not None and error.kind == ErrorKind.throttle
+            )
+        if rate_limit is not None:
+            rate_limit.update(throttled=throttled)
+        return client_response, error
+
+    attempt = 1
+    delay = 0.0
+    client_response, error = await within(deadline, partial(send_attempt, 0))
+
+    # Retry if remote error or throttling with backoff
+    while error is not None and error.retryable:
+        # Base case
+        if attempt > retries:
+            raise MaxRetriesException(
+                f"Maximum number of retries '{retries}' exceeded. Last error: {error}",
+                error=error,
+            )
+        if retry_budget is not None and not retry_budget.acquire():
+            raise RetryBudgetExhaustedException(
+                f"Retry budget exhausted after '{attempt - 1}' retries. "
+                f"Last error: {error}",
+                error=error,
+            )
+        delay = backoff.delay(attempt, delay)
+        if error.retry_after is not None:
+            delay = max(delay, error.retry_after)
+        if deadline is not None and delay >= deadline.remaining():
+            raise DeadlineExceededException(
+                f"Backoff of '{delay:.3f}' seconds would exceed the deadline of "
+                f"'{deadline.timeout}' seconds. Last error: {error}",
+                error=error,
+            )
+        with span(trace, Phase.backoff, attempt):
+            await asyncio.sleep(delay)
+        logger.warning(f"Attempting retry '{attempt}' of '{retries}' after {error}...")
+        client_response, error = await within(
+            deadline, partial(send_attempt, attempt), error
+        )
+        attempt += 1
+    return client_response, attempt - 1, error
 
 
 async def request_with_retry(
@@ -35,51 +200,157 @@ async def request_with_retry(
     request: Request,
     logger: logging.Logger,
     retries: int = 3,
+    backoff: BackoffStrategy = ExponentialBackoff(cap=float("inf")),
+    retry_budget: Optional[RetryBudget] = None,
+    rate_limit: Optional[AdaptiveTokenBucket] = None,
+    codec: JsonCodec = stdlib_json_codec,
+    trace: Optional[TraceContext] = None,
+    deadline: Optional[Deadline] = None,
 ) -> Response:
     """
-    Make an async HTTP request with retries and exponential backoff.
-    Will only retry if request fails due to throttling or a server error.
+    Make an async HTTP request with retries and backoff.
+    The default backoff is uncapped exponential backoff without jitter (2, 4, 8... seconds).
+    Will only retry if request fails due to throttling or a server error,
+    and if a retry_budget is provided only while the budget has tokens available.
+    If a rate_limit token bucket is provided every attempt waits for a token
+    and every response updates the bucket fill rate.
+    The Response keeps the raw bytes, codec is used if Response.json() is called.
+    If a trace context is provided each rate limit wait, attempt and backoff is traced.
+    If a deadline is provided the httpx timeouts of each attempt are capped to the time remaining,
+    and DeadlineExceededException is raised once it passes or if a backoff sleep would pass it.
     """
     logger.debug(f"Sending request to AWS API: '{request}'")
-    attempt = 1
-    client_response = await client.request(
-        method=request.method,
-        url=request.get_url(),
-        headers=request.headers,
-        params=request.query,
-        json=request.body,
-    )
+    # The same pre-serialized bytes are sent on every attempt.
+    content = request.content
 
-    # Retry if remote error or throttling with exponential backoff
-    while client_response.status_code >= 500 or (
-        client_response.status_code == 400 and "Throttling" in client_response.text
-    ):
-        # Base case
-        if attempt > retries:
-            raise MaxRetriesException(
-                f"Maximum number of retries '{retries}' exceeded. "
-                f"Response: '{client_response}'"
-            )
-        await asyncio.sleep(2**attempt)
-        logger.warn(f"Attempting retry '{attempt}' of '{retries}'...")
-        client_response = await client.request(
+    async def send(extensions: Dict[str, Any]) -> HttpxResponse:
+        "Send a single attempt."
+        if deadline is not None:
+            extensions = {
+                **extensions,
+                "timeout": deadline.httpx_timeout(client.timeout),
+            }
+        return await client.request(
             method=request.method,
             url=request.get_url(),
             headers=request.headers,
             params=request.query,
-            json=request.body,
+            content=content,
+            extensions=extensions,
         )
-        attempt += 1
 
-    response = Response(status=client_response.status_code, text=client_response.text)
-    logger.debug(f"Recieved response: '{response}'")
-    if response.status < 200 or response.status >= 300:
-        raise StatusError(
-            f"Recieved non-2XX response code from AWS API. " f"Response: '{response}'"
+    with span(trace, Phase.call) as call_span:
+        client_response, retried, error = await _send_with_retry(
+            send,
+            logger=logger,
+            retries=retries,
+            backoff=backoff,
+            retry_budget=retry_budget,
+            rate_limit=rate_limit,
+            trace=trace,
+            deadline=deadline,
+            call_span=call_span,
+            content_length=0 if trace is None else len(content or b""),
+        )
+        response = Response(
+            status=client_response.status_code,
+            content=client_response.content,
+            headers=client_response.headers,
+            retries=retried,
+            codec=codec,
         )
+        call_span.bytes_received = len(response.content)
+        if logger.isEnabledFor(logging.DEBUG):  # Avoid formatting large bodies.
+            logger.debug(f"Recieved response: '{response}'")
+        if error is not None:
+            error.response = response
+            raise error
+    if retry_budget is not None:
+        retry_budget.release(response.retries)
     return response
 
 
+async def stream_with_retry(
+    client: AsyncClient,
+    request: Request,
+    logger: logging.Logger,
+    retries: int = 3,
+    backoff: BackoffStrategy = ExponentialBackoff(cap=float("inf")),
+    retry_budget: Optional[RetryBudget] = None,
+    rate_limit: Optional[AdaptiveTokenBucket] = None,
+    trace: Optional[TraceContext] = None,
+    deadline: Optional[Deadline] = None,
+    on_headers: Optional[Callable[[Mapping[str, str]], None]] = None,
+) -> AsyncGenerator[bytes, None]:
+    """
+    Make an async streaming HTTP request with retries and backoff,
+    yielding the response body in chunks as they arrive without buffering it.
+    Retries follow request_with_retry and only happen before the first chunk is yielded.
+    If a deadline is provided it also applies to reading each chunk, time spent by the caller between chunks counts.
+    If on_headers is provided it is called with the headers of a 2XX response before the first chunk is yielded.
+    """
+    logger.debug(f"Streaming request to AWS API: '{request}'")
+    content = request.content
+
+    async def send(extensions: Dict[str, Any]) -> HttpxResponse:
+        "Send a single attempt, reading the body only for errors."
+        if deadline is not None:
+            extensions = {
+                **extensions,
+                "timeout": deadline.httpx_timeout(client.timeout),
+            }
+        http_request = client.build_request(
+            method=request.method,
+            url=request.get_url(),
+            headers=request.headers,
+            params=request.query,
+            content=content,
+            extensions=extensions,
+        )
+        client_response = await client.send(http_request, stream=True)
+        if client_response.status_code < 200 or client_response.status_code >= 300:
+            # Error bodies are small, reading them also closes the stream.
+            await client_response.aread()
+        return client_response
+
+    with span(trace, Phase.call) as call_span:
+        client_response, retried, error = await _send_with_retry(
+            send,
+            logger=logger,
+            retries=retries,
+            backoff=backoff,
+            retry_budget=retry_budget,
+            rate_limit=rate_limit,
+            trace=trace,
+            deadline=deadline,
+            call_span=call_span,
+            content_length=0 if trace is None else len(content or b""),
+        )
+        try:
+            if error is not None:
+                error.response = Response(
+                    status=client_response.status_code,
+                    content=client_response.content,
+                    headers=client_response.headers,
+                    retries=retried,
+                )
+                raise error
+            if retry_budget is not None:
+                retry_budget.release(retried)
+            if on_headers is not None:
+                on_headers(client_response.headers)
+            chunks = client_response.aiter_bytes()
+            while True:
+                try:
+                    chunk = await within(deadline, chunks.__anext__)
+                except StopAsyncIteration:
+                    break
+                call_span.bytes_received += len(chunk)
+                yield chunk
+        finally:
+            await client_response.aclose()
+
+
 def utcnow() -> datetime.datetime:
     "A zero argument callable function that returns the current datetime in UTC."
     return datetime.datetime.now(datetime.UTC)
@@ -88,130 +359,563 @@ def utcnow() -> datetime.datetime:
 @dataclass(frozen=True)
 class Client:
     "An AWS API client."
-    credentials: Credentials
-    "AWS credentials."
-    httpx_client: AsyncClient
-    "The httpx AsyncClient to use for async reqeusts."
+    credentials: Union[Credentials, CachedCredentials]
+    """
+    AWS credentials, or a credentials cache consulted per request
+    which refreshes temporary credentials in the background before they expire.
+    """
+    httpx_client: Union[AsyncClient, ConnectionPools]
+    """
+    The httpx AsyncClient to use for async reqeusts,
+    or connection pools to give each host its own httpx AsyncClient and connection pool.
+    """
     logger: logging.Logger = logging.getLogger(__name__)
     "The logger to use for logging, can be set to control log level and format."
     utcnow: Callable[[], datetime.datetime] = utcnow
     "A zero argument callable function that returns the current datetime in UTC."
+    signing_key_cache: Optional[SigningKeyCache] = default_signing_key_cache
+    "The cache of derived signing keys shared between requests, set to None to disable caching."
+    retries: int = 3
+    "Maximum number of retries per request."
+    backoff: BackoffStrategy = FullJitterBackoff()
+    "The strategy for how long to sleep between retries."
+    retry_budget: Optional[RetryBudget] = field(default_factory=RetryBudget)
+    """
+    The retry budget shared by all requests made by the client, set to None to disable.
+    Client methods return parsed results, so retries and tokens spent are surfaced
+    as the aggregate counters RetryBudget.retries, tokens_spent and rejected.
+    Use request_with_retry directly for the per-call count in Response.retries.
+    """
+    rate_limiter: Optional[AdaptiveRateLimiter] = field(
+        default_factory=AdaptiveRateLimiter
+    )
+    "The adaptive rate limiter shared by all requests made by the client, set to None to disable."
+    codec: JsonCodec = field(default_factory=default_codec)
+    "The JSON codec for request bodies and responses, defaults to the fastest installed JSON library."
+    endpoints: EndpointResolver = field(default_factory=EndpointResolver)
+    "The resolver for service endpoints, ie. to use FIPS or dual-stack endpoints or a local stand-in."
+    tracer: Optional[Tracer] = None
+    """
+    (Optional) A hook called with the timing of each phase of every request:
+    signing, rate limiting, connecting, sending each attempt, backoff and parsing.
+    """
+    response_cache: Optional[ResponseCache] = None
+    """
+    (Optional) A cache for responses of read-only operations (list_stack_resources and get_resource),
+    keyed on the request and credentials identity.
+    """
+    single_flight: Optional[SingleFlight] = field(default_factory=SingleFlight)
+    """
+    Collapses concurrent identical read-only requests (list_stack_resources and get_resource)
+    into one underlying request whose response or exception is shared, set to None to disable.
+    """
+    clock_skew: Optional[ClockSkew] = field(default_factory=ClockSkew)
+    """
+    Tracks the offset of utcnow from AWS server time from the Date header of responses and applies it when signing,
+    requests rejected because of clock skew are re-signed and retried once. Set to None to disable.
+    """
+    metrics: Optional[Metrics] = None
+    """
+    (Optional) Metrics aggregating latency histograms, retries, throttles and bytes
+    per service, operation and region, see Metrics.snapshot() and Metrics.prometheus().
+    """
+    timeout: Optional[float] = None
+    """
+    (Optional) The default deadline in seconds for each method call, overridden by the timeout argument of methods.
+    The deadline covers fetching credentials, signing, every attempt, backoff sleeps and every page.
+    """
+    monotonic: Callable[[], float] = time.monotonic
+    "A zero argument callable returning a monotonic time in seconds, used for deadlines."
 
-    async def list_stack_resources(
-        self,
-        region: Region,
-        stack_name: str,
-        next_token: Optional[str] = None,
-    ) -> List[Dict[str, Any]]:
-        "List all resources in a CloudFormation stack asynchronously."
-        query_params = {
-            "Action": "ListStackResources",
-            "Version": "2010-05-15",
-            "StackName": stack_name,
-        }
-        if next_token:
-            query_params.update({"NextToken": next_token})
+    def _deadline(self, timeout: Optional[float]) -> Optional[Deadline]:
+        "The deadline for a method call, None if neither timeout nor Client.timeout is set."
+        if timeout is None:
+            timeout = self.timeout
+        if timeout is None:
+            return None
+        return Deadline(timeout, monotonic=self.monotonic)
 
-        service = "cloudformation"
-        request = Request(
-            credentials=self.credentials,
-            method=Method.GET,
-            host=f"{service}.{region}.amazonaws.com",
-            query=query_params,
-            headers={
-                "Accept": "application/json",
-                "Content-Type": "application/x-www-form-urlencoded; charset=utf-8",
-            },
+    async def _credentials(self, deadline: Optional[Deadline] = None) -> Credentials:
+        "The credentials for a request, from the credentials cache if one is used."
+        if isinstance(self.credentials, CachedCredentials):
+            return await within(deadline, self.credentials.get)
+        return self.credentials
+
+    def _http(self, host: str) -> AsyncClient:
+        "The httpx AsyncClient for requests to a host."
+        if isinstance(self.httpx_client, ConnectionPools):
+            return self.httpx_client.client(host)
+        return self.httpx_client
+
+    def _trace(
+        self, operation: str, service: str, region: Region
+    ) -> Optional[TraceContext]:
+        "The trace context for an API call, None if tracing and metrics are disabled."
+        if self.metrics is None:
+            if self.tracer is None:
+                return None
+            tracer = self.tracer
+        elif self.tracer is None:
+            tracer = self.metrics
+        else:
+            tracer = combine(self.metrics, self.tracer)
+        return TraceContext(
+            tracer=tracer, operation=operation, service=service, region=region
         )
 
-        signed_request = request.sign(
-            utc_now=self.utcnow(), service=service, region=region
+    def _now(self) -> datetime.datetime:
+        "The current time to sign requests with, corrected for clock skew."
+        if self.clock_skew is None:
+            return self.utcnow()
+        return self.clock_skew.now(self.utcnow())
+
+    def _correct_skew(self, response: Optional[Response]) -> bool:
+        "Returns True if an error response was caused by clock skew and the skew was corrected."
+        return (
+            self.clock_skew is not None
+            and response is not None
+            and self.clock_skew.update(response.headers, self.utcnow())
         )
-        response = await request_with_retry(
-            self.httpx_client,
-            request=signed_request,
+
+    def _sign(
+        self,
+        request: Request,
+        service: str,
+        region: Region,
+        trace: Optional[TraceContext] = None,
+    ) -> Request:
+        "Sign a request with the current time, corrected for clock skew."
+        with span(trace, Phase.sign):
+            return request.sign(
+                utc_now=self._now(),
+                service=service,
+                region=region,
+                signing_key_cache=self.signing_key_cache,
+            )
+
+    def _rate_limit(
+        self, service: str, region: Region
+    ) -> Optional[AdaptiveTokenBucket]:
+        "The rate limit token bucket for a service and region."
+        if self.rate_limiter is None:
+            return None
+        return self.rate_limiter.bucket(service, region)
+
+    def _cache_key(
+        self, operation: str, service: str, region: Region, request: Request
+    ) -> Optional[CacheKey]:
+        """
+        The key identifying a read-only request for the response cache and single-flight,
+        None if both are disabled.
+        """
+        if self.response_cache is None and self.single_flight is None:
+            return None
+        return CacheKey.from_request(operation, service, region, request)
+
+    async def _send(
+        self,
+        request: Request,
+        service: str,
+        region: Region,
+        trace: Optional[TraceContext] = None,
+        cache_key: Optional[CacheKey] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> Response:
+        """
+        Sign a request and send it with retries.
+        If a cache_key is given the request is read-only: the response is cached, or returned from the cache,
+        and concurrent identical requests share one underlying call.
+        The shared underlying call is not bound by any caller's deadline,
+        each caller stops waiting for it at its own deadline.
+        """
+        if cache_key is None:
+            try:
+                response = await self._request(
+                    request, service, region, trace, deadline
+                )
+            except ClockSkewError as exc:
+                if not self._correct_skew(exc.response):
+                    raise
+                self.logger.warning(
+                    "Request rejected due to clock skew, re-signing with the corrected time..."
+                )
+                response = await self._request(
+                    request, service, region, trace, deadline
+                )
+            self._update_skew(response.headers)
+            return response
+        if self.response_cache is not None:
+            cached: Optional[Response] = self.response_cache.get(cache_key)
+            if cached is not None:
+                # A new Response, so JSON parsed by one caller is not shared with another.
+                return replace(cached)
+
+        async def send(deadline: Optional[Deadline]) -> Response:
+            "Send the request once, caching the response."
+            response = await self._send(
+                request, service, region, trace=trace, deadline=deadline
+            )
+            if self.response_cache is not None:
+                self.response_cache.put(cache_key, response)
+            return response
+
+        if self.single_flight is None:
+            response = await send(deadline)
+        else:
+            # The shared call has no deadline, each caller only stops waiting at its own,
+            # and SingleFlight cancels the call once every caller has stopped waiting.
+            response = await within(
+                deadline, partial(self.single_flight.do, cache_key, partial(send, None))
+            )
+        return replace(response)
+
+    async def _request(
+        self,
+        request: Request,
+        service: str,
+        region: Region,
+        trace: Optional[TraceContext] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> Response:
+        "Sign a request and send it with retries."
+        return await request_with_retry(
+            self._http(request.host),
+            request=self._sign(request, service=service, region=region, trace=trace),
             logger=self.logger,
+            retries=self.retries,
+            backoff=self.backoff,
+            retry_budget=self.retry_budget,
+            rate_limit=self._rate_limit(service, region),
+            codec=self.codec,
+            trace=trace,
+            deadline=deadline,
         )
 
-        json_response = json.loads(response.text)
-        result = json_response["ListStackResourcesResponse"]["ListStackResourcesResult"]
-        resources: List[Dict[str, Any]] = result["StackResourceSummaries"]
+    def _update_skew(self, headers: Mapping[str, str]) -> None:
+        "Measure clock skew from the headers of a successful response."
+        if self.clock_skew is not None:
+            self.clock_skew.update(headers, self.utcnow())
+
+    async def _stream(
+        self,
+        request: Request,
+        service: str,
+        region: Region,
+        trace: Optional[TraceContext] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Sign a request and stream the response body with retries.
+        Like _send a request rejected due to clock skew is re-signed and retried once,
+        errors are raised before the first chunk so a retry never repeats chunks.
+        """
+        for retry_skew in (True, False):
+            async with aclosing(
+                stream_with_retry(
+                    self._http(request.host),
+                    request=self._sign(
+                        request, service=service, region=region, trace=trace
+                    ),
+                    logger=self.logger,
+                    retries=self.retries,
+                    backoff=self.backoff,
+                    retry_budget=self.retry_budget,
+                    rate_limit=self._rate_limit(service, region),
+                    trace=trace,
+                    deadline=deadline,
+                    on_headers=self._update_skew,
+                )
+            ) as chunks:
+                try:
+                    async for chunk in chunks:
+                        yield chunk
+                    return
+                except ClockSkewError as exc:
+                    if not retry_skew or not self._correct_skew(exc.response):
+                        raise
+            self.logger.warning(
+                "Request rejected due to clock skew, re-signing with the corrected time..."
+            )
+
+    async def warm_up(self, regions: Iterable[Region], services: Iterable[str]) -> None:
+        """
+        Opens connections to the endpoints of services in regions ahead of traffic,
+        so the first requests do not wait for DNS resolution and TLS handshakes.
+        Connections are kept alive for the keep-alive expiry of the httpx client's connection pool.
+        Failures are logged and otherwise ignored.
+        """
+        endpoints = {
+            self.endpoints.resolve(service, region)
+            for region in regions
+            for service in services
+        }
+
+        async def connect(endpoint: Endpoint) -> None:
+            "Send an unsigned request to the endpoint, the response status is ignored."
+            try:
+                await self._http(endpoint.host).head(endpoint.get_url())
+            except HTTPError as exc:
+                self.logger.warning(
+                    f"Failed to warm up connection to '{endpoint.host}': '{exc!r}'"
+                )
+
+        await asyncio.gather(*(connect(endpoint) for endpoint in endpoints))
+
+    async def iter_stack_resources(
+        self,
+        region: Region,
+        stack_name: str,
+        next_token: Optional[str] = None,
+        prefetch: int = 0,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate over the resources in a CloudFormation stack asynchronously, page by page.
+        If prefetch is greater than 0, pages are requested ahead while the caller processes
+        the current page, up to prefetch buffered pages plus one page request in flight.
+        The timeout (defaults to Client.timeout) is a deadline for every page, starting when iteration starts.
+        """
+        service = "cloudformation"
+        deadline = self._deadline(timeout)
+        endpoint = self.endpoints.resolve(service, region)
+        trace = self._trace("ListStackResources", service, region)
+
+        async def fetch_page(
+            next_token: Optional[str],
+        ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+            "Fetch a single ListStackResources page."
+            query_params = {
+                "Action": "ListStackResources",
+                "Version": "2010-05-15",
+                "StackName": stack_name,
+            }
+            if next_token:
+                query_params.update({"NextToken": next_token})
+
+            request = Request(
+                credentials=await self._credentials(deadline),
+                method=Method.GET,
+                host=endpoint.host,
+                scheme=endpoint.scheme,
+                query=query_params,
+                headers={
+                    "Accept": "application/json",
+                    "Content-Type": "application/x-www-form-urlencoded; charset=utf-8",
+                },
+            )
+
+            response = await self._send(
+                request,
+                service=service,
+                region=region,
+                trace=trace,
+                cache_key=self._cache_key(
+                    "ListStackResources", service, region, request
+                ),
+                deadline=deadline,
+            )
+
+            with span(trace, Phase.parse):
+                json_response = response.json()
+            result = json_response["ListStackResourcesResponse"][
+                "ListStackResourcesResult"
+            ]
+            return result["StackResourceSummaries"], result.get("NextToken")
+
+        async with aclosing(
+            paginate(fetch_page, next_token=next_token, prefetch=prefetch)
+        ) as pages:
+            async for page in pages:
+                for resource in page:
+                    yield resource
 
-        # Handle pagination
-        next_token = result.get("NextToken")
-        if next_token:
-            resources.extend(
-                await self.list_stack_resources(region, stack_name, next_token)
+    async def list_stack_resources(
+        self,
+        region: Region,
+        stack_name: str,
+        next_token: Optional[str] = None,
+        prefetch: int = 0,
+        timeout: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        List all resources in a CloudFormation stack asynchronously.
+        The timeout (defaults to Client.timeout) is a deadline for every page.
+        """
+        return [
+            resource
+            async for resource in self.iter_stack_resources(
+                region,
+                stack_name,
+                next_token=next_token,
+                prefetch=prefetch,
+                timeout=timeout,
             )
-        return resources
+        ]
 
     async def get_resource(
         self,
         region: Region,
         resource_type: str,
         identifier: str,
+        timeout: Optional[float] = None,
     ) -> Dict[str, Any]:
         """
         Returns information about the current state of the specified resource
         in CloudFormation schema.
+        The timeout (defaults to Client.timeout) is a deadline in seconds for the call.
         """
         service = "cloudcontrolapi"
+        endpoint = self.endpoints.resolve(service, region)
+        trace = self._trace("GetResource", service, region)
+        deadline = self._deadline(timeout)
         request = Request(
-            credentials=self.credentials,
+            credentials=await self._credentials(deadline),
             method=Method.POST,
-            host=f"{service}.{region}.amazonaws.com",
-            body={
-                "Action": "GetResource",
-                "Version": "2021-09-30",
-                "TypeName": resource_type,
-                "Identifier": identifier,
-            },
+            host=endpoint.host,
+            scheme=endpoint.scheme,
+            body=self.codec.dumps(
+                {
+                    "Action": "GetResource",
+                    "Version": "2021-09-30",
+                    "TypeName": resource_type,
+                    "Identifier": identifier,
+                }
+            ),
             headers={
                 "Accept": "application/json",
                 "Content-Type": "application/x-amz-json-1.0",
                 "X-Amz-Target": "CloudApiService.GetResource",
             },
         )
-        signed_request = request.sign(
-            utc_now=self.utcnow(), service=service, region=region
-        )
-        response = await request_with_retry(
-            self.httpx_client,
-            request=signed_request,
-            logger=self.logger,
+        response = await self._send(
+            request,
+            service=service,
+            region=region,
+            trace=trace,
+            cache_key=self._cache_key("GetResource", service, region, request),
+            deadline=deadline,
         )
-        json_response = json.loads(response.text)
-        properties = json_response["ResourceDescription"]["Properties"]
-        resource: Dict[str, Any] = json.loads(properties)
+        with span(trace, Phase.parse):
+            json_response = response.json()
+            properties = json_response["ResourceDescription"]["Properties"]
+            resource: Dict[str, Any] = self.codec.loads(properties)
         return resource
 
-    async def invoke(
+    async def invoke_raw(
         self,
         region: Region,
         function_name: str,
-        payload: Optional[Dict[str, Any]] = None,
-    ) -> str:
+        payload: Optional[Body] = None,
+        timeout: Optional[float] = None,
+    ) -> Response:
         """
-        Invokes a Lambda function.
+        Invokes a Lambda function and returns the raw Response.
+        The payload bytes are never decoded, headers such as X-Amz-Function-Error and the request ID are available.
+        The payload may be key/value pairs, or a pre-serialized JSON string or bytes which are sent as is.
+        The timeout (defaults to Client.timeout) is a deadline in seconds for the call.
         """
         service = "lambda"
+        endpoint = self.endpoints.resolve(service, region)
+        deadline = self._deadline(timeout)
         request = Request(
-            credentials=self.credentials,
+            credentials=await self._credentials(deadline),
             method=Method.POST,
-            host=f"{service}.{region}.amazonaws.com",
+            host=endpoint.host,
+            scheme=endpoint.scheme,
             path=f"/2015-03-31/functions/{_uri_encode(function_name)}/invocations",
-            body=payload,
+            body=(self.codec.dumps(payload) if isinstance(payload, dict) else payload),
             headers={
                 "Accept": "application/json",
                 "Content-Type": "application/json",
             },
         )
-        signed_request = request.sign(
-            utc_now=self.utcnow(), service=service, region=region
-        )
-        response = await request_with_retry(
-            self.httpx_client,
-            request=signed_request,
-            logger=self.logger,
+        return await self._send(
+            request,
+            service=service,
+            region=region,
+            trace=self._trace("Invoke", service, region),
+            deadline=deadline,
         )
+
+    async def invoke(
+        self,
+        region: Region,
+        function_name: str,
+        payload: Optional[Body] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """
+        Invokes a Lambda function.
+        The payload may be key/value pairs, or a pre-serialized JSON string or bytes which are sent as is.
+        The timeout (defaults to Client.timeout) is a deadline in seconds for the call.
+        """
+        response = await self.invoke_raw(region, function_name, payload, timeout)
         return response.text
+
+    async def invoke_stream(
+        self,
+        region: Region,
+        function_name: str,
+        payload: Optional[Body] = None,
+        response_stream: bool = False,
+        timeout: Optional[float] = None,
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Invokes a Lambda function, yielding the response as chunks of bytes as they arrive
+        so large responses can be forwarded with constant memory.
+        If response_stream is True the InvokeWithResponseStream operation is used,
+        which requires the function to support response streaming,
+        and the payload chunks are decoded from the event stream as they arrive.
+        The payload may be key/value pairs, or a pre-serialized JSON string or bytes which are sent as is.
+        The timeout (defaults to Client.timeout) is a deadline in seconds for the call, including reading every chunk.
+        """
+        service = "lambda"
+        endpoint = self.endpoints.resolve(service, region)
+        deadline = self._deadline(timeout)
+        operation, path = (
+            (
+                "InvokeWithResponseStream",
+                "2021-11-15/functions/{}/response-streaming-invocations",
+            )
+            if response_stream
+            else ("Invoke", "2015-03-31/functions/{}/invocations")
+        )
+        request = Request(
+            credentials=await self._credentials(deadline),
+            method=Method.POST,
+            host=endpoint.host,
+            scheme=endpoint.scheme,
+            path="/" + path.format(_uri_encode(function_name)),
+            body=(self.codec.dumps(payload) if isinstance(payload, dict) else payload),
+            headers={"Content-Type": "application/json"},
+        )
+        async with aclosing(
+            self._stream(
+                request,
+                service=service,
+                region=region,
+                trace=self._trace(operation, service, region),
+                deadline=deadline,
+            )
+        ) as chunks:
+            if not response_stream:
+                async for chunk in chunks:
+                    yield chunk
+                return
+            async with aclosing(decode_stream(chunks)) as messages:
+                async for message in messages:
+                    if message.message_type != "event":
+                        raise StatusError(
+                            f"Recieved '{message.message_type}' message "
+                            f"'{message.event_type}' from AWS API. "
+                            f"Payload: '{bytes(message.payload)!r}'"
+                        )
+                    if message.event_type == "PayloadChunk":
+                        yield bytes(message.payload)
+                    elif message.event_type == "InvokeComplete":
+                        result = self.codec.loads(bytes(message.payload))
+                        if result.get("ErrorCode"):
+                            raise StatusError(
+                                f"Lambda function error '{result['ErrorCode']}'. "
+                                f"Details: '{result.get('ErrorDetails')}'"
+                            )
@@ -0,0 +1,55 @@
+"""
+Clock skew correction from the Date header of AWS responses,
+so requests are signed with the server time when the local clock drifts.
+Errors caused by clock skew are classified by awsync.errors.classify.
+"""
+
+import datetime
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+
+
+def _server_time(headers: Mapping[str, str]) -> Optional[datetime.datetime]:
+    "The server time from the Date header, None if missing or invalid."
+    value = headers.get("Date") or headers.get("date")
+    if not value:
+        return None
+    try:
+        server_time = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if server_time.tzinfo is None:
+        return server_time.replace(tzinfo=datetime.UTC)
+    return server_time
+
+
+class ClockSkew:
+    """
+    Tracks the offset of the local clock from AWS server time, from the Date header of responses.
+    The Date header has a resolution of one second, so the offset is only changed
+    when it differs from the measured offset by more than the tolerance.
+    """
+
+    def __init__(self, tolerance: float = 5.0) -> None:
+        self.tolerance = datetime.timedelta(seconds=tolerance)
+        "Measured offsets within this many seconds of the current offset are ignored."
+        self.offset = datetime.timedelta()
+        "The server time minus the local time, added to the local time to sign requests."
+        self.corrections = 0
+        "Total number of times the offset was changed."
+
+    def now(self, local_now: datetime.datetime) -> datetime.datetime:
+        "The estimated server time for a local time."
+        return local_now + self.offset
+
+    def update(self, headers: Mapping[str, str], local_now: datetime.datetime) -> bool:
+        "Measure the offset from the Date header of a response, returns True if the offset changed."
+        server_time = _server_time(headers)
+        if server_time is None:
+            return False
+        offset = server_time - local_now
+        if abs(offset - self.offset) <= self.tolerance:
+            return False
+        self.offset = offset
+        self.corrections += 1
+        return True
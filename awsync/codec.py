@@ -0,0 +1,93 @@
+"""
+JSON codecs for encoding request bodies and decoding responses.
+Faster third party JSON libraries are used when installed, falling back to the standard library.
+"""
+
+import importlib
+import json
+from typing import Any, Protocol, Union
+
+
+class JsonCodec(Protocol):
+    "Encodes and decodes JSON."
+
+    name: str
+    "The name of the codec."
+
+    def dumps(self, obj: Any) -> bytes:
+        "Serialize an object to JSON bytes."
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        "Deserialize JSON bytes or string to an object."
+
+
+class StdlibJsonCodec:
+    "JSON codec using the standard library json module."
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        "Serialize an object to JSON bytes."
+        return json.dumps(obj).encode()
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        "Deserialize JSON bytes or string to an object."
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    """
+    JSON codec using orjson, see: https://github.com/ijl/orjson
+    Raises ImportError if orjson is not installed.
+    """
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        self._orjson = importlib.import_module("orjson")
+
+    def dumps(self, obj: Any) -> bytes:
+        "Serialize an object to JSON bytes."
+        data: bytes = self._orjson.dumps(obj)
+        return data
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        "Deserialize JSON bytes or string to an object."
+        return self._orjson.loads(data)
+
+
+class UjsonCodec:
+    """
+    JSON codec using ujson, see: https://github.com/ultrajson/ultrajson
+    Raises ImportError if ujson is not installed.
+    """
+
+    name = "ujson"
+
+    def __init__(self) -> None:
+        self._ujson = importlib.import_module("ujson")
+
+    def dumps(self, obj: Any) -> bytes:
+        "Serialize an object to JSON bytes."
+        data: str = self._ujson.dumps(obj, ensure_ascii=False)
+        return data.encode()
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        "Deserialize JSON bytes or string to an object."
+        return self._ujson.loads(data)
+
+
+def default_codec() -> JsonCodec:
+    "Returns the fastest installed JSON codec: orjson, then ujson, then the standard library."
+    try:
+        return OrjsonCodec()
+    except ImportError:
+        pass
+    try:
+        return UjsonCodec()
+    except ImportError:
+        return StdlibJsonCodec()
+
+
+stdlib_json_codec = StdlibJsonCodec()
+"A shared standard library JSON codec."
@@ -0,0 +1,326 @@
+"""
+Credential providers and a refreshing credentials cache.
+Providers are tried in order by a chain, similar to the AWS SDKs default credential provider chain.
+See: https://docs.aws.amazon.com/sdkref/latest/guide/standardized-credentials.html
+"""
+
+import asyncio
+import configparser
+import datetime
+import ipaddress
+import logging
+import os
+from pathlib import Path
+from typing import Any, Callable, Mapping, Optional, Protocol, Sequence
+
+from httpx import URL, AsyncClient, HTTPError
+
+from awsync.models.aws import Credentials
+
+
+class NoCredentialsError(Exception):
+    "No credential provider in the chain was able to provide credentials."
+
+
+class CredentialProvider(Protocol):
+    "A source of AWS credentials."
+
+    async def load(self) -> Optional[Credentials]:
+        "Returns credentials, or None if the provider is not configured."
+
+
+def _utcnow() -> datetime.datetime:
+    "Returns the current datetime in UTC."
+    return datetime.datetime.now(datetime.UTC)
+
+
+def _from_json(data: Mapping[str, Any]) -> Credentials:
+    "Credentials from a container or instance metadata credentials response."
+    return Credentials(
+        access_key_id=data["AccessKeyId"],
+        secret_access_key=data["SecretAccessKey"],
+        session_token=data.get("Token"),
+        expiration=(
+            datetime.datetime.fromisoformat(data["Expiration"])
+            if data.get("Expiration")
+            else None
+        ),
+    )
+
+
+class EnvironmentProvider:
+    "Loads credentials from the AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY and AWS_SESSION_TOKEN environment variables."
+
+    async def load(self) -> Optional[Credentials]:
+        "Returns credentials from environment variables, or None if they are not set."
+        try:
+            return Credentials.from_environment()
+        except KeyError:
+            return None
+
+
+class SharedFileProvider:
+    """
+    Loads static credentials for a profile from the shared credentials and config files.
+    See: https://docs.aws.amazon.com/sdkref/latest/guide/file-format.html
+    """
+
+    def __init__(
+        self,
+        profile: Optional[str] = None,
+        credentials_path: Optional[Path] = None,
+        config_path: Optional[Path] = None,
+    ) -> None:
+        self.profile = profile
+        "The profile name, defaults to the AWS_PROFILE environment variable or 'default'."
+        self.credentials_path = credentials_path
+        "The credentials file, defaults to AWS_SHARED_CREDENTIALS_FILE or ~/.aws/credentials."
+        self.config_path = config_path
+        "The config file, defaults to AWS_CONFIG_FILE or ~/.aws/config."
+
+    def _load(self) -> Optional[Credentials]:
+        "Reads the files, blocking."
+        profile = self.profile or os.environ.get("AWS_PROFILE", "default")
+        credentials_path = self.credentials_path or Path(
+            os.environ.get("AWS_SHARED_CREDENTIALS_FILE", "~/.aws/credentials")
+        )
+        config_path = self.config_path or Path(
+            os.environ.get("AWS_CONFIG_FILE", "~/.aws/config")
+        )
+        # Config file sections are named "profile <name>" except for the default profile.
+        config_section = profile if profile == "default" else f"profile {profile}"
+        for path, section in (
+            (credentials_path, profile),
+            (config_path, config_section),
+        ):
+            parser = configparser.RawConfigParser()
+            parser.read(path.expanduser())
+            if parser.has_option(section, "aws_access_key_id"):
+                if not parser.has_option(section, "aws_secret_access_key"):
+                    raise NoCredentialsError(
+                        f"Profile '{profile}' in '{path}' has an aws_access_key_id "
+                        "but no aws_secret_access_key."
+                    )
+                return Credentials(
+                    access_key_id=parser.get(section, "aws_access_key_id"),
+                    secret_access_key=parser.get(section, "aws_secret_access_key"),
+                    session_token=parser.get(
+                        section, "aws_session_token", fallback=None
+                    ),
+                )
+        return None
+
+    async def load(self) -> Optional[Credentials]:
+        "Returns credentials for the profile, or None if the profile has no static credentials."
+        return await asyncio.to_thread(self._load)
+
+
+CONTAINER_HOSTS = frozenset({"169.254.170.2", "169.254.170.23", "fd00:ec2::23"})
+"The ECS and EKS container credentials endpoint hosts, allowed over http."
+
+
+def _check_container_uri(uri: str) -> None:
+    "Raises NoCredentialsError if the authorization token would be sent over http to a host which is not allowed."
+    url = URL(uri)
+    if url.scheme == "https" or url.host == "localhost" or url.host in CONTAINER_HOSTS:
+        return
+    try:
+        if ipaddress.ip_address(url.host).is_loopback:
+            return
+    except ValueError:
+        pass
+    raise NoCredentialsError(
+        f"Container credentials URI '{uri}' must use https, a loopback host, "
+        f"or one of the hosts {sorted(CONTAINER_HOSTS)}."
+    )
+
+
+class ContainerProvider:
+    """
+    Loads credentials from a container credentials HTTP endpoint, ie. ECS task roles or EKS pod identity.
+    The endpoint is configured by AWS_CONTAINER_CREDENTIALS_FULL_URI or AWS_CONTAINER_CREDENTIALS_RELATIVE_URI,
+    so a local stand-in can be used by setting the full URI to a loopback address.
+    The authorization token is read from AWS_CONTAINER_AUTHORIZATION_TOKEN_FILE (EKS pod identity)
+    or AWS_CONTAINER_AUTHORIZATION_TOKEN, the file takes precedence.
+    See: https://docs.aws.amazon.com/sdkref/latest/guide/feature-container-credentials.html
+    """
+
+    def __init__(self, httpx_client: AsyncClient, timeout: float = 1.0) -> None:
+        self.httpx_client = httpx_client
+        "The httpx AsyncClient to use for requests to the endpoint."
+        self.timeout = timeout
+        "Request timeout in seconds."
+
+    async def load(self) -> Optional[Credentials]:
+        "Returns credentials from the endpoint, or None if no endpoint is configured."
+        if "AWS_CONTAINER_CREDENTIALS_FULL_URI" in os.environ:
+            uri = os.environ["AWS_CONTAINER_CREDENTIALS_FULL_URI"]
+            _check_container_uri(uri)
+        elif "AWS_CONTAINER_CREDENTIALS_RELATIVE_URI" in os.environ:
+            uri = (
+                "http://169.254.170.2"
+                + os.environ["AWS_CONTAINER_CREDENTIALS_RELATIVE_URI"]
+            )
+        else:
+            return None
+        headers = {}
+        if "AWS_CONTAINER_AUTHORIZATION_TOKEN_FILE" in os.environ:
+            # Read on every load, the token file is rotated.
+            token = await asyncio.to_thread(
+                Path(os.environ["AWS_CONTAINER_AUTHORIZATION_TOKEN_FILE"]).read_text
+            )
+            headers["Authorization"] = token.strip()
+        elif "AWS_CONTAINER_AUTHORIZATION_TOKEN" in os.environ:
+            headers["Authorization"] = os.environ["AWS_CONTAINER_AUTHORIZATION_TOKEN"]
+        response = await self.httpx_client.get(
+            uri, headers=headers, timeout=self.timeout
+        )
+        response.raise_for_status()
+        return _from_json(response.json())
+
+
+class InstanceMetadataProvider:
+    """
+    Loads instance profile credentials from the EC2 instance metadata service (IMDSv2).
+    The endpoint can be set with AWS_EC2_METADATA_SERVICE_ENDPOINT, ie. to use a local stand-in,
+    and the provider is disabled by setting AWS_EC2_METADATA_DISABLED to 'true'.
+    See: https://docs.aws.amazon.com/AWSEC2/latest/UserGuide/instance-metadata-security-credentials.html
+    """
+
+    def __init__(self, httpx_client: AsyncClient, timeout: float = 1.0) -> None:
+        self.httpx_client = httpx_client
+        "The httpx AsyncClient to use for requests to the metadata service."
+        self.timeout = timeout
+        "Request timeout in seconds, kept short as the service is unreachable outside of EC2."
+
+    async def load(self) -> Optional[Credentials]:
+        "Returns instance profile credentials, or None if the metadata service is disabled or unreachable."
+        if os.environ.get("AWS_EC2_METADATA_DISABLED", "").lower() == "true":
+            return None
+        endpoint = os.environ.get(
+            "AWS_EC2_METADATA_SERVICE_ENDPOINT", "http://169.254.169.254"
+        ).rstrip("/")
+        try:
+            token_response = await self.httpx_client.put(
+                f"{endpoint}/latest/api/token",
+                headers={"X-aws-ec2-metadata-token-ttl-seconds": "21600"},
+                timeout=self.timeout,
+            )
+            token_response.raise_for_status()
+        except HTTPError:
+            return None
+        headers = {"X-aws-ec2-metadata-token": token_response.text}
+        path = f"{endpoint}/latest/meta-data/iam/security-credentials/"
+        role_response = await self.httpx_client.get(
+            path, headers=headers, timeout=self.timeout
+        )
+        role_response.raise_for_status()
+        role = role_response.text.splitlines()[0]
+        response = await self.httpx_client.get(
+            path + role, headers=headers, timeout=self.timeout
+        )
+        response.raise_for_status()
+        return _from_json(response.json())
+
+
+class CredentialProviderChain:
+    "Tries credential providers in order, returning credentials from the first configured provider."
+
+    def __init__(self, providers: Sequence[CredentialProvider]) -> None:
+        self.providers = providers
+        "The providers in the order they are tried."
+
+    async def load(self) -> Optional[Credentials]:
+        "Returns credentials from the first provider which returns any, or None."
+        for provider in self.providers:
+            credentials = await provider.load()
+            if credentials is not None:
+                return credentials
+        return None
+
+    @classmethod
+    def default(cls, httpx_client: AsyncClient) -> "CredentialProviderChain":
+        "The default chain: environment variables, shared files, container endpoint, instance metadata."
+        return cls(
+            [
+                EnvironmentProvider(),
+                SharedFileProvider(),
+                ContainerProvider(httpx_client),
+                InstanceMetadataProvider(httpx_client),
+            ]
+        )
+
+
+class CachedCredentials:
+    """
+    Caches credentials from a provider and refreshes them before they expire.
+    Within refresh_ahead of expiration a single background refresh is started while the
+    cached credentials keep being returned, so requests only wait for a refresh if there are
+    no credentials yet or they are within expiry_margin of expiring.
+    """
+
+    def __init__(
+        self,
+        provider: CredentialProvider,
+        refresh_ahead: datetime.timedelta = datetime.timedelta(minutes=15),
+        expiry_margin: datetime.timedelta = datetime.timedelta(minutes=1),
+        utcnow: Callable[[], datetime.datetime] = _utcnow,
+        logger: logging.Logger = logging.getLogger(__name__),
+    ) -> None:
+        self.provider = provider
+        "The provider to load credentials from."
+        self.refresh_ahead = refresh_ahead
+        "How long before expiration to start a background refresh."
+        self.expiry_margin = expiry_margin
+        "How long before expiration credentials are treated as expired and requests wait for a refresh."
+        self.utcnow = utcnow
+        "A zero argument callable function that returns the current datetime in UTC."
+        self.logger = logger
+        "The logger for background refresh failures."
+        self.refreshes = 0
+        "Total number of successful refreshes."
+        self._credentials: Optional[Credentials] = None
+        self._refresh_task: Optional["asyncio.Task[Credentials]"] = None
+
+    async def get(self) -> Credentials:
+        "Returns current credentials, only waiting if they are missing or about to expire."
+        credentials = self._credentials
+        if credentials is not None:
+            if credentials.expiration is None:
+                return credentials
+            remaining = credentials.expiration - self.utcnow()
+            if remaining > self.refresh_ahead:
+                return credentials
+            if remaining > self.expiry_margin:
+                self._refresh()
+                return credentials
+        # Shielded so a cancelled caller does not cancel the refresh shared with other callers.
+        return await asyncio.shield(self._refresh())
+
+    def _refresh(self) -> "asyncio.Task[Credentials]":
+        "Returns the in-flight refresh task, starting one if none is in flight."
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._load())
+            self._refresh_task.add_done_callback(self._log_failure)
+        return self._refresh_task
+
+    async def _load(self) -> Credentials:
+        "Loads credentials from the provider and caches them."
+        try:
+            credentials = await self.provider.load()
+            if credentials is None:
+                raise NoCredentialsError(
+                    f"Unable to load AWS credentials from provider '{self.provider}'."
+                )
+            self._credentials = credentials
+            self.refreshes += 1
+            return credentials
+        finally:
+            self._refresh_task = None
+
+    def _log_failure(self, task: "asyncio.Task[Credentials]") -> None:
+        "Logs a failed refresh, marking the exception retrieved if no caller waited for it."
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.warning(
+                f"Failed to refresh AWS credentials: '{task.exception()!r}'"
+            )
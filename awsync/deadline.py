@@ -0,0 +1,83 @@
+"""
+End-to-end deadlines for API calls.
+A deadline caps the total time of a call across credentials, signing, every attempt, backoff sleeps and every page.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from httpx import Timeout, TimeoutException
+
+from awsync.errors import AwsError, DeadlineExceededException
+
+T = TypeVar("T")
+
+
+class Deadline:
+    "A time budget for an API call, started when the deadline is created."
+
+    def __init__(
+        self, timeout: float, monotonic: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.timeout = timeout
+        "The time budget in seconds."
+        self.monotonic = monotonic
+        "A zero argument callable returning a monotonic time in seconds."
+        self.expires = monotonic() + timeout
+        "The monotonic time the deadline expires at."
+
+    def remaining(self) -> float:
+        "Seconds remaining before the deadline, 0 once it has passed."
+        return max(0.0, self.expires - self.monotonic())
+
+    def exceeded(self, error: Optional[AwsError] = None) -> DeadlineExceededException:
+        "The exception raised when the deadline has passed, with the error of the last attempt if any."
+        message = f"Deadline of '{self.timeout}' seconds exceeded."
+        if error is not None:
+            message += f" Last error: {error}"
+        return DeadlineExceededException(message, error=error)
+
+    def check(self, error: Optional[AwsError] = None) -> float:
+        "Returns the seconds remaining, raises DeadlineExceededException if the deadline has passed."
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise self.exceeded(error)
+        return remaining
+
+    def httpx_timeout(self, timeout: Timeout) -> Dict[str, Optional[float]]:
+        """
+        The httpx timeout request extension for an attempt,
+        each of the connect, read, write and pool timeouts capped to the seconds remaining.
+        """
+        remaining = self.check()
+        return {
+            name: remaining if value is None else min(value, remaining)
+            for name, value in timeout.as_dict().items()
+        }
+
+
+async def within(
+    deadline: Optional[Deadline],
+    function: Callable[[], Awaitable[T]],
+    error: Optional[AwsError] = None,
+) -> T:
+    """
+    Await function(), cancelling it and raising DeadlineExceededException if the deadline passes first.
+    error is the error of the last attempt, included in the exception.
+    """
+    if deadline is None:
+        return await function()
+    remaining = deadline.check(error)
+    try:
+        async with asyncio.timeout(remaining) as scope:
+            return await function()
+    except TimeoutError:
+        if not scope.expired():
+            raise
+        raise deadline.exceeded(error) from None
+    except TimeoutException:
+        # An httpx timeout capped to the seconds remaining by httpx_timeout.
+        if deadline.remaining() > 0:
+            raise
+        raise deadline.exceeded(error) from None
@@ -0,0 +1,75 @@
+"""
+Endpoint resolution for AWS services.
+See: https://docs.aws.amazon.com/general/latest/gr/rande.html
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+from awsync.models.aws import Region
+from awsync.models.http import Scheme
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    "A service endpoint."
+    host: str
+    "The fully qualified domain name (FQDN), with a port if not the default for the scheme."
+    scheme: Scheme = Scheme.https
+    "The HTTP scheme."
+
+    def get_url(self) -> str:
+        "Returns the root URL of the endpoint as a string."
+        return f"{self.scheme}://{self.host}/"
+
+
+DEFAULT_SERVICES = ("cloudformation", "cloudcontrolapi", "lambda")
+"Services used by Client methods, precomputed for every region."
+
+
+class EndpointResolver:
+    """
+    Resolves the endpoint for a service and region.
+    Endpoints for services and regions known up front are precomputed,
+    others are computed on first use and cached.
+    """
+
+    def __init__(
+        self,
+        fips: bool = False,
+        dualstack: bool = False,
+        endpoint: Optional[Endpoint] = None,
+        service_endpoints: Mapping[str, Endpoint] = {},
+        services: Iterable[str] = DEFAULT_SERVICES,
+    ) -> None:
+        self.fips = fips
+        "Use FIPS 140-2 validated endpoints, ie. cloudformation-fips.us-east-1.amazonaws.com."
+        self.dualstack = dualstack
+        "Use dual-stack (IPv4 and IPv6) endpoints, ie. cloudformation.us-east-1.api.aws."
+        self.endpoint = endpoint
+        "(Optional) An endpoint for every service and region, ie. a local stand-in."
+        self.service_endpoints = service_endpoints
+        "Endpoints by service name, overriding the endpoint for every region of the service."
+        self._endpoints: Dict[Tuple[str, str], Endpoint] = {
+            (service, str(region)): self._endpoint(service, region)
+            for service in services
+            for region in Region
+        }
+
+    def _endpoint(self, service: str, region: str) -> Endpoint:
+        "Computes the endpoint for a service and region."
+        if service in self.service_endpoints:
+            return self.service_endpoints[service]
+        if self.endpoint is not None:
+            return self.endpoint
+        prefix = f"{service}-fips" if self.fips else service
+        domain = "api.aws" if self.dualstack else "amazonaws.com"
+        return Endpoint(host=f"{prefix}.{region}.{domain}")
+
+    def resolve(self, service: str, region: Region) -> Endpoint:
+        "Returns the endpoint for a service and region."
+        key = (service, str(region))
+        endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            endpoint = self._endpoints[key] = self._endpoint(service, region)
+        return endpoint
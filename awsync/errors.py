@@ -0,0 +1,275 @@
+"""
+Typed AWS API errors parsed from JSON, XML (REST-XML, query and EC2 protocol) error responses,
+and a classifier deciding which errors are retried.
+"""
+
+import json
+from typing import TYPE_CHECKING, Any, Dict, Mapping, Optional, Tuple, Type
+from xml.etree.ElementTree import Element, ParseError, fromstring
+
+from awsync.models.strenum import StrEnum
+
+if TYPE_CHECKING:  # pragma: no cover
+    from awsync.client import Response
+
+MAX_MESSAGE_LENGTH = 1024
+"Maximum number of characters of an error message, unparsed error bodies are truncated."
+
+THROTTLE_CODES = frozenset(
+    {
+        "Throttling",
+        "ThrottlingException",
+        "ThrottledException",
+        "RequestThrottledException",
+        "RequestThrottled",
+        "TooManyRequestsException",
+        "ProvisionedThroughputExceededException",
+        "TransactionInProgressException",
+        "RequestLimitExceeded",
+        "BandwidthLimitExceeded",
+        "LimitExceededException",
+        "SlowDown",
+        "PriorRequestNotComplete",
+        "EC2ThrottledException",
+    }
+)
+"Error codes of throttling errors."
+CLOCK_SKEW_CODES = frozenset(
+    {
+        "RequestTimeTooSkewed",
+        "RequestExpired",
+        "RequestInTheFuture",
+        "InvalidSignatureException",
+        "SignatureDoesNotMatch",
+    }
+)
+"""
+Error codes of requests rejected for being signed with a skewed time.
+Signature errors also have other causes, Client only retries them if the Date header shows the clock is skewed.
+"""
+TRANSIENT_CODES = frozenset(
+    {
+        "RequestTimeout",
+        "RequestTimeoutException",
+        "InternalError",
+        "InternalFailure",
+        "ServiceUnavailable",
+        "IDPCommunicationError",
+    }
+)
+"Error codes of transient errors."
+
+
+class ErrorKind(StrEnum):
+    "How an error is retried."
+
+    transient = "transient"
+    "A server or transient error, retried with backoff."
+    throttle = "throttle"
+    "A throttling error, retried with backoff and slowing the adaptive rate limiter."
+    clock_skew = "clock_skew"
+    "The request was signed with a skewed time, re-signed and retried once by Client."
+    non_retryable = "non_retryable"
+    "A client error, not retried."
+
+
+def classify(status: int, code: Optional[str]) -> ErrorKind:
+    "Classify an error response by its status code and error code."
+    if code in THROTTLE_CODES or status == 429:
+        return ErrorKind.throttle
+    if code in CLOCK_SKEW_CODES:
+        return ErrorKind.clock_skew
+    if code in TRANSIENT_CODES or status >= 500:
+        return ErrorKind.transient
+    return ErrorKind.non_retryable
+
+
+def _normalize_code(code: Any) -> Optional[str]:
+    "The error code without a namespace prefix (ie. 'com.amazon#Code') or suffix (ie. 'Code:http://...')."
+    if not code or not isinstance(code, str):
+        return None
+    return code.rsplit("#", 1)[-1].split(":", 1)[0] or None
+
+
+def _parse_json(content: bytes) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    "The error code, message and request ID of a JSON error body."
+    data = json.loads(content)
+    error = data.get("Error")
+    if isinstance(error, dict):  # Query protocol errors requested as JSON.
+        return error.get("Code"), error.get("Message"), data.get("RequestId")
+    return (
+        data.get("__type") or data.get("code") or data.get("Code"),
+        data.get("message") or data.get("Message") or data.get("errorMessage"),
+        data.get("RequestId") or data.get("requestId"),
+    )
+
+
+def _find(root: Element, name: str) -> Optional[str]:
+    "The text of the first element named name, ignoring namespaces."
+    for element in root.iter():
+        if element.tag == name or element.tag.endswith("}" + name):
+            return element.text
+    return None
+
+
+def _parse_xml(content: bytes) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    The error code, message and request ID of an XML error body,
+    ie. <Error>, <ErrorResponse><Error> (query) or <Response><Errors><Error> (EC2).
+    """
+    root = fromstring(content)
+    return (
+        _find(root, "Code"),
+        _find(root, "Message"),
+        _find(root, "RequestId") or _find(root, "RequestID"),
+    )
+
+
+def parse_error(
+    content: bytes, headers: Mapping[str, str]
+) -> Tuple[Optional[str], str, Optional[str]]:
+    """
+    Parse an error response body, returns the error code, message and request ID.
+    If the body is not a JSON or XML error, the code is None and the message is the truncated body.
+    """
+    code = _normalize_code(headers.get("x-amzn-ErrorType"))
+    message = request_id = None
+    body = content.lstrip()
+    try:
+        if body.startswith(b"{"):
+            body_code, message, request_id = _parse_json(body)
+        elif body.startswith(b"<"):
+            body_code, message, request_id = _parse_xml(body)
+        else:
+            body_code = None
+        code = code or _normalize_code(body_code)
+    except (ValueError, ParseError):
+        pass
+    if not isinstance(message, str):
+        message = content[:MAX_MESSAGE_LENGTH].decode(errors="replace")
+    return code, message[:MAX_MESSAGE_LENGTH], request_id
+
+
+def _retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    "The Retry-After header in seconds, None if missing or not a number of seconds."
+    value = headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        return None
+    return seconds if seconds >= 0 else None
+
+
+class StatusError(Exception):
+    "API responded with a non-2XX status code."
+
+    def __init__(self, message: str, response: Optional["Response"] = None) -> None:
+        super().__init__(message)
+        self.response = response
+        "The error response, if available."
+
+
+class AwsError(StatusError):
+    "An error response from an AWS API, not retried."
+
+    kind = ErrorKind.non_retryable
+    "How the error is retried."
+
+    def __init__(
+        self,
+        status: int,
+        code: Optional[str],
+        message: str,
+        request_id: Optional[str] = None,
+        retry_after: Optional[float] = None,
+        response: Optional["Response"] = None,
+    ) -> None:
+        super().__init__(
+            f"AWS API responded with status '{status}' error '{code}': '{message}'. "
+            f"Request ID: '{request_id}'",
+            response=response,
+        )
+        self.status = status
+        "The response status code."
+        self.code = code
+        "The AWS error code, ie. 'ThrottlingException', None if the response was not an AWS error."
+        self.message = message
+        "The error message."
+        self.request_id = request_id
+        "The AWS request ID, if present."
+        self.retry_after = retry_after
+        "Seconds to wait before retrying from the Retry-After header, if present."
+
+    @property
+    def retryable(self) -> bool:
+        "If the error is retried with backoff."
+        return self.kind == ErrorKind.transient or self.kind == ErrorKind.throttle
+
+    @classmethod
+    def from_response(
+        cls, status: int, content: bytes, headers: Mapping[str, str]
+    ) -> "AwsError":
+        "Parse an error response into the error type of its classification."
+        code, message, request_id = parse_error(content, headers)
+        error_type = _ERROR_TYPES[classify(status, code)]
+        return error_type(
+            status=status,
+            code=code,
+            message=message,
+            request_id=(
+                headers.get("x-amzn-RequestId")
+                or headers.get("x-amz-request-id")
+                or request_id
+            ),
+            retry_after=_retry_after(headers),
+        )
+
+
+class TransientError(AwsError):
+    "A server or transient error, retried with backoff."
+
+    kind = ErrorKind.transient
+
+
+class ThrottlingError(AwsError):
+    "A throttling error, retried with backoff."
+
+    kind = ErrorKind.throttle
+
+
+class ClockSkewError(AwsError):
+    "The request was signed with a skewed time."
+
+    kind = ErrorKind.clock_skew
+
+
+_ERROR_TYPES: Dict[ErrorKind, Type[AwsError]] = {
+    ErrorKind.transient: TransientError,
+    ErrorKind.throttle: ThrottlingError,
+    ErrorKind.clock_skew: ClockSkewError,
+    ErrorKind.non_retryable: AwsError,
+}
+
+
+class MaxRetriesException(Exception):
+    "Maximum number of retries exceeded."
+
+    def __init__(self, message: str, error: Optional[AwsError] = None) -> None:
+        super().__init__(message)
+        self.error = error
+        "The error of the last attempt."
+
+
+class RetryBudgetExhaustedException(MaxRetriesException):
+    "Client-wide retry budget exhausted, the request was not retried."
+
+
+class DeadlineExceededException(TimeoutError):
+    "The deadline of a call passed, or a backoff sleep would have passed it."
+
+    def __init__(self, message: str, error: Optional[AwsError] = None) -> None:
+        super().__init__(message)
+        self.error = error
+        "The error of the last attempt, if any."
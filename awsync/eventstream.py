@@ -0,0 +1,233 @@
+"""
+Incremental decoder for the AWS event stream encoding (application/vnd.amazon.eventstream).
+Used by streaming APIs such as Lambda InvokeWithResponseStream.
+See: https://docs.aws.amazon.com/AmazonS3/latest/API/RESTSelectObjectAppendix.html
+
+Each message is framed as:
+- Prelude: total length (4 bytes), headers length (4 bytes), prelude CRC32 (4 bytes).
+- Headers: name length (1 byte), name, value type (1 byte), value.
+- Payload.
+- Message CRC32 (4 bytes) of everything before it.
+"""
+
+from dataclasses import dataclass
+import datetime
+from struct import Struct, error as StructError
+from typing import AsyncGenerator, AsyncIterable, Dict, List, Mapping, Union
+import uuid
+import zlib
+
+HeaderValue = Union[bool, int, bytes, str, datetime.datetime, uuid.UUID]
+"An event stream header value."
+
+_PRELUDE = Struct(">III")
+_PRELUDE_LENGTH = _PRELUDE.size
+_CRC_LENGTH = 4
+_MIN_MESSAGE_LENGTH = _PRELUDE_LENGTH + _CRC_LENGTH
+_UINT8 = Struct(">B")
+_UINT16 = Struct(">H")
+_UINT32 = Struct(">I")
+_INT_TYPES = {2: Struct(">b"), 3: Struct(">h"), 4: Struct(">i"), 5: Struct(">q")}
+_TIMESTAMP = Struct(">q")
+
+
+class EventStreamError(Exception):
+    "The event stream is malformed, truncated or failed a CRC check."
+
+
+@dataclass(frozen=True)
+class EventStreamMessage:
+    "A decoded event stream message."
+    headers: Dict[str, HeaderValue]
+    "Message headers by name."
+    payload: memoryview
+    "Message payload, a view into the received bytes without copying."
+
+    @property
+    def message_type(self) -> str:
+        "The ':message-type' header, ie. 'event', 'exception' or 'error'."
+        return str(self.headers.get(":message-type", "event"))
+
+    @property
+    def event_type(self) -> str:
+        "The ':event-type' header, or ':exception-type' for exception messages."
+        return str(
+            self.headers.get(":event-type")
+            or self.headers.get(":exception-type")
+            or self.headers.get(":error-code", "")
+        )
+
+
+def _read_prelude(view: memoryview, max_message_length: int) -> int:
+    "Validates the prelude at the start of view and returns the total message length."
+    total_length, headers_length, prelude_crc = _PRELUDE.unpack_from(view)
+    if zlib.crc32(view[:8]) != prelude_crc:
+        raise EventStreamError("Event stream prelude CRC mismatch.")
+    if not (_MIN_MESSAGE_LENGTH + headers_length <= total_length <= max_message_length):
+        raise EventStreamError(
+            f"Invalid event stream message length '{total_length}' "
+            f"with headers length '{headers_length}'."
+        )
+    return int(total_length)
+
+
+def _decode_headers(view: memoryview) -> Dict[str, HeaderValue]:
+    "Decodes the headers section of a message."
+    headers: Dict[str, HeaderValue] = {}
+    offset = 0
+    try:
+        while offset < len(view):
+            name_length = view[offset]
+            name = str(view[offset + 1 : offset + 1 + name_length], "utf-8")
+            offset += 1 + name_length
+            value_type = view[offset]
+            offset += 1
+            value: HeaderValue
+            if value_type in (0, 1):
+                value = value_type == 0
+            elif value_type in _INT_TYPES:
+                struct = _INT_TYPES[value_type]
+                (value,) = struct.unpack_from(view, offset)
+                offset += struct.size
+            elif value_type in (6, 7):
+                (length,) = _UINT16.unpack_from(view, offset)
+                offset += _UINT16.size
+                raw = view[offset : offset + length]
+                if len(raw) != length:
+                    raise EventStreamError("Truncated event stream header value.")
+                value = bytes(raw) if value_type == 6 else str(raw, "utf-8")
+                offset += length
+            elif value_type == 8:
+                (milliseconds,) = _TIMESTAMP.unpack_from(view, offset)
+                value = datetime.datetime.fromtimestamp(
+                    milliseconds / 1000, datetime.UTC
+                )
+                offset += _TIMESTAMP.size
+            elif value_type == 9:
+                raw = view[offset : offset + 16]
+                if len(raw) != 16:
+                    raise EventStreamError("Truncated event stream header value.")
+                value = uuid.UUID(bytes=bytes(raw))
+                offset += 16
+            else:
+                raise EventStreamError(
+                    f"Unknown event stream header value type '{value_type}'."
+                )
+            headers[name] = value
+    except (IndexError, StructError, UnicodeDecodeError) as exc:
+        raise EventStreamError("Malformed event stream headers.") from exc
+    return headers
+
+
+def _decode_message(view: memoryview) -> EventStreamMessage:
+    "Decodes a single complete message with a validated prelude."
+    (headers_length,) = _UINT32.unpack_from(view, 4)
+    (message_crc,) = _UINT32.unpack_from(view, len(view) - _CRC_LENGTH)
+    if zlib.crc32(view[:-_CRC_LENGTH]) != message_crc:
+        raise EventStreamError("Event stream message CRC mismatch.")
+    headers_end = _PRELUDE_LENGTH + headers_length
+    return EventStreamMessage(
+        headers=_decode_headers(view[_PRELUDE_LENGTH:headers_end]),
+        payload=view[headers_end:-_CRC_LENGTH],
+    )
+
+
+class EventStreamDecoder:
+    """
+    Incrementally decodes event stream messages from chunks with arbitrary boundaries.
+    Messages fully contained in a chunk are decoded in place, only partial messages are buffered,
+    and a buffered message is copied once when it is complete.
+    """
+
+    def __init__(self, max_message_length: int = 16 * 1024 * 1024) -> None:
+        self.max_message_length = max_message_length
+        "Maximum accepted message length in bytes, protects against corrupt length prefixes."
+        self._buffer = bytearray()
+        self._needed = _PRELUDE_LENGTH
+
+    def feed(self, chunk: bytes) -> List[EventStreamMessage]:
+        "Consumes a chunk of bytes, returns every message it completes."
+        messages: List[EventStreamMessage] = []
+        if self._buffer:
+            self._buffer += chunk
+            if len(self._buffer) < self._needed:
+                return messages
+            if self._needed == _PRELUDE_LENGTH:
+                # The prelude just completed, wait for the whole message.
+                self._needed = self._buffered_length()
+                if len(self._buffer) < self._needed:
+                    return messages
+            data = memoryview(bytes(self._buffer))
+            self._buffer.clear()
+        else:
+            data = memoryview(chunk)
+
+        offset = 0
+        while len(data) - offset >= _PRELUDE_LENGTH:
+            total_length = _read_prelude(data[offset:], self.max_message_length)
+            if len(data) - offset < total_length:
+                break
+            messages.append(_decode_message(data[offset : offset + total_length]))
+            offset += total_length
+        if offset < len(data):
+            self._buffer += data[offset:]
+        self._needed = (
+            self._buffered_length()
+            if len(self._buffer) >= _PRELUDE_LENGTH
+            else _PRELUDE_LENGTH
+        )
+        return messages
+
+    def _buffered_length(self) -> int:
+        "The total length of the buffered message, the prelude must be buffered."
+        return _read_prelude(
+            memoryview(bytes(self._buffer[:_PRELUDE_LENGTH])), self.max_message_length
+        )
+
+    def close(self) -> None:
+        "Signals the end of the stream, raises EventStreamError if a partial message remains."
+        if self._buffer:
+            raise EventStreamError(
+                f"Event stream ended with '{len(self._buffer)}' bytes of a partial message."
+            )
+
+
+async def decode_stream(
+    chunks: AsyncIterable[bytes], max_message_length: int = 16 * 1024 * 1024
+) -> AsyncGenerator[EventStreamMessage, None]:
+    "Yields event stream messages decoded from an async byte stream, ie. httpx Response.aiter_bytes()."
+    decoder = EventStreamDecoder(max_message_length=max_message_length)
+    async for chunk in chunks:
+        for message in decoder.feed(chunk):
+            yield message
+    decoder.close()
+
+
+def _encode_header(name: str, value: HeaderValue) -> bytes:
+    "Encodes a single header, integers are encoded as 32 bit integers."
+    encoded_name = name.encode()
+    prefix = _UINT8.pack(len(encoded_name)) + encoded_name
+    if isinstance(value, bool):
+        return prefix + _UINT8.pack(0 if value else 1)
+    if isinstance(value, int):
+        return prefix + _UINT8.pack(4) + _INT_TYPES[4].pack(value)
+    if isinstance(value, bytes):
+        return prefix + _UINT8.pack(6) + _UINT16.pack(len(value)) + value
+    if isinstance(value, str):
+        encoded = value.encode()
+        return prefix + _UINT8.pack(7) + _UINT16.pack(len(encoded)) + encoded
+    if isinstance(value, datetime.datetime):
+        milliseconds = int(value.timestamp() * 1000)
+        return prefix + _UINT8.pack(8) + _TIMESTAMP.pack(milliseconds)
+    return prefix + _UINT8.pack(9) + value.bytes
+
+
+def encode_message(headers: Mapping[str, HeaderValue], payload: bytes) -> bytes:
+    "Encodes a single event stream message, ie. for local stand-ins of streaming APIs."
+    encoded_headers = b"".join(
+        _encode_header(name, value) for name, value in headers.items()
+    )
+    total_length = _MIN_MESSAGE_LENGTH + len(encoded_headers) + len(payload)
+    prelude = _UINT32.pack(total_length) + _UINT32.pack(len(encoded_headers))
+    message = prelude + _UINT32.pack(zlib.crc32(prelude)) + encoded_headers + payload
+    return message + _UINT32.pack(zlib.crc32(message))
@@ -0,0 +1,258 @@
+"""
+In-process request metrics aggregated from trace events.
+Latencies are recorded in fixed-bucket histograms, so recording an event is a few integer increments.
+"""
+
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+from awsync.tracing import Phase, TraceEvent
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+"Default latency histogram bucket upper bounds in seconds."
+
+
+class Histogram:
+    "A fixed-bucket histogram."
+
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.bounds = tuple(bounds)
+        "Sorted bucket upper bounds."
+        self.counts = array("Q", [0] * (len(self.bounds) + 1))
+        "Number of values in each bucket, the last bucket counts values above every bound."
+        self.count = 0
+        "Total number of values recorded."
+        self.sum = 0.0
+        "Sum of every value recorded."
+
+    def record(self, value: float) -> None:
+        "Record a value."
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, percent: float) -> float:
+        """
+        Estimate a percentile (0 to 100) by linear interpolation within the bucket containing it.
+        Returns 0 if no values are recorded, values above every bound are estimated as the largest bound.
+        """
+        if not self.count:
+            return 0.0
+        rank = self.count * percent / 100
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                break
+            cumulative += count
+        if index == len(self.bounds):
+            return self.bounds[-1]
+        lower = self.bounds[index - 1] if index else 0.0
+        upper = self.bounds[index]
+        return lower + (upper - lower) * (rank - cumulative) / count
+
+
+class OperationMetrics:
+    "Counters and a latency histogram for calls to an operation in a region."
+
+    __slots__ = (
+        "latency",
+        "calls",
+        "errors",
+        "retries",
+        "attempts",
+        "throttles",
+        "bytes_sent",
+        "bytes_received",
+    )
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.latency = Histogram(bounds)
+        "Call latency in seconds, including retries."
+        self.calls = 0
+        "Total number of calls."
+        self.errors = 0
+        "Total number of calls which raised an exception."
+        self.retries = 0
+        "Total number of retries."
+        self.attempts = 0
+        "Total number of attempts sent, including retries."
+        self.throttles = 0
+        "Total number of throttling responses."
+        self.bytes_sent = 0
+        "Total request body bytes sent."
+        self.bytes_received = 0
+        "Total response body bytes received."
+
+
+@dataclass(frozen=True)
+class OperationSnapshot:
+    "A snapshot of the metrics for an operation in a region."
+    service: str
+    "The service."
+    operation: str
+    "The API operation."
+    region: str
+    "The region."
+    calls: int
+    "Total number of calls."
+    errors: int
+    "Total number of calls which raised an exception."
+    retries: int
+    "Total number of retries."
+    attempts: int
+    "Total number of attempts sent, including retries."
+    throttles: int
+    "Total number of throttling responses."
+    bytes_sent: int
+    "Total request body bytes sent."
+    bytes_received: int
+    "Total response body bytes received."
+    latency_p50: float
+    "Estimated median call latency in seconds."
+    latency_p90: float
+    "Estimated 90th percentile call latency in seconds."
+    latency_p99: float
+    "Estimated 99th percentile call latency in seconds."
+    latency_sum: float
+    "Sum of call latencies in seconds."
+    latency_buckets: Tuple[Tuple[float, int], ...]
+    "Cumulative count of calls at or below each bucket upper bound, ending with infinity."
+
+    @property
+    def throttle_rate(self) -> float:
+        "Fraction of attempts which were throttled."
+        return self.throttles / self.attempts if self.attempts else 0.0
+
+
+def _labels(snapshot: OperationSnapshot) -> str:
+    "Prometheus labels for an operation."
+    return (
+        f'service="{snapshot.service}",'
+        f'operation="{snapshot.operation}",'
+        f'region="{snapshot.region}"'
+    )
+
+
+class Metrics:
+    """
+    Aggregates trace events into metrics per service, operation and region.
+    Metrics is a Tracer, set it as Client.metrics or combine it with other tracers with awsync.tracing.combine.
+    """
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.bounds = tuple(sorted(bounds))
+        "Latency histogram bucket upper bounds in seconds."
+        self.operations: Dict[Tuple[str, str, str], OperationMetrics] = {}
+        "Metrics by service, operation and region."
+
+    def __call__(self, event: TraceEvent) -> None:
+        "Record a trace event, only call and send phases are recorded."
+        if event.phase != Phase.call and event.phase != Phase.send:
+            return
+        key = (event.service, event.operation, str(event.region))
+        metrics = self.operations.get(key)
+        if metrics is None:
+            metrics = self.operations[key] = OperationMetrics(self.bounds)
+        if event.phase == Phase.send:
+            metrics.attempts += 1
+            metrics.throttles += event.throttled
+            return
+        metrics.latency.record(event.duration)
+        metrics.calls += 1
+        metrics.errors += event.error is not None
+        metrics.retries += event.attempt
+        metrics.bytes_sent += event.bytes_sent
+        metrics.bytes_received += event.bytes_received
+
+    def snapshot(self) -> List[OperationSnapshot]:
+        "Returns a snapshot of the metrics of every operation."
+        snapshots = []
+        for (service, operation, region), metrics in self.operations.items():
+            cumulative = 0
+            buckets = []
+            for bound, count in zip(
+                self.bounds + (float("inf"),), metrics.latency.counts
+            ):
+                cumulative += count
+                buckets.append((bound, cumulative))
+            snapshots.append(
+                OperationSnapshot(
+                    service=service,
+                    operation=operation,
+                    region=region,
+                    calls=metrics.calls,
+                    errors=metrics.errors,
+                    retries=metrics.retries,
+                    attempts=metrics.attempts,
+                    throttles=metrics.throttles,
+                    bytes_sent=metrics.bytes_sent,
+                    bytes_received=metrics.bytes_received,
+                    latency_p50=metrics.latency.percentile(50),
+                    latency_p90=metrics.latency.percentile(90),
+                    latency_p99=metrics.latency.percentile(99),
+                    latency_sum=metrics.latency.sum,
+                    latency_buckets=tuple(buckets),
+                )
+            )
+        return snapshots
+
+    def prometheus(self, prefix: str = "awsync") -> str:
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        See: https://prometheus.io/docs/instrumenting/exposition_formats/
+        """
+        snapshots = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_call_duration_seconds Call latency including retries.",
+            f"# TYPE {prefix}_call_duration_seconds histogram",
+        ]
+        for snapshot in snapshots:
+            labels = _labels(snapshot)
+            for bound, count in snapshot.latency_buckets:
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f'{prefix}_call_duration_seconds_bucket{{{labels},le="{le}"}} {count}'
+                )
+            lines.append(
+                f"{prefix}_call_duration_seconds_sum{{{labels}}} {snapshot.latency_sum!r}"
+            )
+            lines.append(
+                f"{prefix}_call_duration_seconds_count{{{labels}}} {snapshot.calls}"
+            )
+        for name, attribute, help_text in (
+            ("calls_total", "calls", "Total number of calls."),
+            ("call_errors_total", "errors", "Total number of calls which failed."),
+            ("retries_total", "retries", "Total number of retries."),
+            ("attempts_total", "attempts", "Total number of attempts sent."),
+            ("throttles_total", "throttles", "Total number of throttling responses."),
+            ("sent_bytes_total", "bytes_sent", "Total request body bytes sent."),
+            (
+                "received_bytes_total",
+                "bytes_received",
+                "Total response body bytes received.",
+            ),
+        ):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for snapshot in snapshots:
+                lines.append(
+                    f"{prefix}_{name}{{{_labels(snapshot)}}} {getattr(snapshot, attribute)}"
+                )
+        return "\n".join(lines) + "\n"
@@ -2,6 +2,7 @@
 from awsync.models.strenum import StrEnum
 from dataclasses import dataclass, field
 from typing import Optional
+import datetime
 import os
 
 
@@ -14,6 +15,8 @@ class Credentials:
     "The Secret Access Key."
     session_token: Optional[str] = None
     "(Optional) The session security token if using temporary credentials."
+    expiration: Optional[datetime.datetime] = None
+    "(Optional) When temporary credentials expire, used to refresh them ahead of expiration."
 
     @classmethod
     def from_environment(cls) -> "Credentials":
@@ -0,0 +1,75 @@
+"Async iteration over paginated AWS API results."
+import asyncio
+from contextlib import suppress
+from typing import (
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+T = TypeVar("T")
+
+Page = Tuple[List[T], Optional[str]]
+"A page of items and the token for the next page, None if it is the last page."
+
+PageFetcher = Callable[[Optional[str]], Awaitable[Page[T]]]
+"A callable that fetches the page for a pagination token, None for the first page."
+
+
+async def paginate(
+    fetch_page: PageFetcher[T],
+    next_token: Optional[str] = None,
+    prefetch: int = 0,
+) -> AsyncGenerator[List[T], None]:
+    """
+    Yields pages of items until there is no next page token.
+    If prefetch is greater than 0, pages are fetched ahead in a background task
+    while the consumer processes the current page: up to prefetch fetched pages are buffered
+    plus one more page fetch in flight, so at most prefetch + 1 pages ahead of the consumer.
+    The generator should be closed (ie. with contextlib.aclosing) if the consumer stops early,
+    closing it cancels any in-flight fetch.
+    """
+    if prefetch < 1:
+        while True:
+            items, next_token = await fetch_page(next_token)
+            yield items
+            if not next_token:
+                return
+
+    # A None entry marks the end of pagination.
+    queue: "asyncio.Queue[Optional[Union[List[T], BaseException]]]" = asyncio.Queue(
+        maxsize=prefetch
+    )
+
+    async def producer(token: Optional[str]) -> None:
+        "Fetches pages in order, the bounded queue limits the look-ahead."
+        try:
+            while True:
+                items, token = await fetch_page(token)
+                await queue.put(items)
+                if not token:
+                    break
+        except Exception as exc:  # Re-raised in the consumer.
+            await queue.put(exc)
+            return
+        await queue.put(None)
+
+    task = asyncio.create_task(producer(next_token))
+    try:
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                return
+            if isinstance(entry, BaseException):
+                raise entry
+            yield entry
+    finally:
+        # Stop fetching if the consumer stops early or fails.
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
@@ -0,0 +1,152 @@
+"""
+Per-host connection pools.
+Each host (ie. cloudformation.us-east-1.amazonaws.com) gets its own httpx AsyncClient and connection pool,
+so requests to different services and regions do not compete for the same connections.
+"""
+
+from dataclasses import dataclass
+from types import TracebackType
+from typing import Callable, Dict, Optional, Type
+
+from httpx import (
+    AsyncBaseTransport,
+    AsyncClient,
+    AsyncHTTPTransport,
+    Limits,
+    Request as HttpxRequest,
+    Response as HttpxResponse,
+    Timeout,
+)
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    "Connection pool settings applied to each host."
+    max_connections: Optional[int] = 100
+    "Maximum number of concurrent connections per host, None for no limit."
+    max_keepalive_connections: Optional[int] = 20
+    "Maximum number of idle connections kept alive per host, None for no limit."
+    keepalive_expiry: Optional[float] = 5.0
+    "Seconds an idle connection is kept alive."
+    http2: bool = False
+    """
+    Use HTTP/2 where supported, multiplexing concurrent requests over a single connection.
+    Requires the h2 package, ie. pip install httpx[http2].
+    """
+    timeout: float = 5.0
+    "Default timeout in seconds for connecting, reading, writing and waiting for a pooled connection."
+
+
+@dataclass(frozen=True)
+class PoolStats:
+    "A snapshot of request statistics for a host's connection pool."
+    requests: int
+    "Total number of requests sent."
+    errors: int
+    "Total number of requests which failed without a response, ie. connection errors and timeouts."
+    in_flight: int
+    "Number of requests currently waiting for response headers."
+    peak_in_flight: int
+    "Highest number of requests waiting for response headers at the same time."
+
+
+def _http_transport(config: PoolConfig) -> AsyncBaseTransport:
+    "Creates an httpx transport with its own connection pool."
+    return AsyncHTTPTransport(
+        limits=Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive_connections,
+            keepalive_expiry=config.keepalive_expiry,
+        ),
+        http2=config.http2,
+    )
+
+
+class _CountingTransport(AsyncBaseTransport):
+    "Wraps a transport, counting requests for pool statistics."
+
+    def __init__(self, transport: AsyncBaseTransport) -> None:
+        self.transport = transport
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def handle_async_request(self, request: HttpxRequest) -> HttpxResponse:
+        "Send a request with the wrapped transport."
+        self.requests += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return await self.transport.handle_async_request(request)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    async def aclose(self) -> None:
+        "Close the wrapped transport."
+        await self.transport.aclose()
+
+
+class ConnectionPools:
+    """
+    Lazily created httpx AsyncClients with a connection pool per host.
+    Should be closed when no longer used, ie. with async with.
+    """
+
+    def __init__(
+        self,
+        config: PoolConfig = PoolConfig(),
+        transport_factory: Callable[[PoolConfig], AsyncBaseTransport] = _http_transport,
+    ) -> None:
+        self.config = config
+        "Connection pool settings applied to each host."
+        self.transport_factory = transport_factory
+        "A callable creating the transport for a new host, ie. to use a mock transport."
+        self._clients: Dict[str, AsyncClient] = {}
+        self._transports: Dict[str, _CountingTransport] = {}
+
+    def client(self, host: str) -> AsyncClient:
+        "Returns the httpx AsyncClient for a host, creating it if needed."
+        httpx_client = self._clients.get(host)
+        if httpx_client is None:
+            transport = self._transports[host] = _CountingTransport(
+                self.transport_factory(self.config)
+            )
+            httpx_client = self._clients[host] = AsyncClient(
+                transport=transport, timeout=Timeout(self.config.timeout)
+            )
+        return httpx_client
+
+    def stats(self) -> Dict[str, PoolStats]:
+        "Returns a snapshot of request statistics by host."
+        return {
+            host: PoolStats(
+                requests=transport.requests,
+                errors=transport.errors,
+                in_flight=transport.in_flight,
+                peak_in_flight=transport.peak_in_flight,
+            )
+            for host, transport in self._transports.items()
+        }
+
+    async def aclose(self) -> None:
+        "Close every host's connection pool."
+        clients = list(self._clients.values())
+        self._clients.clear()
+        self._transports.clear()
+        for httpx_client in clients:
+            await httpx_client.aclose()
+
+    async def __aenter__(self) -> "ConnectionPools":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        await self.aclose()
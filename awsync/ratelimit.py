@@ -0,0 +1,157 @@
+"""
+Adaptive client-side rate limiting.
+Modeled after the AWS SDKs "adaptive" retry mode: a token bucket per service and region
+which is only enabled once a throttling response is received, lowers its fill rate on throttling
+and ramps back up on success using CUBIC congestion control.
+See: https://docs.aws.amazon.com/sdkref/latest/guide/feature-retry-behavior.html
+"""
+
+import asyncio
+from dataclasses import dataclass
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class RateLimitConfig:
+    "Tuning parameters for adaptive token buckets."
+    min_rate: float = 0.5
+    "Minimum fill rate in requests per second."
+    beta: float = 0.7
+    "Multiplicative decrease factor applied to the fill rate on throttling."
+    scale: float = 0.4
+    "CUBIC scale constant controlling how quickly the fill rate ramps back up."
+    smoothing: float = 0.8
+    "Weight of the most recent interval in the measured request rate."
+    interval: float = 0.5
+    "Length in seconds of the interval used to measure the request rate."
+
+
+class AdaptiveTokenBucket:
+    """
+    A token bucket whose fill rate adapts to throttling responses.
+    Does not limit requests until the first throttling response is recorded.
+    """
+
+    def __init__(
+        self,
+        config: RateLimitConfig = RateLimitConfig(),
+        monotonic: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.config = config
+        "Tuning parameters."
+        self.monotonic = monotonic
+        "A zero argument callable returning a monotonic time in seconds."
+        self.enabled = False
+        "If the bucket is limiting requests, set when the first throttling response is recorded."
+        self.fill_rate = 0.0
+        "Current fill rate in requests per second."
+        self.measured_rate = 0.0
+        "Smoothed measured rate of responses per second."
+        self.throttles = 0
+        "Total number of throttling responses recorded."
+        self._tokens = 0.0
+        self._capacity = 0.0
+        self._last_refill: Optional[float] = None
+        self._last_max_rate = 0.0
+        self._last_throttle_time = monotonic()
+        self._interval_start = monotonic()
+        self._interval_count = 0
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        "Add tokens for the time elapsed since the last refill."
+        now = self.monotonic()
+        if self._last_refill is not None:
+            elapsed = now - self._last_refill
+            self._tokens = min(self._capacity, self._tokens + elapsed * self.fill_rate)
+        self._last_refill = now
+
+    def _set_fill_rate(self, rate: float) -> None:
+        "Set the fill rate, refilling tokens at the old rate first."
+        self._refill()
+        self.fill_rate = max(rate, self.config.min_rate)
+        self._capacity = max(self.fill_rate, 1.0)
+        self._tokens = min(self._tokens, self._capacity)
+
+    def _measure(self, now: float) -> None:
+        "Update the smoothed measured request rate."
+        self._interval_count += 1
+        elapsed = now - self._interval_start
+        if elapsed >= self.config.interval:
+            rate = self._interval_count / elapsed
+            self.measured_rate = (
+                self.config.smoothing * rate
+                + (1 - self.config.smoothing) * self.measured_rate
+            )
+            self._interval_count = 0
+            self._interval_start = now
+
+    async def acquire(self) -> float:
+        "Waits until a token is available, returns the number of seconds spent waiting."
+        if not self.enabled:
+            return 0.0
+        waited = 0.0
+        async with self._lock:  # Serve waiters in order.
+            self._refill()
+            if self._tokens < 1:
+                # Sleep once for the shortfall rather than re-checking the balance,
+                # floating point error may leave it a hair below 1 after refilling.
+                waited = (1 - self._tokens) / self.fill_rate
+                await asyncio.sleep(waited)
+                self._refill()
+            # May go marginally negative, the next waiter sleeps for the difference.
+            self._tokens -= 1
+        return waited
+
+    def update(self, throttled: bool) -> None:
+        "Record a response, lowering the fill rate if throttled or ramping it up otherwise."
+        now = self.monotonic()
+        self._measure(now)
+        if throttled:
+            self.throttles += 1
+            rate = (
+                min(self.measured_rate, self.fill_rate)
+                if self.enabled
+                else self.measured_rate
+            )
+            self._last_max_rate = rate
+            self._last_throttle_time = now
+            self.enabled = True
+            self._set_fill_rate(rate * self.config.beta)
+        elif self.enabled:
+            # CUBIC window growth, see: https://www.rfc-editor.org/rfc/rfc8312
+            k = (self._last_max_rate * (1 - self.config.beta) / self.config.scale) ** (
+                1 / 3
+            )
+            cubic_rate = (
+                self.config.scale * (now - self._last_throttle_time - k) ** 3
+                + self._last_max_rate
+            )
+            self._set_fill_rate(min(cubic_rate, 2 * self.measured_rate))
+
+
+class AdaptiveRateLimiter:
+    "Adaptive token buckets keyed by service and region, shared by all requests of a Client."
+
+    def __init__(
+        self,
+        config: RateLimitConfig = RateLimitConfig(),
+        monotonic: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.config = config
+        "Tuning parameters for new buckets."
+        self.monotonic = monotonic
+        "A zero argument callable returning a monotonic time in seconds."
+        self.buckets: Dict[Tuple[str, str], AdaptiveTokenBucket] = {}
+        "Token buckets by service and region."
+
+    def bucket(self, service: str, region: str) -> AdaptiveTokenBucket:
+        "Returns the token bucket for a service and region, creating it if needed."
+        key = (service, str(region))
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = AdaptiveTokenBucket(
+                config=self.config, monotonic=self.monotonic
+            )
+        return bucket
@@ -3,22 +3,52 @@ Signs Requests with AWS Signature V4 for Authorizing AWS API calls.
 See: https://docs.aws.amazon.com/IAM/latest/UserGuide/create-signed-request.html
 """
 
-from dataclasses import dataclass, field
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
 from datetime import datetime
+from functools import lru_cache
 import hashlib
 import hmac
-import json
-from typing import Any, Dict, NewType, Optional
-from urllib.parse import quote
+import re
+import threading
+from typing import Any, Dict, Iterable, List, NewType, Optional, Tuple, Union
 from hashlib import sha256
 
+from awsync.codec import JsonCodec, stdlib_json_codec
 from awsync.models.http import Method, Scheme
 from awsync.models.aws import Credentials, Region
 
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+"The payload hash of presigned URLs, the body is not signed."
+MAX_PRESIGN_EXPIRES = 7 * 24 * 60 * 60
+"The maximum number of seconds a presigned URL is valid for."
+
 Date = NewType("Date", str)
 Timestamp = NewType("Timestamp", str)
-
-
+Body = Union[bytes, str, Dict[str, Any]]
+"A request body (payload) as raw bytes, a string or JSON serializable key/value pairs."
+
+
+_UNRESERVED = re.compile(r"[A-Za-z0-9\-_.~]*")
+"Matches strings which are unchanged by URI encoding."
+_UNRESERVED_PATH = re.compile(r"[A-Za-z0-9\-_.~/]*")
+"Matches paths which are unchanged by URI encoding."
+_ENCODED_BYTES = tuple(
+    chr(byte) if _UNRESERVED.fullmatch(chr(byte)) else f"%{byte:02X}"
+    for byte in range(256)
+)
+"The URI encoding of every byte."
+_ENCODED_BYTES_PATH = tuple(
+    "/" if byte == ord("/") else encoded for byte, encoded in enumerate(_ENCODED_BYTES)
+)
+"The URI encoding of every byte except '/'."
+_ENCODED_ASCII = {byte: encoded for byte, encoded in enumerate(_ENCODED_BYTES[:128])}
+"str.translate table URI encoding every ASCII character."
+_ENCODED_ASCII_PATH = {**_ENCODED_ASCII, ord("/"): "/"}
+"str.translate table URI encoding every ASCII character except '/'."
+
+
+@lru_cache(maxsize=1024)
 def _uri_encode(string: str, is_path: bool = False) -> str:
     """
     URI encode every byte.
@@ -30,11 +60,15 @@ def _uri_encode(string: str, is_path: bool = False) -> str:
     - Each URI encoded byte is formed by a '%' and the two-digit hexadecimal value of the byte.
     - Letters in the hexadecimal value must be uppercase, for example "%1A".
     - Encode the forward slash character, '/', everywhere except in the object key name (request path). For example, if the object key name is photos/Jan/sample.jpg, the forward slash in the key name is not encoded.
+
+    Results are memoized, as parameter names and values such as Action and Version repeat between requests.
     """
-    unreserved_characters = "-_.~"
-    if is_path:
-        unreserved_characters += "/"
-    return quote(string, safe=unreserved_characters)
+    if (_UNRESERVED_PATH if is_path else _UNRESERVED).fullmatch(string):
+        return string
+    if string.isascii():
+        return string.translate(_ENCODED_ASCII_PATH if is_path else _ENCODED_ASCII)
+    table = _ENCODED_BYTES_PATH if is_path else _ENCODED_BYTES
+    return "".join([table[byte] for byte in string.encode()])
 
 
 def _sha_hash(string: str) -> str:
@@ -42,6 +76,12 @@ def _sha_hash(string: str) -> str:
     return sha256(string.encode()).hexdigest()
 
 
+@lru_cache(maxsize=1024)
+def _encode_parameter(name: str, value: str) -> str:
+    "A URI encoded query string parameter, memoized as constant parameters such as Action=ListStackResources repeat."
+    return f"{_uri_encode(name)}={_uri_encode(value)}"
+
+
 def _get_query_string(query: Optional[Dict[str, str]]) -> str:
     """
     The URI-encoded query string parameters.
@@ -52,9 +92,7 @@ def _get_query_string(query: Optional[Dict[str, str]]) -> str:
     """
     if not query:
         return ""
-    return "&".join(
-        sorted([f"{_uri_encode(k)}={_uri_encode(v)}" for k, v in query.items()])
-    )
+    return "&".join(sorted([_encode_parameter(k, v) for k, v in query.items()]))
 
 
 def _get_canonical_headers(
@@ -88,10 +126,23 @@ def _get_canonical_headers(
     return canonical_headers
 
 
-def _get_payload_hash(body: Optional[Dict[str, Any]]) -> str:
+def _serialize_body(
+    body: Optional[Body], codec: JsonCodec = stdlib_json_codec
+) -> Optional[bytes]:
+    """
+    The exact bytes sent as the HTTP request payload.
+    Bytes are passed through unchanged, strings are UTF-8 encoded and key/value pairs are serialized with the JSON codec.
+    """
+    if body is None or isinstance(body, bytes):
+        return body
+    if isinstance(body, str):
+        return body.encode()
+    return codec.dumps(body)
+
+
+def _get_payload_hash(body: Optional[Body]) -> str:
     "A string created using the payload in the body of the HTTP request as input to a hash function. This string uses lowercase hexadecimal characters. If there is no payload in the request, you compute a hash of the empty string ('')."
-    payload = json.dumps(body) if body else ""
-    return _sha_hash(payload)
+    return sha256(_serialize_body(body) or b"").hexdigest()
 
 
 def _get_canonical_request(
@@ -158,6 +209,83 @@ def _get_signing_key(
     return k_signing
 
 
+class SigningKeyCache:
+    """
+    A bounded least recently used (LRU) cache of derived signing keys.
+    Signing keys only change per credentials, date, region and service so they can be reused across requests.
+
+    - Entries are keyed on access key ID, date, region and service.
+    - All entries are dropped when the UTC date rolls over.
+    - Entries for an access key ID are dropped when its secret access key changes (credential rotation).
+      Only a SHA256 digest of the secret access key is stored to detect rotation.
+    - A maxsize of 0 disables caching.
+
+    Safe to share between threads, all operations are guarded by a lock.
+    """
+
+    def __init__(self, maxsize: int = 128) -> None:
+        self.maxsize = maxsize
+        "Maximum number of signing keys to store."
+        self._date: Optional[Date] = None
+        self._keys: "OrderedDict[Tuple[str, Date, str, str], Tuple[bytes, bytes]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def clear(self) -> None:
+        "Remove all cached signing keys."
+        with self._lock:
+            self._keys.clear()
+            self._date = None
+
+    def invalidate(self, credentials: Credentials) -> None:
+        "Remove all cached signing keys for the credentials access key ID, ie. after rotating credentials."
+        with self._lock:
+            self._invalidate(credentials.access_key_id)
+
+    def _invalidate(self, access_key_id: str) -> None:
+        "Remove all cached signing keys for an access key ID, the lock must be held."
+        for key in [k for k in self._keys if k[0] == access_key_id]:
+            del self._keys[key]
+
+    def get_signing_key(
+        self, credentials: Credentials, date: Date, region: Region, service: str
+    ) -> bytes:
+        "Returns the cached signing key if present, otherwise derives and caches a new signing key."
+        secret_digest = sha256(credentials.secret_access_key.encode()).digest()
+        key = (credentials.access_key_id, date, str(region), service)
+        with self._lock:
+            if self._date is None or date > self._date:
+                # UTC date rolled over, all existing keys are stale.
+                self._keys.clear()
+                self._date = date
+            cached = self._keys.get(key)
+            if cached is not None:
+                cached_digest, signing_key = cached
+                if hmac.compare_digest(cached_digest, secret_digest):
+                    self._keys.move_to_end(key)
+                    return signing_key
+                # Credentials were rotated, drop every key derived from the old secret.
+                self._invalidate(credentials.access_key_id)
+        signing_key = _get_signing_key(
+            credentials=credentials, date=date, region=region, service=service
+        )
+        with self._lock:
+            # Keys for a previous date (ie. a lagging clock) are not worth caching.
+            if self.maxsize > 0 and date == self._date:
+                self._keys[key] = (secret_digest, signing_key)
+                if len(self._keys) > self.maxsize:
+                    self._keys.popitem(last=False)
+        return signing_key
+
+
+default_signing_key_cache = SigningKeyCache()
+"The signing key cache shared by default between Request.sign() and Client instances."
+
+
 def _get_authorization_header(
     signing_key: bytes,
     string_to_sign: str,
@@ -214,8 +342,12 @@ class Request:
     "The fully qualified domain name (FQDN)."
     scheme: Scheme = Scheme.https
     "The HTTP scheme."
-    body: Optional[Dict[str, Any]] = None
-    "(Optional) Body (payload) as key/value pairs, values must be serializable by json.dumps()."
+    body: Optional[Body] = None
+    """
+    (Optional) Body (payload) as raw bytes, a string or key/value pairs which must be serializable by json.dumps().
+    To use a faster JSON codec serialize key/value pairs to bytes before creating the Request.
+    sign() serializes the body once and the signed Request carries the exact bytes that were hashed.
+    """
     path: str = "/"
     "The URI-encoded version of the absolute path component URI, starting with the '/' that follows the domain name and up to the end of the string or to the question mark character ('?') if you have query string parameters. If the absolute path is empty, use a forward slash character (/)."
     query: Optional[Dict[str, str]] = None
@@ -235,15 +367,39 @@ class Request:
         "Returns constructed URL as a string."
         return f"{self.scheme}://{self.host}{self.path}"
 
-    def sign(self, utc_now: datetime, service: str, region: Region) -> "Request":
-        "Main public method - returns a new, signed version of the original Request."
+    @property
+    def content(self) -> Optional[bytes]:
+        "The body as the bytes to send, a passthrough once the Request is signed."
+        return _serialize_body(self.body)
+
+    def sign(
+        self,
+        utc_now: datetime,
+        service: str,
+        region: Region,
+        signing_key_cache: Optional[SigningKeyCache] = default_signing_key_cache,
+        payload_hash: Optional[str] = None,
+    ) -> "Request":
+        """
+        Main public method - returns a new, signed version of the original Request.
+        Derived signing keys are reused from signing_key_cache, set to None to disable caching.
+        If payload_hash is given it is signed instead of the hash of the body,
+        ie. UNSIGNED_PAYLOAD, or the hash of a payload sent separately from the Request.
+        """
+        # Serialize the body once, the signed Request sends exactly the hashed bytes.
+        serialized = (
+            self
+            if self.body is None or isinstance(self.body, bytes)
+            else replace(self, body=_serialize_body(self.body))
+        )
         # Prepare common variables
         date = Date(utc_now.strftime("%Y%m%d"))  # YYYYMMDD
         iso_8601_timestamp = Timestamp(
             utc_now.strftime("%Y%m%dT%H%M%SZ")  # YYYYMMDDTHHMMSSZ
         )
         query_string = _get_query_string(query=self.query)
-        payload_hash = _get_payload_hash(body=self.body)
+        if payload_hash is None:
+            payload_hash = _get_payload_hash(body=serialized.body)
         canonical_headers = _get_canonical_headers(
             credentials=self.credentials,
             host=self.host,
@@ -265,12 +421,20 @@ class Request:
             iso_8601_timestamp=iso_8601_timestamp,
             canonical_request=canonical_request,
         )
-        signing_key = _get_signing_key(
-            credentials=self.credentials,
-            date=date,
-            region=region,
-            service=service,
-        )
+        if signing_key_cache is None:
+            signing_key = _get_signing_key(
+                credentials=self.credentials,
+                date=date,
+                region=region,
+                service=service,
+            )
+        else:
+            signing_key = signing_key_cache.get_signing_key(
+                credentials=self.credentials,
+                date=date,
+                region=region,
+                service=service,
+            )
         authorization_header = _get_authorization_header(
             signing_key=signing_key,
             string_to_sign=string_to_sign,
@@ -279,8 +443,263 @@ class Request:
             canonical_headers=canonical_headers,
         )
         request = _get_signed_request(
-            request=self,
+            request=serialized,
             authorization_header=authorization_header,
             canonical_headers=canonical_headers,
         )
         return request
+
+    def presign(
+        self,
+        utc_now: datetime,
+        service: str,
+        region: Region,
+        expires: int = 3600,
+        payload_hash: str = UNSIGNED_PAYLOAD,
+        signing_key_cache: Optional[SigningKeyCache] = default_signing_key_cache,
+    ) -> str:
+        """
+        Returns a presigned URL for the Request, valid for expires seconds (at most 7 days).
+        Use Signer.presign_many() to presign many requests.
+        """
+        return Signer(service, region, signing_key_cache).presign(
+            self, utc_now=utc_now, expires=expires, payload_hash=payload_hash
+        )
+
+
+def _check_expires(expires: int) -> None:
+    "Raise ValueError if a presigned URL expiry is out of range."
+    if not 1 <= expires <= MAX_PRESIGN_EXPIRES:
+        raise ValueError(
+            f"Presigned URL expires must be between 1 and {MAX_PRESIGN_EXPIRES} seconds, got {expires}."
+        )
+
+
+class Signer:
+    """
+    Signs batches of requests for a service and region with AWS Signature V4.
+    Work shared by requests signed with the same credentials in the same second is done once:
+    formatting the date and timestamp, the scope, the signing key and sorting the signed header names.
+    Produces the same signed requests as Request.sign(), without modifying the original requests.
+    Not safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        service: str,
+        region: Region,
+        signing_key_cache: Optional[SigningKeyCache] = default_signing_key_cache,
+    ) -> None:
+        self.service = service
+        "The service requests are signed for."
+        self.region = region
+        "The region requests are signed for."
+        self.signing_key_cache = signing_key_cache
+        "The cache of derived signing keys shared with other signers, set to None to disable caching."
+        self._second: Optional[datetime] = None
+        self._date = Date("")
+        self._timestamp = Timestamp("")
+        self._scope = ""
+        self._credentials: Optional[Credentials] = None
+        self._signing_key = b""
+        self._credential_scope = ""
+        self._credential = ""
+        self._signed_headers: Dict[Tuple[str, ...], Tuple[Tuple[str, ...], str]] = {}
+
+    def _set_time(self, utc_now: datetime) -> None:
+        "Format the date, timestamp and scope when the second changes."
+        second = utc_now.replace(microsecond=0)
+        if second == self._second:
+            return
+        self._second = second
+        self._timestamp = Timestamp(utc_now.strftime("%Y%m%dT%H%M%SZ"))
+        date = Date(self._timestamp[:8])
+        if date != self._date:
+            self._date = date
+            self._scope = f"{date}/{self.region}/{self.service}/aws4_request"
+            self._credentials = None  # The signing key is derived from the date.
+
+    def _set_credentials(self, credentials: Credentials) -> None:
+        "Derive the signing key when the credentials change."
+        if credentials == self._credentials:
+            return
+        if self.signing_key_cache is None:
+            self._signing_key = _get_signing_key(
+                credentials=credentials,
+                date=self._date,
+                region=self.region,
+                service=self.service,
+            )
+        else:
+            self._signing_key = self.signing_key_cache.get_signing_key(
+                credentials=credentials,
+                date=self._date,
+                region=self.region,
+                service=self.service,
+            )
+        self._credentials = credentials
+        self._credential_scope = f"{credentials.access_key_id}/{self._scope}"
+        self._credential = f"AWS4-HMAC-SHA256 Credential={self._credential_scope}"
+
+    def _get_signed_headers(
+        self, canonical_headers: Dict[str, str]
+    ) -> Tuple[Tuple[str, ...], str]:
+        "The canonical header names in canonical order and the signed headers string, cached by header names."
+        names = tuple(canonical_headers)
+        signed_headers = self._signed_headers.get(names)
+        if signed_headers is None:
+            if len(self._signed_headers) >= 64:
+                self._signed_headers.clear()
+            signed_headers = self._signed_headers[names] = (
+                tuple(sorted(names, key=lambda name: name.lower() + ":")),
+                ";".join(sorted(name.lower() for name in names)),
+            )
+        return signed_headers
+
+    def _signature(
+        self,
+        method: Method,
+        path: str,
+        query_string: str,
+        canonical_headers: Dict[str, str],
+        payload_hash: str,
+    ) -> Tuple[str, str]:
+        "The signed headers string and the signature of a canonical request."
+        order, signed_headers = self._get_signed_headers(canonical_headers)
+        canonical_request = "\n".join(
+            (
+                method,
+                path,
+                query_string,
+                *[
+                    f"{name.lower()}:{canonical_headers[name].strip()}"
+                    for name in order
+                ],
+                "",
+                signed_headers,
+                payload_hash,
+            )
+        )
+        string_to_sign = (
+            f"AWS4-HMAC-SHA256\n{self._timestamp}\n{self._scope}\n"
+            f"{_sha_hash(canonical_request)}"
+        )
+        signature = hmac.new(
+            self._signing_key, string_to_sign.encode(), hashlib.sha256
+        ).hexdigest()
+        return signed_headers, signature
+
+    def _sign(self, request: Request) -> Request:
+        "Sign a request with the current time and credentials."
+        body = (
+            request.body
+            if request.body is None or isinstance(request.body, bytes)
+            else _serialize_body(request.body)
+        )
+        canonical_headers = _get_canonical_headers(
+            credentials=request.credentials,
+            host=request.host,
+            headers=request.headers,
+            iso_8601_timestamp=self._timestamp,
+        )
+        signed_headers, signature = self._signature(
+            method=request.method,
+            path=_uri_encode(request.path, is_path=True),
+            query_string=_get_query_string(request.query),
+            canonical_headers=canonical_headers,
+            payload_hash=sha256(body or b"").hexdigest(),
+        )
+        return Request(
+            credentials=request.credentials,
+            method=request.method,
+            host=request.host,
+            scheme=request.scheme,
+            body=body,
+            path=request.path,
+            query=request.query,
+            headers={
+                **request.headers,
+                "Authorization": f"{self._credential},SignedHeaders={signed_headers},Signature={signature}",
+                **canonical_headers,
+            },
+        )
+
+    def _presign(self, request: Request, expires: int, payload_hash: str) -> str:
+        "Presign a request with the current time and credentials."
+        canonical_headers = {
+            k: v
+            for k, v in request.headers.items()
+            if k.lower() == "content-type" or k.lower().startswith("x-amz-")
+        }
+        canonical_headers["Host"] = request.host
+        # The signed headers only depend on the header names, so are known before signing.
+        _, signed_headers = self._get_signed_headers(canonical_headers)
+        query = dict(request.query) if request.query else {}
+        query["X-Amz-Algorithm"] = "AWS4-HMAC-SHA256"
+        query["X-Amz-Credential"] = self._credential_scope
+        query["X-Amz-Date"] = self._timestamp
+        query["X-Amz-Expires"] = str(expires)
+        query["X-Amz-SignedHeaders"] = signed_headers
+        if request.credentials.session_token:
+            query["X-Amz-Security-Token"] = request.credentials.session_token
+        path = _uri_encode(request.path, is_path=True)
+        query_string = _get_query_string(query)
+        _, signature = self._signature(
+            method=request.method,
+            path=path,
+            query_string=query_string,
+            canonical_headers=canonical_headers,
+            payload_hash=payload_hash,
+        )
+        return f"{request.scheme}://{request.host}{path}?{query_string}&X-Amz-Signature={signature}"
+
+    def sign(self, request: Request, utc_now: datetime) -> Request:
+        "Returns a new, signed version of a request."
+        self._set_time(utc_now)
+        self._set_credentials(request.credentials)
+        return self._sign(request)
+
+    def sign_many(
+        self, requests: Iterable[Request], utc_now: datetime
+    ) -> List[Request]:
+        "Returns new, signed versions of requests, all signed with the same time."
+        self._set_time(utc_now)
+        signed = []
+        for request in requests:
+            self._set_credentials(request.credentials)
+            signed.append(self._sign(request))
+        return signed
+
+    def presign(
+        self,
+        request: Request,
+        utc_now: datetime,
+        expires: int = 3600,
+        payload_hash: str = UNSIGNED_PAYLOAD,
+    ) -> str:
+        """
+        Returns a presigned URL for a request, valid for expires seconds (at most 7 days).
+        The signature is in the query string, only the Host, Content-Type and X-Amz-* headers are signed
+        and must be sent with the URL, the body is not signed unless its payload_hash is given.
+        See: https://docs.aws.amazon.com/AmazonS3/latest/API/sigv4-query-string-auth.html
+        """
+        _check_expires(expires)
+        self._set_time(utc_now)
+        self._set_credentials(request.credentials)
+        return self._presign(request, expires, payload_hash)
+
+    def presign_many(
+        self,
+        requests: Iterable[Request],
+        utc_now: datetime,
+        expires: int = 3600,
+        payload_hash: str = UNSIGNED_PAYLOAD,
+    ) -> List[str]:
+        "Returns presigned URLs for requests, all signed with the same time."
+        _check_expires(expires)
+        self._set_time(utc_now)
+        urls = []
+        for request in requests:
+            self._set_credentials(request.credentials)
+            urls.append(self._presign(request, expires, payload_hash))
+        return urls
@@ -0,0 +1,108 @@
+"""
+Retry backoff strategies and client-wide retry budgets.
+See: https://aws.amazon.com/blogs/architecture/exponential-backoff-and-jitter/
+"""
+
+from dataclasses import dataclass
+import random
+from typing import Callable, Protocol
+
+
+class BackoffStrategy(Protocol):
+    "A strategy for how long to sleep before a retry."
+
+    def delay(self, attempt: int, previous_delay: float) -> float:
+        """
+        Returns the number of seconds to sleep before retry number attempt (starting at 1).
+        previous_delay is the delay returned for the previous retry, 0 before the first retry.
+        """
+
+
+@dataclass(frozen=True)
+class ExponentialBackoff:
+    "Exponential backoff without jitter, sleeps base * 2^attempt seconds."
+    base: float = 1.0
+    "Base delay in seconds."
+    cap: float = 20.0
+    "Maximum delay in seconds."
+
+    def delay(self, attempt: int, previous_delay: float) -> float:
+        "Returns the capped exponential delay."
+        return float(min(self.cap, self.base * 2**attempt))
+
+
+@dataclass(frozen=True)
+class FullJitterBackoff:
+    "Exponential backoff with full jitter, sleeps a random time between 0 and base * 2^attempt seconds."
+    base: float = 1.0
+    "Base delay in seconds."
+    cap: float = 20.0
+    "Maximum delay in seconds."
+    uniform: Callable[[float, float], float] = random.uniform
+    "A callable returning a random float between two bounds."
+
+    def delay(self, attempt: int, previous_delay: float) -> float:
+        "Returns a random delay up to the capped exponential delay."
+        return self.uniform(0, min(self.cap, self.base * 2**attempt))
+
+
+@dataclass(frozen=True)
+class DecorrelatedJitterBackoff:
+    "Decorrelated jitter, sleeps a random time between base and 3 times the previous delay."
+    base: float = 1.0
+    "Base (minimum) delay in seconds."
+    cap: float = 20.0
+    "Maximum delay in seconds."
+    uniform: Callable[[float, float], float] = random.uniform
+    "A callable returning a random float between two bounds."
+
+    def delay(self, attempt: int, previous_delay: float) -> float:
+        "Returns a random delay based on the previous delay."
+        return min(
+            self.cap, self.uniform(self.base, max(self.base, previous_delay * 3))
+        )
+
+
+class RetryBudget:
+    """
+    A client-wide token bucket limiting retries.
+    Each retry spends retry_cost tokens and each successful request refunds tokens,
+    so when the error rate spikes the budget runs dry and requests fail fast instead of retrying.
+    """
+
+    def __init__(
+        self, capacity: int = 500, retry_cost: int = 5, success_refund: int = 1
+    ) -> None:
+        self.capacity = capacity
+        "Maximum number of tokens."
+        self.retry_cost = retry_cost
+        "Tokens spent per retry."
+        self.success_refund = success_refund
+        "Tokens refunded by a request which succeeded without retries."
+        self.tokens = capacity
+        "Currently available tokens."
+        self.retries = 0
+        "Total number of retries allowed by the budget."
+        self.tokens_spent = 0
+        "Total number of tokens spent on retries."
+        self.rejected = 0
+        "Total number of retries rejected because the budget was exhausted."
+
+    def acquire(self) -> bool:
+        "Spends tokens for a retry, returns False if the budget is exhausted."
+        if self.tokens < self.retry_cost:
+            self.rejected += 1
+            return False
+        self.tokens -= self.retry_cost
+        self.tokens_spent += self.retry_cost
+        self.retries += 1
+        return True
+
+    def release(self, retries: int) -> None:
+        """
+        Refunds tokens after a successful request.
+        Refunds the cost of the final (successful) retry or success_refund if no retries were made,
+        so requests which only succeed after several retries still drain the budget.
+        """
+        refund = self.retry_cost if retries else self.success_refund
+        self.tokens = min(self.capacity, self.tokens + refund)
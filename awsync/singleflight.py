@@ -0,0 +1,68 @@
+"""
+Single-flight de-duplication of identical concurrent calls.
+Concurrent calls with the same key share one underlying call and its result or exception.
+"""
+
+import asyncio
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call:
+    "An underlying call and the number of callers waiting for it."
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Future[Any]") -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one underlying call.
+    Cancelling a caller only cancels its wait, the underlying call is cancelled
+    once every caller waiting for it has been cancelled.
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        "Total number of underlying calls made."
+        self.shared = 0
+        "Total number of callers which shared an underlying call already in flight."
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        "Stop sharing a call, so later callers make a new underlying call."
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def _done(self, key: Hashable, call: _Call, task: "asyncio.Future[Any]") -> None:
+        "Forget a completed call, retrieving its exception if no caller is waiting for it."
+        self._forget(key, call)
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: Hashable, function: Callable[[], Awaitable[T]]) -> T:
+        "Await function(), or the call in flight for the same key."
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = _Call(asyncio.ensure_future(function()))
+            call.task.add_done_callback(partial(self._done, key, call))
+            self.calls += 1
+        else:
+            self.shared += 1
+        call.waiters += 1
+        try:
+            result: T = await asyncio.shield(call.task)
+            return result
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                self._forget(key, call)
+                call.task.cancel()
@@ -0,0 +1,357 @@
+"""
+Streaming uploads which run in constant memory.
+Payloads are either signed in chunks as they are sent, see: https://docs.aws.amazon.com/AmazonS3/latest/API/sigv4-streaming.html
+or read from memory or files and hashed incrementally before they are sent.
+"""
+
+import asyncio
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from datetime import datetime
+from hashlib import sha256
+import hmac
+import mmap
+import os
+from typing import AsyncIterable, AsyncIterator, Iterator, Optional, Tuple, Union
+
+from awsync.models.aws import Region
+from awsync.request import (
+    Date,
+    Request,
+    SigningKeyCache,
+    UNSIGNED_PAYLOAD,
+    _get_signing_key,
+    default_signing_key_cache,
+)
+
+STREAMING_PAYLOAD = "STREAMING-AWS4-HMAC-SHA256-PAYLOAD"
+"The payload hash of aws-chunked uploads with chained chunk signatures."
+DEFAULT_CHUNK_SIZE = 64 * 1024
+"Default number of payload bytes per chunk."
+MIN_CHUNK_SIZE = 8 * 1024
+"Minimum number of payload bytes per chunk, except the last chunk."
+_EMPTY_SHA256 = sha256(b"").hexdigest()
+_SIGNATURE_LENGTH = 64
+_CHUNK_SIGNATURE = ";chunk-signature="
+
+
+def _chunk_overhead(size: int) -> int:
+    "Bytes added to a chunk of size bytes by aws-chunked encoding."
+    return len(f"{size:x}") + len(_CHUNK_SIGNATURE) + _SIGNATURE_LENGTH + 4
+
+
+def encoded_length(decoded_length: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    "The Content-Length of an aws-chunked encoded payload of decoded_length bytes."
+    full_chunks, last_chunk = divmod(decoded_length, chunk_size)
+    length = full_chunks * (_chunk_overhead(chunk_size) + chunk_size)
+    if last_chunk:
+        length += _chunk_overhead(last_chunk) + last_chunk
+    return length + _chunk_overhead(0)
+
+
+class ChunkSigner:
+    "Signs the chunks of a streaming payload, each signature is chained from the previous signature."
+
+    def __init__(
+        self, signing_key: bytes, timestamp: str, scope: str, seed_signature: str
+    ) -> None:
+        self.previous_signature = seed_signature
+        "The signature of the previous chunk, initially the seed signature of the request headers."
+        self._signing_key = signing_key
+        self._prefix = f"AWS4-HMAC-SHA256-PAYLOAD\n{timestamp}\n{scope}\n"
+
+    def sign(self, chunk: Union[bytes, memoryview]) -> str:
+        "Returns the signature of the next chunk."
+        string_to_sign = (
+            f"{self._prefix}{self.previous_signature}\n{_EMPTY_SHA256}\n"
+            f"{sha256(chunk).hexdigest()}"
+        )
+        self.previous_signature = hmac.new(
+            self._signing_key, string_to_sign.encode(), sha256
+        ).hexdigest()
+        return self.previous_signature
+
+    def header(self, chunk: Union[bytes, memoryview]) -> bytes:
+        "The aws-chunked header of the next chunk, the chunk is followed by CRLF."
+        return f"{len(chunk):x}{_CHUNK_SIGNATURE}{self.sign(chunk)}\r\n".encode()
+
+
+async def _rechunk(body: AsyncIterable[bytes], chunk_size: int) -> AsyncIterator[bytes]:
+    "Yield chunk_size chunks of body, the last chunk may be smaller."
+    buffer = bytearray()
+    async for data in body:
+        if not buffer and len(data) == chunk_size:
+            yield data
+            continue
+        buffer += data
+        while len(buffer) >= chunk_size:
+            yield bytes(buffer[:chunk_size])
+            del buffer[:chunk_size]
+    if buffer:
+        yield bytes(buffer)
+
+
+async def _encode(
+    body: AsyncIterable[bytes],
+    signer: ChunkSigner,
+    decoded_length: int,
+    chunk_size: int,
+) -> AsyncIterator[bytes]:
+    "Yield the aws-chunked encoding of body, the chunks are not copied."
+    sent = 0
+    async for chunk in _rechunk(body, chunk_size):
+        sent += len(chunk)
+        if sent > decoded_length:
+            break
+        yield signer.header(chunk)
+        yield chunk
+        yield b"\r\n"
+    if sent != decoded_length:
+        raise ValueError(
+            f"Streaming payload was {'longer' if sent > decoded_length else 'shorter'} "
+            f"than its decoded length of {decoded_length} bytes."
+        )
+    yield signer.header(b"") + b"\r\n"
+
+
+def sign_streaming(
+    request: Request,
+    body: AsyncIterable[bytes],
+    decoded_length: int,
+    utc_now: datetime,
+    service: str,
+    region: Region,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    signing_key_cache: Optional[SigningKeyCache] = default_signing_key_cache,
+) -> Tuple[Request, AsyncIterator[bytes]]:
+    """
+    Sign a request with a streaming payload of decoded_length bytes read from body.
+    Returns the signed Request, without a body, and the aws-chunked encoded payload to send as its content,
+    ie. httpx_client.request(signed.method, signed.get_url(), headers=signed.headers, content=payload).
+    Each chunk is signed as it is sent, the payload can only be sent once.
+    """
+    if chunk_size < MIN_CHUNK_SIZE:
+        raise ValueError(
+            f"Streaming chunk size must be at least {MIN_CHUNK_SIZE} bytes, got {chunk_size}."
+        )
+    signed = replace(
+        request,
+        body=None,
+        headers={
+            **request.headers,
+            "Content-Encoding": "aws-chunked",
+            "Content-Length": str(encoded_length(decoded_length, chunk_size)),
+            "X-Amz-Content-Sha256": STREAMING_PAYLOAD,
+            "X-Amz-Decoded-Content-Length": str(decoded_length),
+        },
+    ).sign(
+        utc_now=utc_now,
+        service=service,
+        region=region,
+        signing_key_cache=signing_key_cache,
+        payload_hash=STREAMING_PAYLOAD,
+    )
+    date = Date(utc_now.strftime("%Y%m%d"))
+    signing_key = (
+        _get_signing_key(request.credentials, date, region, service)
+        if signing_key_cache is None
+        else signing_key_cache.get_signing_key(
+            request.credentials, date, region, service
+        )
+    )
+    signer = ChunkSigner(
+        signing_key=signing_key,
+        timestamp=signed.headers["X-Amz-Date"],
+        scope=f"{date}/{region}/{service}/aws4_request",
+        seed_signature=signed.headers["Authorization"].rsplit("Signature=", 1)[1],
+    )
+    return signed, _encode(body, signer, decoded_length, chunk_size)
+
+
+def sign_unsigned_payload(
+    request: Request,
+    utc_now: datetime,
+    service: str,
+    region: Region,
+    signing_key_cache: Optional[SigningKeyCache] = default_signing_key_cache,
+) -> Request:
+    """
+    Sign a request without signing its payload, where the service allows it (ie. S3 over HTTPS).
+    The payload can be streamed as is, ie. with httpx_client.request(..., content=body).
+    """
+    return replace(
+        request,
+        body=None,
+        headers={**request.headers, "X-Amz-Content-Sha256": UNSIGNED_PAYLOAD},
+    ).sign(
+        utc_now=utc_now,
+        service=service,
+        region=region,
+        signing_key_cache=signing_key_cache,
+        payload_hash=UNSIGNED_PAYLOAD,
+    )
+
+
+DEFAULT_FILE_CHUNK_SIZE = 1024 * 1024
+"Default number of bytes hashed or read from a payload source at a time."
+THREAD_THRESHOLD = 1024 * 1024
+"Payload sources of at least this many bytes are hashed and read in a worker thread by default."
+
+
+@dataclass(frozen=True)
+class FileRegion:
+    "A region of a file used as a payload, memory-mapped when hashed or sent."
+    path: Union[str, "os.PathLike[str]"]
+    "The path of the file."
+    offset: int = 0
+    "The offset of the region in bytes."
+    length: Optional[int] = None
+    "(Optional) The length of the region in bytes, defaults to the rest of the file."
+
+    def size(self) -> int:
+        "The length of the region in bytes, raises ValueError if it extends past the end of the file."
+        file_size = os.path.getsize(self.path)
+        length = file_size - self.offset if self.length is None else self.length
+        if self.offset < 0 or length < 0 or self.offset + length > file_size:
+            raise ValueError(
+                f"File region at offset {self.offset} of length {self.length} "
+                f"is outside of '{self.path}' of {file_size} bytes."
+            )
+        return length
+
+
+PayloadSource = Union[
+    bytes, bytearray, memoryview, mmap.mmap, FileRegion, "os.PathLike[str]"
+]
+"A payload in memory, a file region or the path of a whole file."
+
+
+def _region(source: Union[FileRegion, "os.PathLike[str]"]) -> FileRegion:
+    "A file region for a path."
+    return source if isinstance(source, FileRegion) else FileRegion(path=source)
+
+
+def payload_size(source: PayloadSource) -> int:
+    "The length of a payload in bytes."
+    if isinstance(source, (FileRegion, os.PathLike)):
+        return _region(source).size()
+    with memoryview(source) as view:
+        return view.nbytes
+
+
+@contextmanager
+def _view(source: PayloadSource) -> Iterator[memoryview]:
+    "A memoryview of the bytes of a payload, file regions are memory-mapped read-only."
+    if not isinstance(source, (FileRegion, os.PathLike)):
+        with memoryview(source) as view, view.cast("B") as data:
+            yield data
+        return
+    region = _region(source)
+    length = region.size()
+    if not length:  # Empty files can not be memory-mapped.
+        yield memoryview(b"")
+        return
+    # Memory maps must start at a multiple of the allocation granularity.
+    start = region.offset - region.offset % mmap.ALLOCATIONGRANULARITY
+    with open(region.path, "rb") as file, mmap.mmap(
+        file.fileno(),
+        region.offset + length - start,
+        offset=start,
+        access=mmap.ACCESS_READ,
+    ) as mapped, memoryview(mapped) as view, view[region.offset - start :] as data:
+        yield data
+
+
+def hash_payload(
+    source: PayloadSource, chunk_size: int = DEFAULT_FILE_CHUNK_SIZE
+) -> str:
+    "The SHA256 payload hash of a payload, hashed incrementally over chunk_size views without copying."
+    payload_hash = sha256()
+    with _view(source) as data:
+        for start in range(0, len(data), chunk_size):
+            with data[start : start + chunk_size] as chunk:
+                payload_hash.update(chunk)
+    return payload_hash.hexdigest()
+
+
+async def hash_payload_async(
+    source: PayloadSource,
+    chunk_size: int = DEFAULT_FILE_CHUNK_SIZE,
+    threaded: Optional[bool] = None,
+) -> str:
+    """
+    The SHA256 payload hash of a payload, hashed in a worker thread if threaded,
+    by default if the payload is at least THREAD_THRESHOLD bytes, so large payloads do not block the event loop.
+    """
+    if threaded is None:
+        threaded = payload_size(source) >= THREAD_THRESHOLD
+    if threaded:
+        return await asyncio.to_thread(hash_payload, source, chunk_size)
+    return hash_payload(source, chunk_size)
+
+
+async def iter_payload(
+    source: PayloadSource,
+    chunk_size: int = DEFAULT_FILE_CHUNK_SIZE,
+    threaded: bool = True,
+) -> AsyncIterator[bytes]:
+    """
+    Yield a payload in chunks to send as httpx request content, only one chunk is copied into memory at a time.
+    Files are read in a worker thread if threaded, so disk I/O does not block the event loop.
+    Call again to send the payload again, ie. on retry.
+    """
+    if isinstance(source, bytes):
+        yield source
+        return
+    if not isinstance(source, (FileRegion, os.PathLike)):
+        with _view(source) as data:
+            for start in range(0, len(data), chunk_size):
+                yield data[start : start + chunk_size].tobytes()
+        return
+    region = _region(source)
+    remaining = region.size()
+    with open(region.path, "rb", buffering=0) as file:
+        file.seek(region.offset)
+        while remaining:
+            size = min(chunk_size, remaining)
+            chunk = (
+                await asyncio.to_thread(file.read, size)
+                if threaded
+                else file.read(size)
+            )
+            if not chunk:
+                raise ValueError(f"File '{region.path}' was truncated while reading.")
+            remaining -= len(chunk)
+            yield chunk
+
+
+async def sign_payload(
+    request: Request,
+    source: PayloadSource,
+    utc_now: datetime,
+    service: str,
+    region: Region,
+    unsigned: bool = False,
+    signing_key_cache: Optional[SigningKeyCache] = default_signing_key_cache,
+) -> Request:
+    """
+    Sign a request with a payload sent separately, ie. with httpx_client.request(..., content=iter_payload(source)).
+    The payload is hashed incrementally with hash_payload_async, or not hashed if unsigned.
+    Returns the signed Request without a body, with the Content-Length and X-Amz-Content-Sha256 headers.
+    """
+    payload_hash = UNSIGNED_PAYLOAD if unsigned else await hash_payload_async(source)
+    return replace(
+        request,
+        body=None,
+        headers={
+            **request.headers,
+            "Content-Length": str(payload_size(source)),
+            "X-Amz-Content-Sha256": payload_hash,
+        },
+    ).sign(
+        utc_now=utc_now,
+        service=service,
+        region=region,
+        signing_key_cache=signing_key_cache,
+        payload_hash=payload_hash,
+    )
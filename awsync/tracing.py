@@ -0,0 +1,209 @@
+"""
+Tracing hooks reporting the timing of each phase of a request.
+A tracer is called with a TraceEvent when each phase ends, the events include wall clock start times
+so they can be recorded as OpenTelemetry spans, ie. with tracer.start_span(start_time=...) and span.end(end_time=...).
+"""
+
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+import time
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+)
+
+from awsync.models.strenum import StrEnum
+
+
+class Phase(StrEnum):
+    "A phase of a request."
+
+    sign = "sign"
+    "Signing the request."
+    rate_limit = "rate_limit"
+    "Waiting for a token from the adaptive rate limiter."
+    connect = "connect"
+    "Opening a new connection (TCP, TLS), only when no pooled connection was available."
+    send = "send"
+    "Sending a single attempt and receiving the response, including waiting for a pooled connection."
+    backoff = "backoff"
+    "Sleeping before a retry."
+    parse = "parse"
+    "Deserializing the response."
+    call = "call"
+    "Sending the request with retries until the final response is received, or its stream is consumed."
+
+
+@dataclass(frozen=True)
+class TraceEvent:
+    "The timing of a completed phase of a request."
+    phase: Phase
+    "The phase."
+    operation: str
+    "The API operation, ie. 'ListStackResources'."
+    service: str
+    "The service, ie. 'cloudformation'."
+    region: str
+    "The region."
+    start_time: float
+    "Wall clock time the phase started, in seconds since the epoch."
+    duration: float
+    "Duration of the phase in seconds, measured with a monotonic clock."
+    attempt: int = 0
+    "The attempt number, 0 for the first attempt and 1 for the first retry, for call phases the number of retries made."
+    status: Optional[int] = None
+    "The response status code, for send and call phases."
+    request_id: Optional[str] = None
+    "The AWS request ID, for send and call phases."
+    throttled: bool = False
+    "If the response was a throttling error, for send phases."
+    bytes_sent: int = 0
+    "Request body bytes sent by all attempts, for call phases."
+    bytes_received: int = 0
+    "Response body bytes received, for call phases."
+    error: Optional[BaseException] = None
+    "The exception raised during the phase, if any."
+
+    @property
+    def end_time(self) -> float:
+        "Wall clock time the phase ended, in seconds since the epoch."
+        return self.start_time + self.duration
+
+
+Tracer = Callable[[TraceEvent], None]
+"""
+A hook called with each completed phase.
+Called inline on the request path, so it should be fast and must not raise.
+"""
+
+
+class Span:
+    "A phase being timed, response details can be set before it ends."
+
+    __slots__ = (
+        "attempt",
+        "status",
+        "request_id",
+        "throttled",
+        "bytes_sent",
+        "bytes_received",
+    )
+
+    def __init__(self, attempt: int = 0) -> None:
+        self.attempt = attempt
+        self.status: Optional[int] = None
+        self.request_id: Optional[str] = None
+        self.throttled = False
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+@dataclass(frozen=True)
+class TraceContext:
+    "The tracer and request details shared by the phases of a single API call."
+    tracer: Tracer
+    "The tracer to call with each completed phase."
+    operation: str
+    "The API operation."
+    service: str
+    "The service."
+    region: str
+    "The region."
+
+    def emit(
+        self,
+        phase: Phase,
+        start_time: float,
+        duration: float,
+        span: Span,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        "Call the tracer with a completed phase."
+        self.tracer(
+            TraceEvent(
+                phase=phase,
+                operation=self.operation,
+                service=self.service,
+                region=self.region,
+                start_time=start_time,
+                duration=duration,
+                attempt=span.attempt,
+                status=span.status,
+                request_id=span.request_id,
+                throttled=span.throttled,
+                bytes_sent=span.bytes_sent,
+                bytes_received=span.bytes_received,
+                error=error,
+            )
+        )
+
+    @contextmanager
+    def span(self, phase: Phase, attempt: int = 0) -> Iterator[Span]:
+        "Time the phase within the context, recording any exception raised."
+        span = Span(attempt)
+        start_time = time.time()
+        start = time.perf_counter()
+        try:
+            yield span
+        except GeneratorExit:  # A stream closed early by the consumer is not an error.
+            self.emit(phase, start_time, time.perf_counter() - start, span)
+            raise
+        except BaseException as exc:
+            self.emit(phase, start_time, time.perf_counter() - start, span, error=exc)
+            raise
+        self.emit(phase, start_time, time.perf_counter() - start, span)
+
+    def httpx_extensions(
+        self, attempt: int = 0
+    ) -> Dict[str, Callable[[str, Dict[str, Any]], Awaitable[None]]]:
+        """
+        httpx request extensions emitting a connect phase when a new connection is opened,
+        using the httpcore trace extension. See: https://www.encode.io/httpcore/extensions/#trace
+        """
+        started: List[float] = []
+
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            "Time from starting to connect until the request headers are sent."
+            if event_name == "connection.connect_tcp.started":
+                started[:] = [time.time(), time.perf_counter()]
+            elif started and (
+                event_name.endswith(".send_request_headers.started")
+                or event_name.endswith(".failed")
+            ):
+                start_time, start = started
+                started.clear()
+                self.emit(
+                    Phase.connect,
+                    start_time=start_time,
+                    duration=time.perf_counter() - start,
+                    span=Span(attempt),
+                    error=info.get("exception"),
+                )
+
+        return {"trace": trace}
+
+
+def span(
+    trace: Optional[TraceContext], phase: Phase, attempt: int = 0
+) -> ContextManager[Span]:
+    "Time a phase if tracing is enabled."
+    if trace is None:
+        return nullcontext(Span(attempt))
+    return trace.span(phase, attempt)
+
+
+def combine(*tracers: Tracer) -> Tracer:
+    "Returns a tracer calling each of the tracers in order."
+
+    def tracer(event: TraceEvent) -> None:
+        "Call each tracer."
+        for each in tracers:
+            each(event)
+
+    return tracer
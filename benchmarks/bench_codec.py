@@ -0,0 +1,68 @@
+"""
+Benchmark JSON codecs on large ListStackResources pages.
+Run with: python -m benchmarks.bench_codec
+"""
+
+import timeit
+from typing import Any, Dict, List
+
+from awsync.codec import JsonCodec, OrjsonCodec, StdlibJsonCodec, UjsonCodec
+
+
+def list_stack_resources_page(resources: int) -> Dict[str, Any]:
+    "A ListStackResources response page with the given number of resource summaries."
+    summaries: List[Dict[str, Any]] = [
+        {
+            "LogicalResourceId": f"Resource{index}",
+            "PhysicalResourceId": f"arn:aws:lambda:us-east-1:123456789012:function:Example-{index}",
+            "ResourceType": "AWS::Lambda::Function",
+            "LastUpdatedTimestamp": 1700000000.123,
+            "ResourceStatus": "UPDATE_COMPLETE",
+            "DriftInformation": {"StackResourceDriftStatus": "NOT_CHECKED"},
+        }
+        for index in range(resources)
+    ]
+    return {
+        "ListStackResourcesResponse": {
+            "ListStackResourcesResult": {
+                "StackResourceSummaries": summaries,
+                "NextToken": "token",
+            },
+            "ResponseMetadata": {"RequestId": "00000000-0000-0000-0000-000000000000"},
+        }
+    }
+
+
+def installed_codecs() -> List[JsonCodec]:
+    "Returns every installed JSON codec."
+    codecs: List[JsonCodec] = [StdlibJsonCodec()]
+    for codec_class in (OrjsonCodec, UjsonCodec):
+        try:
+            codecs.append(codec_class())
+        except ImportError:
+            print(f"Skipping {codec_class.name}, not installed.")
+    return codecs
+
+
+def main(resources: int = 10_000, number: int = 20) -> None:
+    "Print decode and encode timings for each installed codec."
+    page = StdlibJsonCodec().dumps(list_stack_resources_page(resources))
+    print(f"Page size: {len(page) / 1024 / 1024:.2f} MiB, {resources} resources")
+    print(f"{'codec':<8} {'loads ms':>10} {'dumps ms':>10} {'speedup':>8}")
+    baseline = 0.0
+    for codec in installed_codecs():
+        decoded = codec.loads(page)
+        loads = min(timeit.repeat(lambda: codec.loads(page), number=number, repeat=3))
+        dumps = min(
+            timeit.repeat(lambda: codec.dumps(decoded), number=number, repeat=3)
+        )
+        total = loads + dumps
+        baseline = baseline or total
+        print(
+            f"{codec.name:<8} {loads / number * 1000:>10.2f} "
+            f"{dumps / number * 1000:>10.2f} {baseline / total:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
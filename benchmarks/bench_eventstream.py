@@ -0,0 +1,63 @@
+"""
+Benchmark event stream decoding throughput on multi-MB streams with random chunk boundaries.
+Run with: python -m benchmarks.bench_eventstream
+"""
+
+import random
+import timeit
+from typing import List
+
+from awsync.eventstream import EventStreamDecoder, encode_message
+
+
+def event_stream(size: int, payload_size: int) -> bytes:
+    "An event stream of PayloadChunk messages totalling about size bytes."
+    payload = random.Random(0).randbytes(payload_size)
+    message = encode_message(
+        {":message-type": "event", ":event-type": "PayloadChunk"}, payload
+    )
+    return message * (size // len(message))
+
+
+def split(data: bytes, max_chunk_size: int) -> List[bytes]:
+    "Split data into chunks of random sizes, like reads from a socket."
+    rng = random.Random(0)
+    chunks: List[bytes] = []
+    offset = 0
+    while offset < len(data):
+        size = rng.randint(1, max_chunk_size)
+        chunks.append(data[offset : offset + size])
+        offset += size
+    return chunks
+
+
+def decode(chunks: List[bytes]) -> int:
+    "Decode every chunk, returns the number of payload bytes."
+    decoder = EventStreamDecoder()
+    total = 0
+    for chunk in chunks:
+        for message in decoder.feed(chunk):
+            total += len(message.payload)
+    decoder.close()
+    return total
+
+
+def main(size: int = 32 * 1024 * 1024, number: int = 3) -> None:
+    "Print decode throughput for combinations of payload and chunk sizes."
+    print(f"{'payload':>8} {'chunk':>8} {'messages':>9} {'MiB/s':>8}")
+    for payload_size in (256, 4096, 65536):
+        data = event_stream(size, payload_size)
+        messages = decode([data]) // payload_size
+        for max_chunk_size in (4096, 65536, 1024 * 1024):
+            chunks = split(data, max_chunk_size)
+            seconds = min(
+                timeit.repeat(lambda: decode(chunks), number=number, repeat=3)
+            )
+            throughput = len(data) * number / seconds / 1024 / 1024
+            print(
+                f"{payload_size:>8} {max_chunk_size:>8} {messages:>9} {throughput:>8.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Benchmark request signing and the request path, comparing against locally saved baselines.
+Run with: python -m benchmarks.bench_request
+Save new baselines with: python -m benchmarks.bench_request --save
+
+Baselines are machine specific, so they are saved to an untracked file and never committed,
+save them on the machine used for comparisons before changing code.
+Exits with status 1 if any benchmark is slower than its baseline by more than the tolerance.
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, UTC
+import json
+from pathlib import Path
+import logging
+import sys
+import timeit
+import tracemalloc
+from typing import Callable, Dict
+
+import httpx
+
+from awsync.client import Client, request_with_retry
+from awsync.models.aws import Credentials, Region
+from awsync.models.http import Method
+from awsync.request import (
+    Request,
+    Signer,
+    SigningKeyCache,
+    _get_canonical_request,
+    _uri_encode,
+)
+
+BASELINES = Path(__file__).with_name("baselines.local.json")
+"""
+Baselines saved on this machine by benchmark name, in microseconds per operation or peak bytes allocated.
+Ignored by git, without it results are printed without comparison.
+"""
+
+CREDENTIALS = Credentials(
+    access_key_id="AKIDEXAMPLE",
+    secret_access_key="wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY",
+    session_token="SESSIONTOKEN",
+)
+NOW = datetime(2000, 1, 1, tzinfo=UTC)
+
+
+def request(query_params: int = 3, headers: int = 2, body_size: int = 0) -> Request:
+    "A request with the given number of query parameters and headers and body size."
+    return Request(
+        credentials=CREDENTIALS,
+        method=Method.POST if body_size else Method.GET,
+        host="cloudformation.us-east-1.amazonaws.com",
+        path="/2015-03-31/functions/my function/invocations",
+        query={f"Param{index}": f"value {index}/é" for index in range(query_params)},
+        headers={f"X-Custom-{index}": f" value {index} " for index in range(headers)},
+        body=b"x" * body_size if body_size else None,
+    )
+
+
+def sign(unsigned: Request, cache: bool = True) -> Callable[[], object]:
+    "A callable signing a request."
+    signing_key_cache = SigningKeyCache() if cache else None
+    return lambda: unsigned.sign(
+        utc_now=NOW,
+        service="cloudformation",
+        region=Region.us_east_1,
+        signing_key_cache=signing_key_cache,
+    )
+
+
+def sign_many(requests: int) -> Callable[[], object]:
+    "A callable signing a batch of requests with a Signer."
+    signer = Signer(service="cloudformation", region=Region.us_east_1)
+    batch = [request() for _ in range(requests)]
+    return lambda: signer.sign_many(batch, utc_now=NOW)
+
+
+def presign_many(requests: int) -> Callable[[], object]:
+    "A callable presigning a batch of URLs with a Signer."
+    signer = Signer(service="s3", region=Region.us_east_1)
+    batch = [
+        Request(
+            credentials=CREDENTIALS,
+            method=Method.GET,
+            host="examplebucket.s3.amazonaws.com",
+            path=f"/photos/{index}.jpg",
+        )
+        for index in range(requests)
+    ]
+    return lambda: signer.presign_many(batch, utc_now=NOW)
+
+
+def mock_response(request: httpx.Request) -> httpx.Response:
+    "An empty ListStackResources response."
+    return httpx.Response(
+        status_code=200,
+        content=b'{"ListStackResourcesResponse": {"ListStackResourcesResult": '
+        b'{"StackResourceSummaries": []}}}',
+    )
+
+
+def end_to_end(requests: int) -> Callable[[], object]:
+    "A callable making requests with a Client against a local mock transport."
+
+    async def run() -> None:
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(mock_response)
+        ) as httpx_client:
+            client = Client(
+                credentials=CREDENTIALS, httpx_client=httpx_client, utcnow=lambda: NOW
+            )
+            for _ in range(requests):
+                await client.list_stack_resources(
+                    region=Region.us_east_1, stack_name="Example-Stack"
+                )
+
+    return lambda: asyncio.run(run())
+
+
+def request_path(requests: int) -> Callable[[], object]:
+    "A callable sending signed requests with request_with_retry against a local mock transport."
+    signed = sign(request())()
+    assert isinstance(signed, Request)
+
+    async def run() -> None:
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(mock_response)
+        ) as httpx_client:
+            logger = logging.getLogger(__name__)
+            for _ in range(requests):
+                await request_with_retry(httpx_client, signed, logger=logger)
+
+    return lambda: asyncio.run(run())
+
+
+def timing(function: Callable[[], object], number: int, per_call: int = 1) -> float:
+    "Microseconds per operation, the best of several repeats."
+    function()  # Warm up caches.
+    seconds = min(timeit.repeat(function, number=number, repeat=9))
+    return seconds / number / per_call * 1_000_000
+
+
+def memory(function: Callable[[], object]) -> float:
+    "Peak bytes allocated by a single call after warming up."
+    function()
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return float(peak - start)
+
+
+def benchmarks() -> Dict[str, Callable[[], float]]:
+    "Returns every benchmark by name, each returning its result when called."
+    canonical_headers = {f"X-Custom-{index}": "value" for index in range(20)}
+    return {
+        "sign_small_us": lambda: timing(sign(request()), number=2000),
+        "sign_small_uncached_us": lambda: timing(
+            sign(request(), cache=False), number=2000
+        ),
+        "sign_many_small_us": lambda: timing(sign_many(100), number=20, per_call=100),
+        "presign_many_us": lambda: timing(presign_many(100), number=20, per_call=100),
+        "sign_query_200_us": lambda: timing(
+            sign(request(query_params=200)), number=200
+        ),
+        "sign_headers_50_us": lambda: timing(sign(request(headers=50)), number=500),
+        "sign_body_1mib_us": lambda: timing(
+            sign(request(body_size=1024 * 1024)), number=50
+        ),
+        "uri_encode_us": lambda: timing(
+            lambda: _uri_encode("/2015-03-31/functions/my function/é", is_path=True),
+            number=20000,
+        ),
+        "uri_encode_uncached_us": lambda: timing(
+            lambda: _uri_encode.__wrapped__(
+                "/2015-03-31/functions/my function/é", is_path=True
+            ),
+            number=20000,
+        ),
+        "canonical_request_us": lambda: timing(
+            lambda: _get_canonical_request(
+                method=Method.GET,
+                path="/",
+                query_string="Action=ListStackResources",
+                payload_hash="e3b0c442",
+                canonical_headers=canonical_headers,
+            ),
+            number=5000,
+        ),
+        "request_with_retry_us": lambda: timing(
+            request_path(200), number=3, per_call=200
+        ),
+        "client_end_to_end_us": lambda: timing(end_to_end(200), number=3, per_call=200),
+        "sign_small_peak_bytes": lambda: memory(sign(request())),
+        "client_request_peak_bytes": lambda: memory(end_to_end(1)),
+    }
+
+
+def main() -> int:
+    "Print results compared to baselines, returns the exit status."
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--save", action="store_true", help="Save results as baselines."
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="Allowed slowdown as a fraction of the baseline (default: 0.5).",
+    )
+    args = parser.parse_args()
+
+    baselines: Dict[str, float] = (
+        json.loads(BASELINES.read_text()) if BASELINES.exists() else {}
+    )
+    results: Dict[str, float] = {}
+    regressions = []
+    print(f"{'benchmark':<28} {'result':>12} {'baseline':>12} {'change':>8}")
+    for name, benchmark in benchmarks().items():
+        result = results[name] = benchmark()
+        if args.save:  # Measure twice so noise does not inflate the baseline.
+            result = results[name] = min(result, benchmark())
+        baseline = baselines.get(name)
+        if baseline:
+            change = result / baseline - 1
+            if change > args.tolerance:
+                # Measure again to rule out noise from other processes.
+                result = results[name] = min(result, benchmark())
+                change = result / baseline - 1
+            if change > args.tolerance:
+                regressions.append(name)
+            print(f"{name:<28} {result:>12.1f} {baseline:>12.1f} {change:>+8.0%}")
+        else:
+            print(f"{name:<28} {result:>12.1f} {'-':>12} {'-':>8}")
+
+    if args.save:
+        BASELINES.write_text(
+            json.dumps({k: round(v, 1) for k, v in results.items()}, indent=2) + "\n"
+        )
+        print(f"Saved baselines to {BASELINES}")
+        return 0
+    if regressions:
+        print(f"Regressions over {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,26 @@
+"Shared test fixtures."
+from typing import List
+
+import pytest
+
+
+class FakeClock:
+    "A monotonic clock advanced manually, sleeping advances it instead of waiting."
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: List[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float) -> None:
+        "Advance the clock instead of sleeping."
+        self.sleeps.append(delay)
+        self.now += delay
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    "A fake monotonic clock starting at 0."
+    return FakeClock()
@@ -46,7 +46,7 @@ class TestCredentials:
                     session_token="TESTSESSIONTOKEN",
                 )
             )
-            == "Credentials(access_key_id='TESTACCESSKEY', session_token='TESTSESSIONTOKEN')"
+            == "Credentials(access_key_id='TESTACCESSKEY', session_token='TESTSESSIONTOKEN', expiration=None)"
         )
 
 
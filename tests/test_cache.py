@@ -0,0 +1,100 @@
+"Test cache module."
+from awsync.cache import CacheKey, ResponseCache
+from awsync.models.aws import Credentials, Region
+from awsync.models.http import Method
+from awsync.request import Request
+from tests.conftest import FakeClock
+
+TEST_CREDENTIALS = Credentials(
+    access_key_id="TESTACCESSKEY", secret_access_key="TESTSECRETACCESSKEY"
+)
+
+
+def key(operation: str = "GetResource", region: str = "us-east-1") -> CacheKey:
+    "A cache key for a Cloud Control API request."
+    return CacheKey.from_request(
+        operation,
+        "cloudcontrolapi",
+        region,
+        Request(
+            credentials=TEST_CREDENTIALS,
+            method=Method.POST,
+            host=f"cloudcontrolapi.{region}.amazonaws.com",
+            body={"Identifier": operation},
+        ),
+    )
+
+
+class TestCacheKey:
+    "Test CacheKey class."
+
+    def test_from_request(self) -> None:
+        "Test keys are built from the canonical request parts and credentials identity."
+        request = Request(
+            credentials=TEST_CREDENTIALS,
+            method=Method.GET,
+            host="cloudformation.us-east-1.amazonaws.com",
+            query={"StackName": "Test-Stack", "Action": "ListStackResources"},
+        )
+        assert CacheKey.from_request(
+            "ListStackResources", "cloudformation", Region.us_east_1, request
+        ) == CacheKey(
+            service="cloudformation",
+            region="us-east-1",
+            operation="ListStackResources",
+            method="GET",
+            host="cloudformation.us-east-1.amazonaws.com",
+            path="/",
+            query=(("Action", "ListStackResources"), ("StackName", "Test-Stack")),
+            content=b"",
+            access_key_id="TESTACCESSKEY",
+        )
+        assert key() == key()
+        assert key() != key(operation="Other")
+
+
+class TestResponseCache:
+    "Test ResponseCache class."
+
+    def test_hit_miss(self) -> None:
+        "Test cached responses are returned and lookups are counted."
+        cache = ResponseCache()
+        assert cache.get(key()) is None
+        cache.put(key(), "response")
+        assert cache.get(key()) == "response"
+        assert (cache.hits, cache.misses, len(cache)) == (1, 1, 1)
+
+    def test_ttl(self, clock: FakeClock) -> None:
+        "Test responses expire after ttl seconds."
+        cache = ResponseCache(ttl=10, monotonic=clock)
+        cache.put(key(), "response")
+        clock.now = 9.9
+        assert cache.get(key()) == "response"
+        clock.now = 10
+        assert cache.get(key()) is None
+        assert (cache.hits, cache.misses, len(cache)) == (1, 1, 0)
+
+    def test_lru(self) -> None:
+        "Test the least recently used response is evicted beyond maxsize."
+        cache = ResponseCache(maxsize=2)
+        cache.put(key("first"), "first")
+        cache.put(key("second"), "second")
+        cache.get(key("first"))
+        cache.put(key("third"), "third")
+        assert cache.get(key("second")) is None
+        assert cache.get(key("first")) == "first"
+        assert cache.get(key("third")) == "third"
+        assert cache.evictions == 1
+
+    def test_invalidate(self) -> None:
+        "Test invalidation by service, region and operation."
+        cache = ResponseCache()
+        for operation in ("first", "second"):
+            for region in ("us-east-1", "us-west-2"):
+                cache.put(key(operation, region), operation)
+        assert cache.invalidate(operation="first", region=Region.us_east_1) == 1
+        assert cache.invalidate(region="us-west-2") == 2
+        assert cache.invalidate(service="lambda") == 0
+        assert cache.get(key("second", "us-east-1")) == "second"
+        assert cache.invalidate() == 1
+        assert len(cache) == 0
@@ -1,10 +1,32 @@
 "Test client module."
+import asyncio
+from contextlib import aclosing
 from datetime import datetime, UTC
+from functools import partial
+from typing import Any, AsyncIterator, Dict, List
 import pytest
-from unittest.mock import Mock, patch, AsyncMock
+from unittest.mock import Mock, call, patch, AsyncMock
 
+import httpx
 from httpx import Response
 import awsync.client as client
+from awsync.cache import ResponseCache
+from awsync.clock import ClockSkew
+from awsync.credentials import CachedCredentials
+from awsync.deadline import Deadline
+from awsync.endpoints import Endpoint, EndpointResolver
+from awsync.eventstream import encode_message
+from awsync.metrics import Metrics
+from awsync.models.aws import Credentials, Region
+from awsync.models.http import Method, Scheme
+from awsync.pool import ConnectionPools
+from awsync.request import Request
+from awsync.retry import ExponentialBackoff, RetryBudget
+from awsync.tracing import Phase, TraceEvent
+
+
+THROTTLING_ERROR = {"Error": {"Code": "Throttling", "Message": "Rate exceeded"}}
+"A query protocol throttling error as JSON."
 
 
 class TestHelpers:
@@ -21,6 +43,48 @@ class TestHelpers:
             assert client.utcnow() == mock_datetime
 
 
+async def chunked(*chunks: bytes) -> AsyncIterator[bytes]:
+    "An async byte stream yielding chunks."
+    for chunk in chunks:
+        yield chunk
+
+
+class TestResponse:
+    "Test Response class."
+
+    def test_lazy_text(self) -> None:
+        "Test text is decoded from content on first access and cached."
+        response = client.Response(status=200, content="São Paulo".encode())
+        assert "text" not in vars(response)
+        assert response.text == "São Paulo"
+        assert response.text is response.text
+
+    def test_lazy_json(self) -> None:
+        "Test json() deserializes content once with the codec and caches the result."
+        codec = Mock()
+        codec.loads.return_value = {"key": "value"}
+        response = client.Response(status=200, content=b"{}", codec=codec)
+        assert response.json() == {"key": "value"}
+        assert response.json() is response.json()
+        codec.loads.assert_called_once_with(b"{}")
+
+    def test_request_id(self) -> None:
+        "Test request_id is read from either AWS request ID header."
+        assert (
+            client.Response(
+                status=200, content=b"", headers={"x-amzn-RequestId": "json-id"}
+            ).request_id
+            == "json-id"
+        )
+        assert (
+            client.Response(
+                status=200, content=b"", headers={"x-amz-request-id": "s3-id"}
+            ).request_id
+            == "s3-id"
+        )
+        assert client.Response(status=200, content=b"").request_id is None
+
+
 @pytest.mark.asyncio
 class TestRequest:
     "Test request functions."
@@ -38,7 +102,7 @@ class TestRequest:
         )
         assert await client.request_with_retry(
             client=mock_client, request=mock_request, logger=mock_logger
-        ) == client.Response(status=200, text="Mock response.")
+        ) == client.Response(status=200, content=b"Mock response.")
 
     async def test_request_301(self) -> None:
         """
@@ -92,7 +156,7 @@ class TestRequest:
             asyncio_mock.sleep = AsyncMock()
             assert await client.request_with_retry(
                 client=mock_client, request=mock_request, logger=mock_logger
-            ) == client.Response(status=200, text="Mock response.")
+            ) == client.Response(status=200, content=b"Mock response.")
 
     async def test_request_custom_retries(self) -> None:
         """
@@ -118,3 +182,922 @@ class TestRequest:
                 )
             except client.MaxRetriesException:
                 assert mock_client.request.await_count == 11
+
+    async def test_request_backoff(self) -> None:
+        """
+        Test request_with_retry sleeps for the delays returned by the backoff strategy.
+        Should pass the previous delay to the backoff strategy and count retries.
+        """
+        mock_client = AsyncMock()
+        mock_request = Mock()
+        mock_logger = Mock()
+        mock_client.request.side_effect = [
+            Response(status_code=500, text="Mock response."),
+            Response(status_code=400, json=THROTTLING_ERROR),
+            Response(status_code=200, text="Mock response."),
+        ]
+        backoff = Mock()
+        backoff.delay.side_effect = [0.5, 1.5]
+        with patch(f"awsync.client.asyncio") as asyncio_mock:
+            asyncio_mock.sleep = AsyncMock()
+            response = await client.request_with_retry(
+                client=mock_client,
+                request=mock_request,
+                logger=mock_logger,
+                backoff=backoff,
+            )
+            backoff.delay.assert_has_calls([call(1, 0.0), call(2, 0.5)])
+            asyncio_mock.sleep.assert_has_awaits([call(0.5), call(1.5)])
+        assert response.retries == 2
+
+    async def test_request_retry_after(self) -> None:
+        """
+        Test request_with_retry sleeps at least the Retry-After header and retries 429 responses.
+        Should raise the typed error of non-retryable responses.
+        """
+        mock_client = AsyncMock()
+        mock_client.request.side_effect = [
+            Response(status_code=429, headers={"Retry-After": "3"}),
+            Response(status_code=503, headers={"Retry-After": "0.1"}),
+            Response(
+                status_code=404,
+                json={"__type": "ResourceNotFoundException", "message": "Not found."},
+                headers={"x-amzn-RequestId": "request-id"},
+            ),
+        ]
+        with patch(f"awsync.client.asyncio") as asyncio_mock, pytest.raises(
+            client.AwsError
+        ) as exc_info:
+            asyncio_mock.sleep = AsyncMock()
+            await client.request_with_retry(
+                client=mock_client,
+                request=Mock(),
+                logger=Mock(),
+                backoff=ExponentialBackoff(base=0.5),
+            )
+        asyncio_mock.sleep.assert_has_awaits([call(3.0), call(2.0)])
+        assert exc_info.value.code == "ResourceNotFoundException"
+        assert exc_info.value.request_id == "request-id"
+        assert exc_info.value.response is not None
+        assert exc_info.value.response.retries == 2
+
+    async def test_request_deadline(self) -> None:
+        """
+        Test request_with_retry fails fast when a backoff sleep would pass the deadline.
+        Should raise DeadlineExceededException with the last error without sleeping.
+        """
+        mock_client = AsyncMock()
+        mock_client.timeout = httpx.Timeout(5.0)
+        mock_client.request.return_value = Response(status_code=500)
+        with patch(f"awsync.client.asyncio") as asyncio_mock, pytest.raises(
+            client.DeadlineExceededException, match="Backoff of '2.000' seconds"
+        ) as exc_info:
+            asyncio_mock.sleep = AsyncMock()
+            await client.request_with_retry(
+                client=mock_client,
+                request=Mock(),
+                logger=Mock(),
+                deadline=Deadline(1.0),
+            )
+        asyncio_mock.sleep.assert_not_awaited()
+        assert mock_client.request.await_count == 1
+        assert isinstance(exc_info.value.error, client.TransientError)
+
+    async def test_request_default_backoff(self) -> None:
+        """
+        Test request_with_retry default backoff is uncapped exponential backoff.
+        Should sleep 2^attempt seconds before each retry.
+        """
+        mock_client = AsyncMock()
+        mock_request = Mock()
+        mock_logger = Mock()
+        mock_client.request.return_value = Response(
+            status_code=500, text="Mock response."
+        )
+        with patch(f"awsync.client.asyncio") as asyncio_mock, pytest.raises(
+            client.MaxRetriesException
+        ):
+            asyncio_mock.sleep = AsyncMock()
+            await client.request_with_retry(
+                client=mock_client,
+                request=mock_request,
+                logger=mock_logger,
+                retries=6,
+            )
+        asyncio_mock.sleep.assert_has_awaits(
+            [call(2.0), call(4.0), call(8.0), call(16.0), call(32.0), call(64.0)]
+        )
+
+    async def test_request_retry_budget(self) -> None:
+        """
+        Test request_with_retry stops retrying when the retry budget is exhausted.
+        Should raise client.RetryBudgetExhaustedException.
+        """
+        mock_client = AsyncMock()
+        mock_request = Mock()
+        mock_logger = Mock()
+        mock_client.request.return_value = Response(
+            status_code=500, text="Mock response."
+        )
+        budget = RetryBudget(capacity=5, retry_cost=5)
+        with patch(f"awsync.client.asyncio") as asyncio_mock, pytest.raises(
+            client.RetryBudgetExhaustedException
+        ):
+            asyncio_mock.sleep = AsyncMock()
+            await client.request_with_retry(
+                client=mock_client,
+                request=mock_request,
+                logger=mock_logger,
+                retry_budget=budget,
+            )
+        assert mock_client.request.await_count == 2
+        assert budget.retries == 1
+        assert budget.rejected == 1
+
+    async def test_request_retry_budget_refund(self) -> None:
+        """
+        Test request_with_retry refunds the retry budget after a successful retry.
+        """
+        mock_client = AsyncMock()
+        mock_request = Mock()
+        mock_logger = Mock()
+        mock_client.request.side_effect = [
+            Response(status_code=500, text="Mock response."),
+            Response(status_code=200, text="Mock response."),
+        ]
+        budget = RetryBudget(capacity=10, retry_cost=5)
+        with patch(f"awsync.client.asyncio") as asyncio_mock:
+            asyncio_mock.sleep = AsyncMock()
+            await client.request_with_retry(
+                client=mock_client,
+                request=mock_request,
+                logger=mock_logger,
+                retry_budget=budget,
+            )
+        assert budget.tokens == 10
+        assert budget.tokens_spent == 5
+
+    async def test_request_rate_limit(self) -> None:
+        """
+        Test request_with_retry acquires a token before every attempt
+        and records whether each response was throttled.
+        """
+        mock_client = AsyncMock()
+        mock_request = Mock()
+        mock_logger = Mock()
+        mock_client.request.side_effect = [
+            Response(status_code=400, json=THROTTLING_ERROR),
+            Response(status_code=200, text="Mock response."),
+        ]
+        rate_limit = Mock()
+        rate_limit.acquire = AsyncMock()
+        with patch(f"awsync.client.asyncio") as asyncio_mock:
+            asyncio_mock.sleep = AsyncMock()
+            await client.request_with_retry(
+                client=mock_client,
+                request=mock_request,
+                logger=mock_logger,
+                rate_limit=rate_limit,
+            )
+        assert rate_limit.acquire.await_count == 2
+        rate_limit.update.assert_has_calls(
+            [call(throttled=True), call(throttled=False)]
+        )
+
+
+TEST_CREDENTIALS = Credentials(
+    access_key_id="TESTACCESSKEY", secret_access_key="TESTSECRETACCESSKEY"
+)
+
+
+def list_stack_resources_handler(request: httpx.Request) -> Response:
+    "Mock ListStackResources API returning two pages."
+    next_token = request.url.params.get("NextToken")
+    result: Dict[str, Any] = {
+        "StackResourceSummaries": [{"LogicalResourceId": next_token or "first"}]
+    }
+    if not next_token:
+        result["NextToken"] = "second"
+    return Response(
+        status_code=200,
+        json={"ListStackResourcesResponse": {"ListStackResourcesResult": result}},
+    )
+
+
+@pytest.mark.asyncio
+class TestClient:
+    "Test Client API methods against a mock transport."
+
+    async def test_iter_stack_resources(self) -> None:
+        "Test iter_stack_resources yields resources from every page."
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(list_stack_resources_handler)
+        ) as httpx_client:
+            aws_client = client.Client(
+                credentials=TEST_CREDENTIALS, httpx_client=httpx_client
+            )
+            for prefetch in (0, 1):
+                assert [
+                    resource["LogicalResourceId"]
+                    async for resource in aws_client.iter_stack_resources(
+                        region=Region.us_east_1,
+                        stack_name="Test-Stack",
+                        prefetch=prefetch,
+                    )
+                ] == ["first", "second"]
+
+    async def test_list_stack_resources(self) -> None:
+        "Test list_stack_resources returns resources from every page."
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(list_stack_resources_handler)
+        ) as httpx_client:
+            aws_client = client.Client(
+                credentials=TEST_CREDENTIALS, httpx_client=httpx_client
+            )
+            assert await aws_client.list_stack_resources(
+                region=Region.us_east_1, stack_name="Test-Stack"
+            ) == [{"LogicalResourceId": "first"}, {"LogicalResourceId": "second"}]
+
+    async def test_cached_credentials(self) -> None:
+        "Test requests are signed with credentials from a credentials cache."
+        authorizations: List[str] = []
+
+        def handler(request: httpx.Request) -> Response:
+            authorizations.append(request.headers["Authorization"])
+            return list_stack_resources_handler(request)
+
+        provider = Mock()
+        provider.load = AsyncMock(return_value=TEST_CREDENTIALS)
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        ) as httpx_client:
+            aws_client = client.Client(
+                credentials=CachedCredentials(provider), httpx_client=httpx_client
+            )
+            await aws_client.list_stack_resources(
+                region=Region.us_east_1, stack_name="Test-Stack"
+            )
+        assert len(authorizations) == 2
+        assert all("Credential=TESTACCESSKEY/" in value for value in authorizations)
+        provider.load.assert_awaited_once()
+
+    async def test_connection_pools(self) -> None:
+        "Test requests are sent with the connection pool for their host."
+        async with ConnectionPools(
+            transport_factory=lambda config: httpx.MockTransport(
+                list_stack_resources_handler
+            )
+        ) as pools:
+            aws_client = client.Client(credentials=TEST_CREDENTIALS, httpx_client=pools)
+            await aws_client.list_stack_resources(
+                region=Region.us_east_1, stack_name="Test-Stack"
+            )
+            assert pools.stats()["cloudformation.us-east-1.amazonaws.com"].requests == 2
+
+    async def test_endpoint_override(self) -> None:
+        "Test requests are sent to the resolved endpoint."
+        urls: List[str] = []
+
+        def handler(request: httpx.Request) -> Response:
+            urls.append(str(request.url.copy_with(query=None)))
+            return list_stack_resources_handler(request)
+
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        ) as httpx_client:
+            aws_client = client.Client(
+                credentials=TEST_CREDENTIALS,
+                httpx_client=httpx_client,
+                endpoints=EndpointResolver(
+                    endpoint=Endpoint(host="localhost:4566", scheme=Scheme.http)
+                ),
+            )
+            await aws_client.list_stack_resources(
+                region=Region.us_east_1, stack_name="Test-Stack"
+            )
+        assert urls == ["http://localhost:4566/"] * 2
+
+    async def test_warm_up(self) -> None:
+        "Test warm_up sends a request to each distinct endpoint and logs failures."
+        requests: List[str] = []
+
+        def handler(request: httpx.Request) -> Response:
+            requests.append(f"{request.method} {request.url}")
+            if request.url.host.startswith("lambda.us-west-2"):
+                raise httpx.ConnectError("Mock error.")
+            return Response(status_code=404)
+
+        logger = Mock()
+        async with ConnectionPools(
+            transport_factory=lambda config: httpx.MockTransport(handler)
+        ) as pools:
+            aws_client = client.Client(
+                credentials=TEST_CREDENTIALS, httpx_client=pools, logger=logger
+            )
+            await aws_client.warm_up(
+                regions=[Region.us_east_1, Region.us_west_2, Region.us_east_1],
+                services=["lambda", "cloudformation"],
+            )
+            assert set(pools.stats()) == {
+                "lambda.us-east-1.amazonaws.com",
+                "lambda.us-west-2.amazonaws.com",
+                "cloudformation.us-east-1.amazonaws.com",
+                "cloudformation.us-west-2.amazonaws.com",
+            }
+        assert sorted(requests) == [
+            "HEAD https://cloudformation.us-east-1.amazonaws.com/",
+            "HEAD https://cloudformation.us-west-2.amazonaws.com/",
+            "HEAD https://lambda.us-east-1.amazonaws.com/",
+            "HEAD https://lambda.us-west-2.amazonaws.com/",
+        ]
+        logger.warning.assert_called_once()
+
+    async def test_tracer(self) -> None:
+        "Test the tracer is called with each phase of an API call."
+        events: List[TraceEvent] = []
+        attempts: List[int] = []
+
+        def handler(request: httpx.Request) -> Response:
+            attempts.append(1)
+            if len(attempts) == 1:
+                return Response(status_code=400, json=THROTTLING_ERROR)
+            return Response(
+                status_code=200,
+                headers={"x-amzn-RequestId": "request-id"},
+                content=b'{"ListStackResourcesResponse": {"ListStackResourcesResult": '
+                b'{"StackResourceSummaries": []}}}',
+            )
+
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        ) as httpx_client:
+            aws_client = client.Client(
+                credentials=TEST_CREDENTIALS,
+                httpx_client=httpx_client,
+                backoff=ExponentialBackoff(base=0),
+                tracer=events.append,
+            )
+            # The throttling response enables the rate limiter, skip its wait.
+            with patch("awsync.ratelimit.asyncio.sleep", AsyncMock()):
+                await aws_client.list_stack_resources(
+                    region=Region.us_east_1, stack_name="Test-Stack"
+                )
+        assert [
+            (event.phase, event.attempt, event.status, event.request_id)
+            for event in events
+        ] == [
+            (Phase.sign, 0, None, None),
+            (Phase.rate_limit, 0, None, None),
+            (Phase.send, 0, 400, None),
+            (Phase.backoff, 1, None, None),
+            (Phase.rate_limit, 1, None, None),
+            (Phase.send, 1, 200, "request-id"),
+            (Phase.call, 1, 200, "request-id"),
+            (Phase.parse, 0, None, None),
+        ]
+        assert [event.throttled for event in events if event.phase == Phase.send] == [
+            True,
+            False,
+        ]
+        assert events[-2].bytes_received == 92
+        assert {(event.operation, event.service, event.region) for event in events} == {
+            ("ListStackResources", "cloudformation", "us-east-1")
+        }
+
+    async def test_metrics(self) -> None:
+        "Test metrics are recorded alongside a tracer."
+        events: List[TraceEvent] = []
+        metrics = Metrics()
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(list_stack_resources_handler)
+        ) as httpx_client:
+            for tracer in (None, events.append):
+                aws_client = client.Client(
+                    credentials=TEST_CREDENTIALS,
+                    httpx_client=httpx_client,
+                    tracer=tracer,
+                    metrics=metrics,
+                )
+                await aws_client.list_stack_resources(
+                    region=Region.us_east_1, stack_name="Test-Stack"
+                )
+        (snapshot,) = metrics.snapshot()
+        assert (snapshot.operation, snapshot.calls, snapshot.attempts) == (
+            "ListStackResources",
+            4,
+            4,
+        )
+        assert len([event for event in events if event.phase == Phase.call]) == 2
+
+    async def test_metrics_max_retries(self) -> None:
+        "Test a call which exhausts its retries is recorded with every retry and byte sent."
+        sent: List[int] = []
+
+        def handler(request: httpx.Request) -> Response:
+            sent.append(len(request.content))
+            return Response(status_code=400, json=THROTTLING_ERROR)
+
+        metrics = Metrics()
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        ) as httpx_client:
+            aws_client = client.Client(
+                credentials=TEST_CREDENTIALS,
+                httpx_client=httpx_client,
+                backoff=ExponentialBackoff(base=0),
+                retry_budget=None,
+                rate_limiter=None,
+                metrics=metrics,
+            )
+            with pytest.raises(client.MaxRetriesException):
+                await aws_client.get_resource(
+                    region=Region.us_east_1,
+                    resource_type="AWS::S3::Bucket",
+                    identifier="test-bucket",
+                )
+        (snapshot,) = metrics.snapshot()
+        assert (
+            snapshot.calls,
+            snapshot.errors,
+            snapshot.attempts,
+            snapshot.retries,
+            snapshot.throttles,
+            snapshot.bytes_sent,
+        ) == (1, 1, 4, 3, 4, sum(sent))
+        assert len(sent) == 4 and sent[0] > 0
+
+    async def test_tracer_stream(self) -> None:
+        "Test the call phase of a stream covers consuming it, and closing it early is not an error."
+        events: List[TraceEvent] = []
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(
+                lambda request: Response(
+                    status_code=200, content=chunked(b"first", b"second")
+                )
+            )
+        ) as httpx_client:
+            aws_client = client.Client(
+                credentials=TEST_CREDENTIALS,
+                httpx_client=httpx_client,
+                tracer=events.append,
+            )
+            async with aclosing(
+                aws_client.invoke_stream(
+                    region=Region.us_east_1,
+                    function_name="test-function",
+                    payload=b"payload",
+                )
+            ) as chunks:
+                async for chunk in chunks:
+                    break
+        (call,) = [event for event in events if event.phase == Phase.call]
+        assert call.operation == "Invoke"
+        assert call.bytes_sent == 7
+        assert call.bytes_received == 5
+        assert call.error is None
+
+    async def test_response_cache(self) -> None:
+        "Test responses of read-only operations are cached and returned as new copies."
+        requests: List[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> Response:
+            requests.append(request)
+            return list_stack_resources_handler(request)
+
+        cache = ResponseCache()
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        ) as httpx_client:
+            aws_client = client.Client(
+                credentials=TEST_CREDENTIALS,
+                httpx_client=httpx_client,
+                response_cache=cache,
+                single_flight=None,
+            )
+            first = await aws_client.list_stack_resources(
+                region=Region.us_east_1, stack_name="Test-Stack"
+            )
+            second = await aws_client.list_stack_resources(
+                region=Region.us_east_1, stack_name="Test-Stack"
+            )
+        assert first == second
+        assert first[0] is not second[0]
+        assert len(requests) == 2
+        assert (cache.hits, cache.misses) == (2, 2)
+
+    async def test_single_flight(self) -> None:
+        "Test concurrent identical read-only requests share one underlying request."
+        requests: List[httpx.Request] = []
+
+        async def handler(request: httpx.Request) -> Response:
+            requests.append(request)
+            await asyncio.sleep(0.01)
+            return Response(
+                status_code=200,
+                json={"ResourceDescription": {"Properties": '{"Name": "test"}'}},
+            )
+
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        ) as httpx_client:
+            aws_client = client.Client(
+                credentials=TEST_CREDENTIALS, httpx_client=httpx_client
+            )
+            resources = await asyncio.gather(
+                *(
+                    aws_client.get_resource(
+                        region=Region.us_east_1,
+                        resource_type="AWS::S3::Bucket",
+                        identifier="test",
+                    )
+                    for _ in range(3)
+                )
+            )
+            aws_client_disabled = client.Client(
+                credentials=TEST_CREDENTIALS,
+                httpx_client=httpx_client,
+                single_flight=None,
+            )
+            await asyncio.gather(
+                *(
+                    aws_client_disabled.get_resource(
+                        region=Region.us_east_1,
+                        resource_type="AWS::S3::Bucket",
+                        identifier="test",
+                    )
+                    for _ in range(2)
+                )
+            )
+        assert resources == [{"Name": "test"}] * 3
+        assert len(requests) == 3
+        assert aws_client.single_flight is not None
+        assert (aws_client.single_flight.calls, aws_client.single_flight.shared) == (
+            1,
+            2,
+        )
+
+    @pytest.mark.parametrize(
+        "clock_skew, server_time, requests_sent",
+        [
+            (True, datetime(2000, 1, 1, 1, tzinfo=UTC), [2, 1]),
+            (True, datetime(2000, 1, 1, tzinfo=UTC), [1]),
+            (False, datetime(2000, 1, 1, 1, tzinfo=UTC), [1]),
+        ],
+    )
+    @pytest.mark.parametrize("stream", [False, True])
+    async def test_clock_skew(
+        self,
+        clock_skew: bool,
+        server_time: datetime,
+        requests_sent: List[int],
+        stream: bool,
+    ) -> None:
+        """
+        Test requests rejected due to clock skew are re-signed with the server time and retried once,
+        for buffered and streamed responses.
+        """
+        requests: List[httpx.Request] = []
+        date = {"Date": server_time.strftime("%a, %d %b %Y %H:%M:%S GMT")}
+
+        def handler(request: httpx.Request) -> Response:
+            requests.append(request)
+            if request.headers["X-Amz-Date"] != server_time.strftime("%Y%m%dT%H%M%SZ"):
+                return Response(
+                    status_code=403,
+                    headers=date,
+                    json={"__type": "InvalidSignatureException"},
+                )
+            return Response(status_code=200, headers=date, text="result")
+
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        ) as httpx_client:
+            aws_client = client.Client(
+                credentials=TEST_CREDENTIALS,
+                httpx_client=httpx_client,
+                utcnow=lambda: datetime(2000, 1, 1, tzinfo=UTC),
+                clock_skew=ClockSkew() if clock_skew else None,
+            )
+            sent = []
+            for _ in range(len(requests_sent)):
+                try:
+                    if stream:
+                        chunks = [
+                            chunk
+                            async for chunk in aws_client.invoke_stream(
+                                Region.us_east_1, "function"
+                            )
+                        ]
+                        assert chunks == [b"result"]
+                    else:
+                        assert (
+                            await aws_client.invoke(Region.us_east_1, "function")
+                            == "result"
+                        )
+                except client.StatusError as exc:
+                    assert exc.response is not None
+                    assert exc.response.status == 403
+                sent.append(len(requests))
+                requests.clear()
+        assert sent == requests_sent
+
+    async def test_deadline(self) -> None:
+        """
+        Test a deadline spans every page, capping the httpx timeouts of each request to the time remaining.
+        Should raise DeadlineExceededException once the deadline passes between pages.
+        """
+        clock = [0.0]
+        timeouts: List[Dict[str, float]] = []
+
+        def handler(request: httpx.Request) -> Response:
+            timeouts.append(request.extensions["timeout"])
+            clock[0] += 6.0
+            return list_stack_resources_handler(request)
+
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler), timeout=30.0
+        ) as httpx_client:
+            aws_client = client.Client(
+                credentials=TEST_CREDENTIALS,
+                httpx_client=httpx_client,
+                timeout=5.0,
+                monotonic=lambda: clock[0],
+                single_flight=None,
+            )
+            assert (
+                len(
+                    await aws_client.list_stack_resources(
+                        region=Region.us_east_1, stack_name="Test-Stack", timeout=10.0
+                    )
+                )
+                == 2
+            )
+            with pytest.raises(client.DeadlineExceededException):
+                await aws_client.list_stack_resources(
+                    region=Region.us_east_1, stack_name="Test-Stack"
+                )
+        assert [timeout["read"] for timeout in timeouts] == [10.0, 4.0, 5.0]
+
+    async def test_single_flight_deadline(self) -> None:
+        "Test a caller's deadline only stops its own wait for a shared call."
+        requests: List[httpx.Request] = []
+
+        async def handler(request: httpx.Request) -> Response:
+            requests.append(request)
+            await asyncio.sleep(0.15)
+            return Response(
+                status_code=200,
+                json={"ResourceDescription": {"Properties": '{"key": "value"}'}},
+            )
+
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        ) as httpx_client:
+            aws_client = client.Client(
+                credentials=TEST_CREDENTIALS, httpx_client=httpx_client
+            )
+            get_resource = partial(
+                aws_client.get_resource,
+                region=Region.us_east_1,
+                resource_type="AWS::S3::Bucket",
+                identifier="test-bucket",
+            )
+            # The caller with the short deadline starts the shared call.
+            results: List[Any] = await asyncio.gather(
+                get_resource(timeout=0.05), get_resource(), return_exceptions=True
+            )
+        assert isinstance(results[0], client.DeadlineExceededException)
+        assert results[1] == {"key": "value"}
+        assert len(requests) == 1
+
+    async def test_invoke_stream_deadline(self) -> None:
+        "Test the deadline of invoke_stream applies to reading each chunk."
+
+        async def slow_chunks() -> AsyncIterator[bytes]:
+            yield b"first"
+            await asyncio.sleep(10)
+            yield b"second"  # pragma: no cover
+
+        chunks: List[bytes] = []
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(
+                lambda request: Response(status_code=200, content=slow_chunks())
+            )
+        ) as httpx_client:
+            aws_client = client.Client(
+                credentials=TEST_CREDENTIALS, httpx_client=httpx_client
+            )
+            with pytest.raises(client.DeadlineExceededException):
+                async for chunk in aws_client.invoke_stream(
+                    region=Region.us_east_1,
+                    function_name="test-function",
+                    timeout=0.05,
+                ):
+                    chunks.append(chunk)
+        assert chunks == [b"first"]
+
+    async def test_retry_sends_signed_bytes(self) -> None:
+        "Test every attempt sends exactly the bytes that were signed."
+        bodies = []
+
+        def handler(request: httpx.Request) -> Response:
+            bodies.append(request.content)
+            if len(bodies) == 1:
+                return Response(status_code=500, text="Mock response.")
+            return Response(status_code=200, text="Mock response.")
+
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        ) as httpx_client:
+            signed_request = Request(
+                credentials=TEST_CREDENTIALS,
+                method=Method.POST,
+                host="lambda.us-east-1.amazonaws.com",
+                body={"key": "value"},
+            ).sign(
+                utc_now=datetime(2000, 1, 1, tzinfo=UTC),
+                service="lambda",
+                region=Region.us_east_1,
+            )
+            with patch(f"awsync.client.asyncio") as asyncio_mock:
+                asyncio_mock.sleep = AsyncMock()
+                await client.request_with_retry(
+                    client=httpx_client, request=signed_request, logger=Mock()
+                )
+        assert bodies == [b'{"key": "value"}', b'{"key": "value"}']
+
+    async def test_invoke_raw(self) -> None:
+        "Test invoke_raw sends the payload and returns undecoded bytes and headers."
+
+        def handler(request: httpx.Request) -> Response:
+            assert request.url.path == "/2015-03-31/functions/test-function/invocations"
+            assert request.content == b'{"key": "value"}'
+            return Response(
+                status_code=200,
+                content=b'"result"',
+                headers={"x-amzn-RequestId": "request-id"},
+            )
+
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        ) as httpx_client:
+            aws_client = client.Client(
+                credentials=TEST_CREDENTIALS,
+                httpx_client=httpx_client,
+                rate_limiter=None,
+            )
+            response = await aws_client.invoke_raw(
+                region=Region.us_east_1,
+                function_name="test-function",
+                payload=b'{"key": "value"}',
+            )
+            assert response.content == b'"result"'
+            assert response.request_id == "request-id"
+            assert "text" not in vars(response)
+            assert (
+                await aws_client.invoke(
+                    region=Region.us_east_1,
+                    function_name="test-function",
+                    payload='{"key": "value"}',
+                )
+                == '"result"'
+            )
+
+    async def test_stream_with_retry(self) -> None:
+        "Test stream_with_retry retries errors before streaming and yields chunks as they arrive."
+        attempts: List[bytes] = []
+
+        def handler(request: httpx.Request) -> Response:
+            attempts.append(request.content)
+            if len(attempts) == 1:
+                return Response(status_code=400, json=THROTTLING_ERROR)
+            return Response(status_code=200, content=chunked(b"first", b"second"))
+
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        ) as httpx_client:
+            signed_request = Request(
+                credentials=TEST_CREDENTIALS,
+                method=Method.POST,
+                host="lambda.us-east-1.amazonaws.com",
+                body=b"payload",
+            ).sign(
+                utc_now=datetime(2000, 1, 1, tzinfo=UTC),
+                service="lambda",
+                region=Region.us_east_1,
+            )
+            budget = RetryBudget(capacity=10, retry_cost=5)
+            with patch(f"awsync.client.asyncio") as asyncio_mock:
+                asyncio_mock.sleep = AsyncMock()
+                chunks = [
+                    chunk
+                    async for chunk in client.stream_with_retry(
+                        client=httpx_client,
+                        request=signed_request,
+                        logger=Mock(),
+                        retry_budget=budget,
+                    )
+                ]
+        assert chunks == [b"first", b"second"]
+        assert attempts == [b"payload", b"payload"]
+        assert budget.tokens == 10
+
+    async def test_stream_with_retry_status_error(self) -> None:
+        "Test stream_with_retry raises StatusError for non-retryable errors."
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(
+                lambda request: Response(status_code=404, text="Not found.")
+            )
+        ) as httpx_client:
+            signed_request = Request(
+                credentials=TEST_CREDENTIALS,
+                method=Method.GET,
+                host="lambda.us-east-1.amazonaws.com",
+            )
+            with pytest.raises(client.StatusError, match="Not found."):
+                async for _ in client.stream_with_retry(
+                    client=httpx_client, request=signed_request, logger=Mock()
+                ):
+                    pass  # pragma: no cover
+
+    async def test_invoke_stream(self) -> None:
+        "Test invoke_stream yields raw chunks from Invoke and payload chunks from InvokeWithResponseStream."
+        paths: List[str] = []
+        events = encode_message(
+            {":message-type": "event", ":event-type": "PayloadChunk"}, b"a"
+        ) + encode_message({":event-type": "PayloadChunk"}, b"b")
+        complete = encode_message({":event-type": "InvokeComplete"}, b"{}")
+
+        def handler(request: httpx.Request) -> Response:
+            paths.append(request.url.path)
+            if request.url.path.endswith("response-streaming-invocations"):
+                # Split messages across chunk boundaries.
+                return Response(
+                    status_code=200,
+                    content=chunked(events[:5], events[5:30], events[30:] + complete),
+                )
+            return Response(status_code=200, content=chunked(b"a", b"b"))
+
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        ) as httpx_client:
+            aws_client = client.Client(
+                credentials=TEST_CREDENTIALS, httpx_client=httpx_client
+            )
+            for response_stream in (False, True):
+                assert [
+                    chunk
+                    async for chunk in aws_client.invoke_stream(
+                        region=Region.us_east_1,
+                        function_name="test-function",
+                        payload={"key": "value"},
+                        response_stream=response_stream,
+                    )
+                ] == [b"a", b"b"]
+        assert paths == [
+            "/2015-03-31/functions/test-function/invocations",
+            "/2021-11-15/functions/test-function/response-streaming-invocations",
+        ]
+
+    @pytest.mark.parametrize(
+        "message, error",
+        [
+            (
+                encode_message(
+                    {":event-type": "InvokeComplete"},
+                    b'{"ErrorCode": "Unhandled", "ErrorDetails": "Boom"}',
+                ),
+                "Lambda function error 'Unhandled'",
+            ),
+            (
+                encode_message(
+                    {":message-type": "exception", ":exception-type": "Throttled"},
+                    b"",
+                ),
+                "Recieved 'exception' message 'Throttled'",
+            ),
+        ],
+    )
+    async def test_invoke_stream_error(self, message: bytes, error: str) -> None:
+        "Test invoke_stream raises StatusError for function errors and exception messages."
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(
+                lambda request: Response(
+                    status_code=200,
+                    content=encode_message({":event-type": "PayloadChunk"}, b"a")
+                    + message,
+                )
+            )
+        ) as httpx_client:
+            aws_client = client.Client(
+                credentials=TEST_CREDENTIALS, httpx_client=httpx_client
+            )
+            chunks: List[bytes] = []
+            with pytest.raises(client.StatusError, match=error):
+                async for chunk in aws_client.invoke_stream(
+                    region=Region.us_east_1,
+                    function_name="test-function",
+                    response_stream=True,
+                ):
+                    chunks.append(chunk)
+        assert chunks == [b"a"]
@@ -0,0 +1,25 @@
+"Test clock module."
+from datetime import UTC, datetime, timedelta
+
+from awsync.clock import ClockSkew
+
+NOW = datetime(2000, 1, 1, tzinfo=UTC)
+
+
+class TestClock:
+    "Test clock skew correction."
+
+    def test_update(self) -> None:
+        "Test the offset is measured from the Date header beyond the tolerance."
+        clock_skew = ClockSkew()
+        assert not clock_skew.update({}, NOW)
+        assert not clock_skew.update({"Date": "invalid"}, NOW)
+        assert not clock_skew.update({"Date": "Sat, 01 Jan 2000 00:00:05 GMT"}, NOW)
+        assert clock_skew.now(NOW) == NOW
+        assert clock_skew.update({"date": "Sat, 01 Jan 2000 01:00:00 GMT"}, NOW)
+        assert clock_skew.offset == timedelta(hours=1)
+        assert clock_skew.now(NOW) == NOW + timedelta(hours=1)
+        assert not clock_skew.update({"Date": "Sat, 01 Jan 2000 01:00:01 -0000"}, NOW)
+        assert clock_skew.update({"Date": "Sat, 01 Jan 2000 00:00:00 GMT"}, NOW)
+        assert clock_skew.offset == timedelta()
+        assert clock_skew.corrections == 2
@@ -0,0 +1,78 @@
+"Test codec module."
+import json
+import sys
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from awsync import codec
+
+TEST_OBJECT = {"key": "value", "list": [1, 2.5, None, True], "unicode": "São Paulo"}
+
+FAKE_ORJSON = SimpleNamespace(
+    dumps=lambda obj: json.dumps(obj, separators=(",", ":")).encode(),
+    loads=json.loads,
+)
+FAKE_UJSON = SimpleNamespace(
+    dumps=lambda obj, ensure_ascii: json.dumps(obj, ensure_ascii=ensure_ascii),
+    loads=json.loads,
+)
+
+
+class TestCodecs:
+    "Test JSON codec implementations."
+
+    def test_stdlib_codec(self) -> None:
+        "Test StdlibJsonCodec round trips and matches json.dumps."
+        stdlib_codec = codec.StdlibJsonCodec()
+        assert stdlib_codec.dumps(TEST_OBJECT) == json.dumps(TEST_OBJECT).encode()
+        assert stdlib_codec.loads(stdlib_codec.dumps(TEST_OBJECT)) == TEST_OBJECT
+        assert stdlib_codec.loads(json.dumps(TEST_OBJECT)) == TEST_OBJECT
+
+    @patch.dict(sys.modules, {"orjson": FAKE_ORJSON})
+    def test_orjson_codec(self) -> None:
+        "Test OrjsonCodec delegates to orjson."
+        orjson_codec = codec.OrjsonCodec()
+        assert orjson_codec.dumps({"key": "value"}) == b'{"key":"value"}'
+        assert orjson_codec.loads(b'{"key":"value"}') == {"key": "value"}
+
+    @patch.dict(sys.modules, {"ujson": FAKE_UJSON})
+    def test_ujson_codec(self) -> None:
+        "Test UjsonCodec delegates to ujson and encodes to UTF-8 bytes."
+        ujson_codec = codec.UjsonCodec()
+        assert ujson_codec.dumps({"key": "ã"}) == '{"key": "ã"}'.encode()
+        assert ujson_codec.loads(b'{"key": "value"}') == {"key": "value"}
+
+    @pytest.mark.parametrize("module", ["orjson", "ujson"])
+    def test_installed_codecs_round_trip(self, module: str) -> None:
+        "Test installed third party codecs round trip the same objects as the standard library."
+        pytest.importorskip(module)
+        installed_codec = (
+            codec.OrjsonCodec() if module == "orjson" else codec.UjsonCodec()
+        )
+        assert installed_codec.loads(installed_codec.dumps(TEST_OBJECT)) == TEST_OBJECT
+
+
+class TestDefaultCodec:
+    "Test default_codec backend selection."
+
+    @patch.dict(sys.modules, {"orjson": FAKE_ORJSON, "ujson": FAKE_UJSON})
+    def test_prefers_orjson(self) -> None:
+        "Test orjson is preferred when installed."
+        assert default_name() == "orjson"
+
+    @patch.dict(sys.modules, {"orjson": None, "ujson": FAKE_UJSON})
+    def test_falls_back_to_ujson(self) -> None:
+        "Test ujson is used when orjson is not installed."
+        assert default_name() == "ujson"
+
+    @patch.dict(sys.modules, {"orjson": None, "ujson": None})
+    def test_falls_back_to_stdlib(self) -> None:
+        "Test the standard library is used when no faster library is installed."
+        assert default_name() == "json"
+
+
+def default_name() -> str:
+    "Returns the name of the default codec."
+    return codec.default_codec().name
@@ -0,0 +1,350 @@
+"Test credentials module."
+import asyncio
+import datetime
+import os
+from pathlib import Path
+from typing import List, Optional, Union
+from unittest.mock import AsyncMock, Mock, patch
+
+import httpx
+import pytest
+
+from awsync import credentials
+from awsync.models.aws import Credentials
+
+NOW = datetime.datetime(2000, 1, 1, tzinfo=datetime.UTC)
+
+
+def expiring(minutes: float, access_key_id: str = "TESTACCESSKEY") -> Credentials:
+    "Test credentials expiring the given number of minutes after NOW."
+    return Credentials(
+        access_key_id=access_key_id,
+        secret_access_key="TESTSECRETACCESSKEY",
+        session_token="TESTSESSIONTOKEN",
+        expiration=NOW + datetime.timedelta(minutes=minutes),
+    )
+
+
+CREDENTIALS_JSON = {
+    "AccessKeyId": "TESTACCESSKEY",
+    "SecretAccessKey": "TESTSECRETACCESSKEY",
+    "Token": "TESTSESSIONTOKEN",
+    "Expiration": "2000-01-01T01:00:00Z",
+}
+
+
+@pytest.mark.asyncio
+class TestProviders:
+    "Test credential providers."
+
+    @patch.dict(
+        os.environ,
+        {"AWS_ACCESS_KEY_ID": "TESTACCESSKEY", "AWS_SECRET_ACCESS_KEY": "SECRET"},
+        clear=True,
+    )
+    async def test_environment(self) -> None:
+        "Test EnvironmentProvider reads environment variables."
+        assert await credentials.EnvironmentProvider().load() == Credentials(
+            access_key_id="TESTACCESSKEY", secret_access_key="SECRET"
+        )
+
+    @patch.dict(os.environ, {}, clear=True)
+    async def test_environment_unset(self) -> None:
+        "Test EnvironmentProvider returns None when environment variables are not set."
+        assert await credentials.EnvironmentProvider().load() is None
+
+    async def test_shared_file(self, tmp_path: Path) -> None:
+        "Test SharedFileProvider reads profiles from the credentials file, then the config file."
+        credentials_path = tmp_path / "credentials"
+        credentials_path.write_text(
+            "[default]\naws_access_key_id = DEFAULTKEY\naws_secret_access_key = SECRET\n"
+        )
+        config_path = tmp_path / "config"
+        config_path.write_text(
+            "[profile test]\naws_access_key_id = TESTKEY\naws_secret_access_key = SECRET\n"
+            "aws_session_token = TOKEN\n"
+        )
+        with patch.dict(
+            os.environ,
+            {
+                "AWS_SHARED_CREDENTIALS_FILE": str(credentials_path),
+                "AWS_CONFIG_FILE": str(config_path),
+            },
+            clear=True,
+        ):
+            assert await credentials.SharedFileProvider().load() == Credentials(
+                access_key_id="DEFAULTKEY", secret_access_key="SECRET"
+            )
+            with patch.dict(os.environ, {"AWS_PROFILE": "test"}):
+                assert await credentials.SharedFileProvider().load() == Credentials(
+                    access_key_id="TESTKEY",
+                    secret_access_key="SECRET",
+                    session_token="TOKEN",
+                )
+        config_path.write_text("[profile nosecret]\naws_access_key_id = TESTKEY\n")
+        with pytest.raises(
+            credentials.NoCredentialsError, match="no aws_secret_access_key"
+        ):
+            await credentials.SharedFileProvider(
+                profile="nosecret",
+                credentials_path=credentials_path,
+                config_path=config_path,
+            ).load()
+        assert (
+            await credentials.SharedFileProvider(
+                profile="missing",
+                credentials_path=credentials_path,
+                config_path=tmp_path / "missing",
+            ).load()
+            is None
+        )
+
+    async def test_container(self) -> None:
+        "Test ContainerProvider reads credentials from the configured endpoint."
+        requests: List[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(status_code=200, json=CREDENTIALS_JSON)
+
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        ) as httpx_client:
+            provider = credentials.ContainerProvider(httpx_client)
+            with patch.dict(os.environ, {}, clear=True):
+                assert await provider.load() is None
+            with patch.dict(
+                os.environ,
+                {"AWS_CONTAINER_CREDENTIALS_RELATIVE_URI": "/v2/credentials/id"},
+                clear=True,
+            ):
+                assert await provider.load() == expiring(60)
+            with patch.dict(
+                os.environ,
+                {
+                    "AWS_CONTAINER_CREDENTIALS_FULL_URI": "http://localhost:8080/creds",
+                    "AWS_CONTAINER_AUTHORIZATION_TOKEN": "TOKEN",
+                },
+                clear=True,
+            ):
+                assert await provider.load() == expiring(60)
+        assert [str(request.url) for request in requests] == [
+            "http://169.254.170.2/v2/credentials/id",
+            "http://localhost:8080/creds",
+        ]
+        assert "Authorization" not in requests[0].headers
+        assert requests[1].headers["Authorization"] == "TOKEN"
+
+    async def test_container_token_file(self, tmp_path: Path) -> None:
+        "Test ContainerProvider reads the authorization token file before the token variable."
+        token_path = tmp_path / "token"
+        token_path.write_text("FILETOKEN\n")
+        authorizations: List[str] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            authorizations.append(request.headers["Authorization"])
+            return httpx.Response(status_code=200, json=CREDENTIALS_JSON)
+
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        ) as httpx_client:
+            with patch.dict(
+                os.environ,
+                {
+                    "AWS_CONTAINER_CREDENTIALS_FULL_URI": "http://169.254.170.23/v1/credentials",
+                    "AWS_CONTAINER_AUTHORIZATION_TOKEN_FILE": str(token_path),
+                    "AWS_CONTAINER_AUTHORIZATION_TOKEN": "TOKEN",
+                },
+                clear=True,
+            ):
+                assert await credentials.ContainerProvider(
+                    httpx_client
+                ).load() == expiring(60)
+        assert authorizations == ["FILETOKEN"]
+
+    @pytest.mark.parametrize(
+        "uri, allowed",
+        [
+            ("https://example.com/creds", True),
+            ("http://127.0.0.2:8080/creds", True),
+            ("http://[::1]/creds", True),
+            ("http://[fd00:ec2::23]/v1/credentials", True),
+            ("http://example.com/creds", False),
+            ("http://10.0.0.1/creds", False),
+        ],
+    )
+    async def test_container_uri(self, uri: str, allowed: bool) -> None:
+        "Test ContainerProvider only sends the token over http to loopback and container hosts."
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(status_code=200, json=CREDENTIALS_JSON)
+            )
+        ) as httpx_client:
+            provider = credentials.ContainerProvider(httpx_client)
+            with patch.dict(
+                os.environ, {"AWS_CONTAINER_CREDENTIALS_FULL_URI": uri}, clear=True
+            ):
+                if allowed:
+                    assert await provider.load() == expiring(60)
+                else:
+                    with pytest.raises(credentials.NoCredentialsError, match=uri):
+                        await provider.load()
+
+    async def test_instance_metadata(self) -> None:
+        "Test InstanceMetadataProvider fetches a session token, the role and its credentials."
+        requests: List[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            if request.url.path == "/latest/api/token":
+                return httpx.Response(status_code=200, text="IMDSTOKEN")
+            assert request.headers["X-aws-ec2-metadata-token"] == "IMDSTOKEN"
+            if request.url.path.endswith("/security-credentials/"):
+                return httpx.Response(status_code=200, text="test-role\n")
+            return httpx.Response(status_code=200, json=CREDENTIALS_JSON)
+
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        ) as httpx_client:
+            with patch.dict(
+                os.environ,
+                {"AWS_EC2_METADATA_SERVICE_ENDPOINT": "http://localhost:1338/"},
+                clear=True,
+            ):
+                assert await credentials.InstanceMetadataProvider(
+                    httpx_client
+                ).load() == expiring(60)
+        assert [(request.method, request.url.path) for request in requests] == [
+            ("PUT", "/latest/api/token"),
+            ("GET", "/latest/meta-data/iam/security-credentials/"),
+            ("GET", "/latest/meta-data/iam/security-credentials/test-role"),
+        ]
+
+    async def test_instance_metadata_unavailable(self) -> None:
+        "Test InstanceMetadataProvider returns None if disabled or unreachable."
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError("Unreachable.")
+
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        ) as httpx_client:
+            provider = credentials.InstanceMetadataProvider(httpx_client)
+            with patch.dict(os.environ, {}, clear=True):
+                assert await provider.load() is None
+            with patch.dict(os.environ, {"AWS_EC2_METADATA_DISABLED": "true"}):
+                assert await provider.load() is None
+
+    async def test_chain(self) -> None:
+        "Test CredentialProviderChain returns credentials from the first configured provider."
+        unconfigured = Mock(load=AsyncMock(return_value=None))
+        first = Mock(load=AsyncMock(return_value=expiring(60, "FIRST")))
+        second = Mock(load=AsyncMock(return_value=expiring(60, "SECOND")))
+        chain = credentials.CredentialProviderChain([unconfigured, first, second])
+        assert await chain.load() == expiring(60, "FIRST")
+        second.load.assert_not_awaited()
+        assert await credentials.CredentialProviderChain([unconfigured]).load() is None
+
+    async def test_default_chain(self) -> None:
+        "Test the default chain order."
+        chain = credentials.CredentialProviderChain.default(Mock())
+        assert [type(provider) for provider in chain.providers] == [
+            credentials.EnvironmentProvider,
+            credentials.SharedFileProvider,
+            credentials.ContainerProvider,
+            credentials.InstanceMetadataProvider,
+        ]
+
+
+class Provider:
+    "A provider returning queued credentials, waiting for release before each load."
+
+    def __init__(self, *results: Union[Credentials, Exception, None]) -> None:
+        self.results = list(results)
+        self.loads = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def load(self) -> Optional[Credentials]:
+        self.loads += 1
+        await self.release.wait()
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+@pytest.mark.asyncio
+class TestCachedCredentials:
+    "Test CachedCredentials class."
+
+    async def test_utcnow(self) -> None:
+        "Test the default utcnow returns an aware datetime in UTC."
+        assert credentials.CachedCredentials(Provider()).utcnow().tzinfo == datetime.UTC
+
+    async def test_static(self) -> None:
+        "Test credentials without expiration are loaded once."
+        static = Credentials(access_key_id="KEY", secret_access_key="SECRET")
+        provider = Provider(static)
+        cache = credentials.CachedCredentials(provider)
+        assert await cache.get() == static
+        assert await cache.get() == static
+        assert provider.loads == 1
+        assert cache.refreshes == 1
+
+    async def test_single_flight(self) -> None:
+        "Test concurrent callers without cached credentials share a single load."
+        provider = Provider(expiring(60))
+        provider.release.clear()
+        cache = credentials.CachedCredentials(provider, utcnow=lambda: NOW)
+        tasks = [asyncio.create_task(cache.get()) for _ in range(10)]
+        await asyncio.sleep(0)
+        provider.release.set()
+        assert await asyncio.gather(*tasks) == [expiring(60)] * 10
+        assert provider.loads == 1
+
+    async def test_background_refresh(self) -> None:
+        "Test credentials within refresh_ahead of expiration are refreshed in the background."
+        provider = Provider(expiring(10), expiring(60, "REFRESHED"))
+        cache = credentials.CachedCredentials(provider, utcnow=lambda: NOW)
+        assert await cache.get() == expiring(10)
+        provider.release.clear()
+        # Returned without waiting while a single refresh is in flight.
+        assert await cache.get() == expiring(10)
+        assert await cache.get() == expiring(10)
+        provider.release.set()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert provider.loads == 2
+        assert await cache.get() == expiring(60, "REFRESHED")
+
+    async def test_expired(self) -> None:
+        "Test callers wait for a refresh when credentials are within expiry_margin of expiring."
+        provider = Provider(expiring(0.5), expiring(60, "REFRESHED"))
+        cache = credentials.CachedCredentials(provider, utcnow=lambda: NOW)
+        assert await cache.get() == expiring(0.5)
+        assert await cache.get() == expiring(60, "REFRESHED")
+
+    async def test_no_credentials(self) -> None:
+        "Test NoCredentialsError is raised if the provider returns None."
+        cache = credentials.CachedCredentials(Provider(None))
+        with pytest.raises(credentials.NoCredentialsError):
+            await cache.get()
+
+    async def test_background_refresh_failure(self) -> None:
+        "Test a failed background refresh is logged and the cached credentials are kept."
+        provider = Provider(expiring(10), ValueError("Failed."), expiring(60, "NEW"))
+        logger = Mock()
+        cache = credentials.CachedCredentials(
+            provider, utcnow=lambda: NOW, logger=logger
+        )
+        assert await cache.get() == expiring(10)
+        assert await cache.get() == expiring(10)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        logger.warning.assert_called_once()
+        # The next call starts a new refresh.
+        assert await cache.get() == expiring(10)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert await cache.get() == expiring(60, "NEW")
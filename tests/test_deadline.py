@@ -0,0 +1,97 @@
+"Test deadline module."
+import asyncio
+from typing import List
+
+import httpx
+import pytest
+
+from awsync.deadline import Deadline, within
+from awsync.errors import AwsError, DeadlineExceededException
+from tests.conftest import FakeClock
+
+
+@pytest.mark.asyncio
+class TestDeadline:
+    "Test Deadline class and within."
+
+    @pytest.fixture(autouse=True)
+    def setup(self, clock: FakeClock) -> None:
+        "A deadline of 10 seconds on a fake clock."
+        self.clock = clock
+        self.deadline = Deadline(10.0, monotonic=self.clock)
+        self.calls: List[str] = []
+
+    async def call(self) -> str:
+        "Record the call."
+        self.calls.append("call")
+        return "result"
+
+    async def test_remaining(self) -> None:
+        "Test the seconds remaining shrink with the clock and check raises once it has passed."
+        assert self.deadline.expires == 10.0
+        assert self.deadline.check() == 10.0
+        self.clock.now = 6.0
+        assert self.deadline.remaining() == 4.0
+        self.clock.now = 11.0
+        assert self.deadline.remaining() == 0.0
+        error = AwsError(status=500, code="InternalError", message="Failed.")
+        with pytest.raises(
+            DeadlineExceededException, match="'10.0' seconds exceeded. Last error"
+        ) as exc_info:
+            self.deadline.check(error)
+        assert exc_info.value.error is error
+        assert isinstance(exc_info.value, TimeoutError)
+
+    async def test_httpx_timeout(self) -> None:
+        "Test httpx timeouts are capped to the seconds remaining, including disabled timeouts."
+        self.clock.now = 6.0
+        assert self.deadline.httpx_timeout(httpx.Timeout(None, connect=1.0)) == {
+            "connect": 1.0,
+            "read": 4.0,
+            "write": 4.0,
+            "pool": 4.0,
+        }
+
+    async def test_within(self) -> None:
+        "Test within awaits the function, or raises without calling it once the deadline has passed."
+        assert await within(None, self.call) == "result"
+        assert await within(self.deadline, self.call) == "result"
+        self.clock.now = 10.0
+        with pytest.raises(DeadlineExceededException):
+            await within(self.deadline, self.call)
+        assert self.calls == ["call", "call"]
+
+    async def test_within_cancels(self) -> None:
+        "Test within cancels the function when the deadline passes."
+        cancelled = asyncio.Event()
+
+        async def wait() -> None:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with pytest.raises(DeadlineExceededException):
+            await within(Deadline(0.01), wait)
+        assert cancelled.is_set()
+
+    async def test_within_other_timeouts(self) -> None:
+        "Test timeouts not caused by the deadline are raised unchanged."
+
+        async def timeout() -> None:
+            raise TimeoutError("Other timeout.")
+
+        async def httpx_timeout() -> None:
+            raise httpx.ReadTimeout("Read timeout.")
+
+        async def httpx_deadline() -> None:
+            self.clock.now = 10.0
+            raise httpx.ReadTimeout("Read timeout.")
+
+        with pytest.raises(TimeoutError, match="Other timeout."):
+            await within(self.deadline, timeout)
+        with pytest.raises(httpx.ReadTimeout):
+            await within(self.deadline, httpx_timeout)
+        with pytest.raises(DeadlineExceededException):
+            await within(self.deadline, httpx_deadline)
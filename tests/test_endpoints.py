@@ -0,0 +1,45 @@
+"Test endpoints module."
+import pytest
+
+from awsync.endpoints import Endpoint, EndpointResolver
+from awsync.models.aws import Region
+from awsync.models.http import Scheme
+
+
+class TestEndpointResolver:
+    "Test EndpointResolver class."
+
+    @pytest.mark.parametrize(
+        "fips, dualstack, host",
+        [
+            (False, False, "lambda.eu-west-1.amazonaws.com"),
+            (True, False, "lambda-fips.eu-west-1.amazonaws.com"),
+            (False, True, "lambda.eu-west-1.api.aws"),
+            (True, True, "lambda-fips.eu-west-1.api.aws"),
+        ],
+    )
+    def test_variants(self, fips: bool, dualstack: bool, host: str) -> None:
+        "Test FIPS and dual-stack endpoint variants."
+        resolver = EndpointResolver(fips=fips, dualstack=dualstack)
+        assert resolver.resolve("lambda", Region.eu_west_1) == Endpoint(host=host)
+
+    def test_precomputed(self) -> None:
+        "Test endpoints for known services are precomputed and unknown services are cached."
+        resolver = EndpointResolver(services=["sqs"])
+        endpoint = resolver.resolve("sqs", Region.us_east_1)
+        assert endpoint is resolver.resolve("sqs", Region.us_east_1)
+        sts = resolver.resolve("sts", Region.us_east_1)
+        assert sts == Endpoint(host="sts.us-east-1.amazonaws.com")
+        assert sts is resolver.resolve("sts", Region.us_east_1)
+
+    def test_overrides(self) -> None:
+        "Test service endpoints take precedence over an endpoint for every service."
+        local = Endpoint(host="localhost:4566", scheme=Scheme.http)
+        lambda_local = Endpoint(host="localhost:9001", scheme=Scheme.http)
+        resolver = EndpointResolver(
+            endpoint=local, service_endpoints={"lambda": lambda_local}
+        )
+        assert resolver.resolve("lambda", Region.us_west_2) == lambda_local
+        assert resolver.resolve("cloudformation", Region.us_west_2) == local
+        assert resolver.resolve("sts", Region.us_west_2) == local
+        assert local.get_url() == "http://localhost:4566/"
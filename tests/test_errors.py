@@ -0,0 +1,146 @@
+"Test errors module."
+from typing import Dict, Optional, Tuple
+
+import pytest
+
+from awsync.errors import (
+    AwsError,
+    ClockSkewError,
+    ErrorKind,
+    MAX_MESSAGE_LENGTH,
+    ThrottlingError,
+    TransientError,
+    classify,
+    parse_error,
+)
+
+
+class TestParseError:
+    "Test parse_error function."
+
+    @pytest.mark.parametrize(
+        "content, headers, expected",
+        [
+            (  # JSON protocol.
+                b'{"__type": "com.amazonaws.lambda#ResourceNotFoundException", "message": "Not found."}',
+                {},
+                ("ResourceNotFoundException", "Not found.", None),
+            ),
+            (  # REST-JSON protocol with the error type header.
+                b'{"Message": "Rate exceeded", "RequestId": "id"}',
+                {
+                    "x-amzn-ErrorType": "TooManyRequestsException:http://internal.amazon.com/"
+                },
+                ("TooManyRequestsException", "Rate exceeded", "id"),
+            ),
+            (  # Query protocol requested as JSON.
+                b' {"Error": {"Code": "Throttling", "Message": "Rate exceeded"}, "RequestId": "id"}',
+                {},
+                ("Throttling", "Rate exceeded", "id"),
+            ),
+            (  # REST-XML protocol.
+                b"<Error><Code>SlowDown</Code><Message>Reduce your request rate.</Message>"
+                b"<RequestId>id</RequestId></Error>",
+                {},
+                ("SlowDown", "Reduce your request rate.", "id"),
+            ),
+            (  # Query protocol.
+                b'<ErrorResponse xmlns="http://cloudformation.amazonaws.com/doc/2010-05-15/">'
+                b"<Error><Type>Sender</Type><Code>ValidationError</Code>"
+                b"<Message>Stack does not exist</Message></Error>"
+                b"<RequestId>id</RequestId></ErrorResponse>",
+                {},
+                ("ValidationError", "Stack does not exist", "id"),
+            ),
+            (  # EC2 protocol.
+                b"<Response><Errors><Error><Code>RequestLimitExceeded</Code>"
+                b"<Message>Request limit exceeded.</Message></Error></Errors>"
+                b"<RequestID>id</RequestID></Response>",
+                {},
+                ("RequestLimitExceeded", "Request limit exceeded.", "id"),
+            ),
+            (b"Not found.", {}, (None, "Not found.", None)),
+            (b"{invalid", {}, (None, "{invalid", None)),
+            (b"<invalid", {}, (None, "<invalid", None)),
+            (b"[]", {}, (None, "[]", None)),
+            (b'{"__type": 1}', {}, (None, '{"__type": 1}', None)),
+        ],
+    )
+    def test_parse_error(
+        self,
+        content: bytes,
+        headers: Dict[str, str],
+        expected: Tuple[Optional[str], str, Optional[str]],
+    ) -> None:
+        "Test error codes, messages and request IDs are parsed from each protocol."
+        assert parse_error(content, headers) == expected
+
+    def test_parse_error_truncated(self) -> None:
+        "Test unparsed error bodies are truncated."
+        code, message, _ = parse_error(b"x" * 10000, {})
+        assert code is None
+        assert message == "x" * MAX_MESSAGE_LENGTH
+
+
+class TestClassify:
+    "Test classify function and typed errors."
+
+    @pytest.mark.parametrize(
+        "status, code, kind",
+        [
+            (400, "Throttling", ErrorKind.throttle),
+            (400, "ThrottlingException", ErrorKind.throttle),
+            (429, None, ErrorKind.throttle),
+            (503, "SlowDown", ErrorKind.throttle),
+            (403, "RequestTimeTooSkewed", ErrorKind.clock_skew),
+            (403, "SignatureDoesNotMatch", ErrorKind.clock_skew),
+            (400, "RequestTimeout", ErrorKind.transient),
+            (500, None, ErrorKind.transient),
+            (503, "ServiceUnavailable", ErrorKind.transient),
+            (400, "ValidationError", ErrorKind.non_retryable),
+            (301, None, ErrorKind.non_retryable),
+        ],
+    )
+    def test_classify(self, status: int, code: Optional[str], kind: ErrorKind) -> None:
+        "Test errors are classified by status code and error code."
+        assert classify(status, code) == kind
+
+    def test_from_response(self) -> None:
+        "Test errors are parsed into the type of their classification."
+        throttling = AwsError.from_response(
+            429,
+            b'{"message": "Slow down."}',
+            {"x-amzn-RequestId": "header-id", "Retry-After": "2.5"},
+        )
+        assert isinstance(throttling, ThrottlingError)
+        assert throttling.retryable
+        assert (throttling.status, throttling.code, throttling.message) == (
+            429,
+            None,
+            "Slow down.",
+        )
+        assert (throttling.request_id, throttling.retry_after) == ("header-id", 2.5)
+        assert str(throttling) == (
+            "AWS API responded with status '429' error 'None': 'Slow down.'. "
+            "Request ID: 'header-id'"
+        )
+        transient = AwsError.from_response(500, b"", {"Retry-After": "soon"})
+        assert isinstance(transient, TransientError)
+        assert transient.retryable
+        assert transient.retry_after is None
+        skewed = AwsError.from_response(
+            403,
+            b"<Error><Code>RequestTimeTooSkewed</Code></Error>",
+            {"Retry-After": "-1"},
+        )
+        assert isinstance(skewed, ClockSkewError)
+        assert not skewed.retryable
+        assert skewed.retry_after is None
+        assert skewed.message == "<Error><Code>RequestTimeTooSkewed</Code></Error>"
+        error = AwsError.from_response(
+            400, b'{"__type": "ValidationException", "message": "Invalid."}', {}
+        )
+        assert type(error) is AwsError
+        assert error.kind == ErrorKind.non_retryable
+        assert not error.retryable
+        assert error.response is None
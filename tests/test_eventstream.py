@@ -0,0 +1,174 @@
+"Test eventstream module."
+import datetime
+import random
+import struct
+from typing import AsyncIterator, List
+import uuid
+import zlib
+
+import pytest
+
+from awsync import eventstream
+
+TEST_HEADERS: "dict[str, eventstream.HeaderValue]" = {
+    ":message-type": "event",
+    ":event-type": "PayloadChunk",
+    "true": True,
+    "false": False,
+    "int": -42,
+    "bytes": b"\x00\x01",
+    "timestamp": datetime.datetime(2000, 1, 1, tzinfo=datetime.UTC),
+    "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+}
+
+
+def decode_all(
+    data: bytes, chunk_sizes: List[int]
+) -> List[eventstream.EventStreamMessage]:
+    "Decode data fed in chunks of the given sizes, cycling through sizes."
+    decoder = eventstream.EventStreamDecoder()
+    messages: List[eventstream.EventStreamMessage] = []
+    offset = 0
+    index = 0
+    while offset < len(data):
+        size = chunk_sizes[index % len(chunk_sizes)]
+        messages.extend(decoder.feed(data[offset : offset + size]))
+        offset += size
+        index += 1
+    decoder.close()
+    return messages
+
+
+def with_header_bytes(headers: bytes, payload: bytes = b"") -> bytes:
+    "Encode a message with raw header bytes and valid CRCs."
+    total_length = 16 + len(headers) + len(payload)
+    prelude = struct.pack(">II", total_length, len(headers))
+    message = prelude + struct.pack(">I", zlib.crc32(prelude)) + headers + payload
+    return message + struct.pack(">I", zlib.crc32(message))
+
+
+class TestEventStreamDecoder:
+    "Test EventStreamDecoder class."
+
+    def test_round_trip(self) -> None:
+        "Test every header type and the payload round trip through encode and decode."
+        data = eventstream.encode_message(TEST_HEADERS, b"payload")
+        (message,) = eventstream.EventStreamDecoder().feed(data)
+        assert message.headers == TEST_HEADERS
+        assert bytes(message.payload) == b"payload"
+        assert message.message_type == "event"
+        assert message.event_type == "PayloadChunk"
+
+    def test_decode_integer_types(self) -> None:
+        "Test byte, short and long integer header types are decoded."
+        headers = (
+            b"\x01a\x02\xff" + b"\x01b\x03\x01\x00" + b"\x01c\x05" + (2**40).to_bytes(8)
+        )
+        (message,) = eventstream.EventStreamDecoder().feed(with_header_bytes(headers))
+        assert message.headers == {"a": -1, "b": 256, "c": 2**40}
+
+    def test_zero_copy(self) -> None:
+        "Test payloads of messages contained in a chunk are views of the chunk."
+        data = eventstream.encode_message({}, b"payload")
+        (message,) = eventstream.EventStreamDecoder().feed(data)
+        assert isinstance(message.payload, memoryview)
+        assert message.payload.obj is data
+
+    @pytest.mark.parametrize("chunk_sizes", [[1], [7], [13, 1, 100], [1_000_000]])
+    def test_chunk_boundaries(self, chunk_sizes: List[int]) -> None:
+        "Test messages are decoded identically for any chunk boundaries."
+        payloads = [bytes([index]) * index * 10 for index in range(20)]
+        data = b"".join(
+            eventstream.encode_message({":event-type": "PayloadChunk"}, payload)
+            for payload in payloads
+        )
+        messages = decode_all(data, chunk_sizes)
+        assert [bytes(message.payload) for message in messages] == payloads
+
+    def test_random_chunk_boundaries(self) -> None:
+        "Test random chunk boundaries over a multi message stream."
+        rng = random.Random(0)
+        payloads = [rng.randbytes(rng.randint(0, 5000)) for _ in range(50)]
+        data = b"".join(eventstream.encode_message({}, p) for p in payloads)
+        messages = decode_all(data, [rng.randint(1, 9000) for _ in range(100)])
+        assert [bytes(message.payload) for message in messages] == payloads
+
+    def test_exception_message(self) -> None:
+        "Test message and event type properties for exception messages."
+        (message,) = eventstream.EventStreamDecoder().feed(
+            eventstream.encode_message(
+                {":message-type": "exception", ":exception-type": "Boom"}, b""
+            )
+        )
+        assert message.message_type == "exception"
+        assert message.event_type == "Boom"
+
+    def test_prelude_crc_mismatch(self) -> None:
+        "Test a corrupt prelude raises EventStreamError."
+        data = bytearray(eventstream.encode_message({}, b"payload"))
+        data[8] ^= 0xFF
+        with pytest.raises(eventstream.EventStreamError, match="prelude CRC"):
+            eventstream.EventStreamDecoder().feed(bytes(data))
+
+    def test_message_crc_mismatch(self) -> None:
+        "Test a corrupt payload raises EventStreamError."
+        data = bytearray(eventstream.encode_message({}, b"payload"))
+        data[-5] ^= 0xFF
+        with pytest.raises(eventstream.EventStreamError, match="message CRC"):
+            eventstream.EventStreamDecoder().feed(bytes(data))
+
+    def test_max_message_length(self) -> None:
+        "Test messages longer than max_message_length raise EventStreamError."
+        data = eventstream.encode_message({}, b"payload")
+        with pytest.raises(eventstream.EventStreamError, match="Invalid"):
+            eventstream.EventStreamDecoder(max_message_length=16).feed(data)
+
+    def test_max_message_length_buffered(self) -> None:
+        "Test the length of a buffered partial message is validated once its prelude arrives."
+        data = eventstream.encode_message({}, b"payload")
+        decoder = eventstream.EventStreamDecoder(max_message_length=16)
+        decoder.feed(data[:4])
+        with pytest.raises(eventstream.EventStreamError, match="Invalid"):
+            decoder.feed(data[4:12])
+
+    @pytest.mark.parametrize(
+        "headers",
+        [
+            b"\x01a\x0a",  # Unknown type
+            b"\x01a\x07\x00\x05abc",  # Truncated string
+            b"\x01a\x09abc",  # Truncated UUID
+            b"\x01a",  # Missing type
+            b"\x01a\x04\x00",  # Truncated integer
+        ],
+    )
+    def test_malformed_headers(self, headers: bytes) -> None:
+        "Test malformed headers raise EventStreamError."
+        with pytest.raises(eventstream.EventStreamError):
+            eventstream.EventStreamDecoder().feed(with_header_bytes(headers))
+
+    def test_close_partial(self) -> None:
+        "Test closing with a partial message raises EventStreamError."
+        decoder = eventstream.EventStreamDecoder()
+        decoder.feed(eventstream.encode_message({}, b"payload")[:-1])
+        with pytest.raises(eventstream.EventStreamError, match="partial"):
+            decoder.close()
+
+
+@pytest.mark.asyncio
+class TestDecodeStream:
+    "Test decode_stream function."
+
+    async def test_decode_stream(self) -> None:
+        "Test messages are decoded from an async byte stream."
+        data = eventstream.encode_message({}, b"one") + eventstream.encode_message(
+            {}, b"two"
+        )
+
+        async def chunks() -> AsyncIterator[bytes]:
+            for index in range(0, len(data), 5):
+                yield data[index : index + 5]
+
+        assert [
+            bytes(message.payload)
+            async for message in eventstream.decode_stream(chunks())
+        ] == [b"one", b"two"]
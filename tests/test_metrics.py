@@ -0,0 +1,116 @@
+"Test metrics module."
+from typing import Any
+
+from awsync.metrics import Histogram, Metrics, OperationSnapshot
+from awsync.tracing import Phase, TraceEvent
+
+
+def event(phase: Phase, **kwargs: Any) -> TraceEvent:
+    "A trace event for ListStackResources."
+    return TraceEvent(
+        **{
+            "phase": phase,
+            "operation": "ListStackResources",
+            "service": "cloudformation",
+            "region": "us-east-1",
+            "start_time": 0.0,
+            "duration": 0.0,
+            **kwargs,
+        }
+    )
+
+
+class TestHistogram:
+    "Test Histogram class."
+
+    def test_record(self) -> None:
+        "Test values are counted in the bucket of the first bound at or above them."
+        histogram = Histogram([1.0, 2.0])
+        for value in (0.5, 1.0, 1.5, 3.0):
+            histogram.record(value)
+        assert list(histogram.counts) == [2, 1, 1]
+        assert histogram.count == 4
+        assert histogram.sum == 6.0
+
+    def test_percentile(self) -> None:
+        "Test percentiles are interpolated within buckets and overflow is the largest bound."
+        histogram = Histogram([1.0, 2.0, 4.0])
+        assert histogram.percentile(50) == 0.0
+        for value in (0.5, 0.5, 3.0, 3.0):
+            histogram.record(value)
+        assert histogram.percentile(25) == 0.5
+        assert histogram.percentile(50) == 1.0
+        assert histogram.percentile(75) == 3.0
+        assert histogram.percentile(100) == 4.0
+        histogram.record(100.0)
+        assert histogram.percentile(100) == 4.0
+
+
+class TestMetrics:
+    "Test Metrics class."
+
+    def test_snapshot(self) -> None:
+        "Test send and call events are aggregated per operation."
+        metrics = Metrics(bounds=[1.0, 0.1])
+        metrics(event(Phase.sign, duration=5.0))
+        metrics(event(Phase.send, throttled=True))
+        metrics(event(Phase.send, attempt=1))
+        metrics(
+            event(
+                Phase.call,
+                duration=0.05,
+                attempt=1,
+                bytes_sent=10,
+                bytes_received=100,
+            )
+        )
+        metrics(event(Phase.call, duration=2.0, error=ValueError("Mock error.")))
+        metrics(event(Phase.call, region="us-west-2", duration=0.5))
+        first, second = metrics.snapshot()
+        assert first == OperationSnapshot(
+            service="cloudformation",
+            operation="ListStackResources",
+            region="us-east-1",
+            calls=2,
+            errors=1,
+            retries=1,
+            attempts=2,
+            throttles=1,
+            bytes_sent=10,
+            bytes_received=100,
+            latency_p50=0.1,
+            latency_p90=1.0,
+            latency_p99=1.0,
+            latency_sum=2.05,
+            latency_buckets=((0.1, 1), (1.0, 1), (float("inf"), 2)),
+        )
+        assert first.throttle_rate == 0.5
+        assert second.region == "us-west-2"
+        assert second.throttle_rate == 0.0
+
+    def test_prometheus(self) -> None:
+        "Test the Prometheus text exposition format."
+        metrics = Metrics(bounds=[0.1])
+        assert metrics.prometheus().startswith(
+            "# HELP awsync_call_duration_seconds Call latency including retries.\n"
+            "# TYPE awsync_call_duration_seconds histogram\n"
+            "# HELP awsync_calls_total Total number of calls.\n"
+        )
+        metrics(event(Phase.send, throttled=True))
+        metrics(event(Phase.call, duration=0.05, bytes_sent=10))
+        labels = (
+            'service="cloudformation",operation="ListStackResources",region="us-east-1"'
+        )
+        text = metrics.prometheus(prefix="test")
+        assert text.splitlines()[:5] == [
+            "# HELP test_call_duration_seconds Call latency including retries.",
+            "# TYPE test_call_duration_seconds histogram",
+            f'test_call_duration_seconds_bucket{{{labels},le="0.1"}} 1',
+            f'test_call_duration_seconds_bucket{{{labels},le="+Inf"}} 1',
+            f"test_call_duration_seconds_sum{{{labels}}} 0.05",
+        ]
+        assert f"test_call_duration_seconds_count{{{labels}}} 1\n" in text
+        assert "# TYPE test_throttles_total counter\n" in text
+        assert f"test_throttles_total{{{labels}}} 1\n" in text
+        assert f"test_sent_bytes_total{{{labels}}} 10\n" in text
+        assert text.endswith(f"test_received_bytes_total{{{labels}}} 0\n")
@@ -0,0 +1,92 @@
+"Test pagination module."
+import asyncio
+from contextlib import aclosing
+from typing import Dict, List, Optional, Tuple
+
+import pytest
+
+from awsync.pagination import paginate
+
+PAGES: Dict[Optional[str], Tuple[List[int], Optional[str]]] = {
+    None: ([1, 2], "page-2"),
+    "page-2": ([3, 4], "page-3"),
+    "page-3": ([5], None),
+}
+
+
+@pytest.mark.asyncio
+class TestPaginate:
+    "Test paginate function."
+
+    async def fetch_page(self, token: Optional[str]) -> Tuple[List[int], Optional[str]]:
+        "Fetch a page from PAGES, recording the requested tokens."
+        self.requested.append(token)
+        await asyncio.sleep(0)
+        return PAGES[token]
+
+    def setup_method(self) -> None:
+        "Reset requested tokens."
+        self.requested: List[Optional[str]] = []
+
+    async def test_paginate(self) -> None:
+        "Test all pages are yielded in order without prefetching."
+        pages = [page async for page in paginate(self.fetch_page)]
+        assert pages == [[1, 2], [3, 4], [5]]
+        assert self.requested == [None, "page-2", "page-3"]
+
+    async def test_paginate_next_token(self) -> None:
+        "Test pagination starts from the provided token."
+        pages = [page async for page in paginate(self.fetch_page, next_token="page-2")]
+        assert pages == [[3, 4], [5]]
+
+    async def test_paginate_prefetch(self) -> None:
+        "Test all pages are yielded in order with prefetching."
+        pages = [page async for page in paginate(self.fetch_page, prefetch=1)]
+        assert pages == [[1, 2], [3, 4], [5]]
+        assert self.requested == [None, "page-2", "page-3"]
+
+    async def test_paginate_prefetch_bounded(self) -> None:
+        """
+        Test prefetching is bounded by the look-ahead and stops when the consumer stops.
+        With a look-ahead of 1, at most the current page, one queued page and one
+        in-flight page have been requested.
+        """
+        pages = paginate(self.fetch_page, prefetch=1)
+        assert await pages.__anext__() == [1, 2]
+        for _ in range(10):
+            await asyncio.sleep(0)
+        assert self.requested == [None, "page-2", "page-3"]
+        await pages.aclose()
+
+    async def test_paginate_prefetch_close(self) -> None:
+        "Test closing the generator early cancels and awaits the in-flight fetch."
+        cancelled = asyncio.Event()
+
+        async def fetch_page(token: Optional[str]) -> Tuple[List[int], Optional[str]]:
+            if token:
+                try:
+                    await asyncio.Event().wait()
+                except asyncio.CancelledError:
+                    cancelled.set()
+                    raise
+            return [1], "page-2"
+
+        async with aclosing(paginate(fetch_page, prefetch=1)) as pages:
+            async for page in pages:
+                assert page == [1]
+                break
+        assert cancelled.is_set()
+
+    async def test_paginate_prefetch_error(self) -> None:
+        "Test exceptions raised while prefetching are raised to the consumer."
+
+        async def fetch_page(token: Optional[str]) -> Tuple[List[int], Optional[str]]:
+            if token:
+                raise ValueError("Mock error.")
+            return [1], "page-2"
+
+        pages: List[List[int]] = []
+        with pytest.raises(ValueError):
+            async for page in paginate(fetch_page, prefetch=2):
+                pages.append(page)
+        assert pages == [[1]]
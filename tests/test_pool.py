@@ -0,0 +1,74 @@
+"Test pool module."
+import asyncio
+from typing import List
+
+import httpx
+import pytest
+
+from awsync import pool
+
+
+def mock_pools(transport: httpx.MockTransport) -> pool.ConnectionPools:
+    "Connection pools using a mock transport for every host."
+    return pool.ConnectionPools(transport_factory=lambda config: transport)
+
+
+@pytest.mark.asyncio
+class TestConnectionPools:
+    "Test ConnectionPools class."
+
+    async def test_default_transport(self) -> None:
+        "Test the default transport is an httpx transport with its own pool."
+        async with pool.ConnectionPools(pool.PoolConfig(max_connections=5)) as pools:
+            httpx_client = pools.client("example.com")
+            assert isinstance(httpx_client, httpx.AsyncClient)
+            assert httpx_client.timeout == httpx.Timeout(5.0)
+        assert httpx_client.is_closed
+
+    async def test_client_per_host(self) -> None:
+        "Test each host gets its own client, reused for later requests."
+        created: List[pool.PoolConfig] = []
+        config = pool.PoolConfig(http2=True)
+
+        def factory(config: pool.PoolConfig) -> httpx.AsyncBaseTransport:
+            created.append(config)
+            return httpx.MockTransport(lambda request: httpx.Response(200))
+
+        pools = pool.ConnectionPools(config, transport_factory=factory)
+        first = pools.client("cloudformation.us-east-1.amazonaws.com")
+        assert pools.client("cloudformation.us-east-1.amazonaws.com") is first
+        assert pools.client("cloudformation.us-west-2.amazonaws.com") is not first
+        assert created == [config, config]
+        await pools.aclose()
+        assert first.is_closed
+        assert pools.stats() == {}
+
+    async def test_stats(self) -> None:
+        "Test requests, errors and concurrent in-flight requests are counted per host."
+        release = asyncio.Event()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path == "/error":
+                raise httpx.ConnectError("Mock error.")
+            await release.wait()
+            return httpx.Response(200)
+
+        async with mock_pools(httpx.MockTransport(handler)) as pools:
+            httpx_client = pools.client("example.com")
+            tasks = [
+                asyncio.create_task(httpx_client.get("https://example.com/"))
+                for _ in range(3)
+            ]
+            await asyncio.sleep(0)
+            assert pools.stats()["example.com"] == pool.PoolStats(
+                requests=3, errors=0, in_flight=3, peak_in_flight=3
+            )
+            release.set()
+            await asyncio.gather(*tasks)
+            with pytest.raises(httpx.ConnectError):
+                await httpx_client.get("https://example.com/error")
+            assert pools.stats() == {
+                "example.com": pool.PoolStats(
+                    requests=4, errors=1, in_flight=0, peak_in_flight=3
+                )
+            }
@@ -0,0 +1,80 @@
+"Test ratelimit module."
+from unittest.mock import patch
+
+import pytest
+
+from awsync.ratelimit import AdaptiveRateLimiter, AdaptiveTokenBucket
+from tests.conftest import FakeClock
+
+
+def throttled_bucket(clock: FakeClock) -> AdaptiveTokenBucket:
+    "Returns a bucket measured at 10 requests per second and then throttled."
+    bucket = AdaptiveTokenBucket(monotonic=clock)
+    for _ in range(10):
+        clock.now += 0.1
+        bucket.update(throttled=False)
+    bucket.update(throttled=True)
+    return bucket
+
+
+@pytest.mark.asyncio
+class TestAdaptiveTokenBucket:
+    "Test AdaptiveTokenBucket class."
+
+    async def test_disabled_until_throttled(self, clock: FakeClock) -> None:
+        "Test acquire does not wait before the first throttling response."
+        bucket = AdaptiveTokenBucket(monotonic=clock)
+        bucket.update(throttled=False)
+        with patch("awsync.ratelimit.asyncio.sleep", clock.sleep):
+            assert [await bucket.acquire() for _ in range(100)] == [0.0] * 100
+        assert not bucket.enabled
+        assert clock.sleeps == []
+
+    async def test_throttle_lowers_rate(self, clock: FakeClock) -> None:
+        "Test a throttling response sets the fill rate below the measured rate."
+        bucket = throttled_bucket(clock)
+        assert bucket.enabled
+        assert bucket.throttles == 1
+        assert bucket.fill_rate == pytest.approx(bucket.measured_rate * 0.7)
+        previous_rate = bucket.fill_rate
+        bucket.update(throttled=True)
+        assert bucket.fill_rate < previous_rate
+
+    async def test_min_rate(self, clock: FakeClock) -> None:
+        "Test the fill rate never drops below the configured minimum."
+        bucket = AdaptiveTokenBucket(monotonic=clock)
+        bucket.update(throttled=True)
+        assert bucket.fill_rate == 0.5
+
+    async def test_acquire_waits_for_tokens(self, clock: FakeClock) -> None:
+        "Test acquire waits once the bucket is enabled and out of tokens."
+        bucket = throttled_bucket(clock)
+        start = clock.now
+        with patch("awsync.ratelimit.asyncio.sleep", clock.sleep):
+            waits = [await bucket.acquire() for _ in range(5)]
+        assert waits[0] == pytest.approx(1 / bucket.fill_rate)
+        assert all(wait == pytest.approx(1 / bucket.fill_rate) for wait in waits)
+        assert clock.now - start == pytest.approx(5 / bucket.fill_rate)
+        assert len(clock.sleeps) == 5
+
+    async def test_success_ramps_up(self, clock: FakeClock) -> None:
+        "Test successful responses ramp the fill rate back up after throttling."
+        bucket = throttled_bucket(clock)
+        throttled_rate = bucket.fill_rate
+        for _ in range(100):
+            clock.now += 0.1
+            bucket.update(throttled=False)
+        assert bucket.fill_rate > throttled_rate
+
+
+class TestAdaptiveRateLimiter:
+    "Test AdaptiveRateLimiter class."
+
+    def test_bucket(self) -> None:
+        "Test buckets are shared per service and region."
+        limiter = AdaptiveRateLimiter()
+        bucket = limiter.bucket("cloudformation", "us-east-1")
+        assert limiter.bucket("cloudformation", "us-east-1") is bucket
+        assert limiter.bucket("cloudformation", "us-east-2") is not bucket
+        assert limiter.bucket("lambda", "us-east-1") is not bucket
+        assert len(limiter.buckets) == 3
@@ -0,0 +1,70 @@
+"Test retry module."
+from unittest.mock import Mock
+
+from awsync import retry
+
+
+class TestBackoff:
+    "Test backoff strategies."
+
+    def test_exponential_backoff(self) -> None:
+        "Test ExponentialBackoff doubles each attempt up to the cap."
+        backoff = retry.ExponentialBackoff(base=1.0, cap=10.0)
+        assert [backoff.delay(attempt, 0) for attempt in range(1, 5)] == [
+            2.0,
+            4.0,
+            8.0,
+            10.0,
+        ]
+
+    def test_full_jitter_backoff(self) -> None:
+        "Test FullJitterBackoff picks a random delay between 0 and the capped exponential delay."
+        uniform = Mock(return_value=1.5)
+        backoff = retry.FullJitterBackoff(base=1.0, cap=10.0, uniform=uniform)
+        assert backoff.delay(2, 0) == 1.5
+        uniform.assert_called_once_with(0, 4.0)
+        backoff.delay(10, 0)
+        uniform.assert_called_with(0, 10.0)
+
+    def test_full_jitter_backoff_default_random(self) -> None:
+        "Test FullJitterBackoff delays are within bounds with the default random source."
+        backoff = retry.FullJitterBackoff(base=1.0, cap=10.0)
+        assert all(0 <= backoff.delay(3, 0) <= 8.0 for _ in range(100))
+
+    def test_decorrelated_jitter_backoff(self) -> None:
+        "Test DecorrelatedJitterBackoff picks a random delay between base and 3 times the previous delay."
+        uniform = Mock(return_value=5.0)
+        backoff = retry.DecorrelatedJitterBackoff(base=1.0, cap=4.0, uniform=uniform)
+        assert backoff.delay(1, 0) == 4.0
+        uniform.assert_called_once_with(1.0, 1.0)
+        backoff.delay(2, 2.0)
+        uniform.assert_called_with(1.0, 6.0)
+
+
+class TestRetryBudget:
+    "Test RetryBudget class."
+
+    def test_acquire(self) -> None:
+        "Test retries spend tokens until the budget is exhausted."
+        budget = retry.RetryBudget(capacity=10, retry_cost=5)
+        assert budget.acquire()
+        assert budget.acquire()
+        assert not budget.acquire()
+        assert budget.tokens == 0
+        assert budget.retries == 2
+        assert budget.tokens_spent == 10
+        assert budget.rejected == 1
+
+    def test_release(self) -> None:
+        "Test successful requests refund the final retry or success_refund, up to capacity."
+        budget = retry.RetryBudget(capacity=20, retry_cost=5, success_refund=1)
+        budget.acquire()
+        budget.acquire()
+        budget.acquire()
+        budget.release(retries=3)
+        assert budget.tokens == 10
+        budget.release(retries=0)
+        assert budget.tokens == 11
+        budget.release(retries=1)
+        budget.release(retries=1)
+        assert budget.tokens == 20
@@ -0,0 +1,93 @@
+"Test singleflight module."
+import asyncio
+from typing import List
+
+import pytest
+
+from awsync.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+class TestSingleFlight:
+    "Test SingleFlight class."
+
+    def setup_method(self) -> None:
+        "A single-flight group and a call which waits to be released."
+        self.single_flight = SingleFlight()
+        self.release = asyncio.Event()
+        self.started: List[str] = []
+
+    async def call(self, result: str = "result") -> str:
+        "Record the call and wait for release."
+        self.started.append(result)
+        await self.release.wait()
+        if result == "error":
+            raise ValueError(result)
+        return result
+
+    async def test_shared_result(self) -> None:
+        "Test concurrent calls with the same key share one underlying call."
+        tasks = [
+            asyncio.create_task(self.single_flight.do("key", self.call))
+            for _ in range(3)
+        ]
+        other = asyncio.create_task(
+            self.single_flight.do("other", lambda: self.call("other"))
+        )
+        await asyncio.sleep(0)
+        assert len(self.single_flight) == 2
+        self.release.set()
+        assert await asyncio.gather(*tasks, other) == [
+            "result",
+            "result",
+            "result",
+            "other",
+        ]
+        assert self.started == ["result", "other"]
+        assert (self.single_flight.calls, self.single_flight.shared) == (2, 2)
+        assert len(self.single_flight) == 0
+
+    async def test_sequential(self) -> None:
+        "Test completed calls are not shared."
+        self.release.set()
+        assert await self.single_flight.do("key", self.call) == "result"
+        assert await self.single_flight.do("key", self.call) == "result"
+        assert self.single_flight.calls == 2
+
+    async def test_shared_exception(self) -> None:
+        "Test an exception is raised to every caller."
+        tasks = [
+            asyncio.create_task(
+                self.single_flight.do("key", lambda: self.call("error"))
+            )
+            for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+        self.release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert [str(result) for result in results] == ["error", "error"]
+        assert isinstance(results[0], ValueError)
+
+    async def test_cancel_waiter(self) -> None:
+        "Test cancelling one caller does not cancel the call shared with another."
+        first = asyncio.create_task(self.single_flight.do("key", self.call))
+        second = asyncio.create_task(self.single_flight.do("key", self.call))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        self.release.set()
+        assert await second == "result"
+        assert self.started == ["result"]
+
+    async def test_cancel_every_waiter(self) -> None:
+        "Test the call is cancelled once every caller is cancelled, and not shared afterwards."
+        first = asyncio.create_task(self.single_flight.do("key", self.call))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert len(self.single_flight) == 0
+        self.release.set()
+        assert await self.single_flight.do("key", self.call) == "result"
+        assert self.single_flight.calls == 2
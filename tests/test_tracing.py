@@ -0,0 +1,100 @@
+"Test tracing module."
+from typing import List
+from unittest.mock import patch
+
+import pytest
+
+from awsync.tracing import Phase, Span, TraceContext, TraceEvent, combine, span
+
+
+def trace_context(events: List[TraceEvent]) -> TraceContext:
+    "A trace context appending events to a list."
+    return TraceContext(
+        tracer=events.append,
+        operation="ListStackResources",
+        service="cloudformation",
+        region="us-east-1",
+    )
+
+
+class TestTraceContext:
+    "Test TraceContext class."
+
+    def test_span(self) -> None:
+        "Test a span emits the phase timing, status and request ID when it ends."
+        events: List[TraceEvent] = []
+        with patch("awsync.tracing.time") as time_mock:
+            time_mock.time.return_value = 1000.0
+            time_mock.perf_counter.side_effect = [5.0, 5.25]
+            with trace_context(events).span(Phase.send, attempt=1) as send_span:
+                send_span.status = 200
+                send_span.request_id = "request-id"
+        assert events == [
+            TraceEvent(
+                phase=Phase.send,
+                operation="ListStackResources",
+                service="cloudformation",
+                region="us-east-1",
+                start_time=1000.0,
+                duration=0.25,
+                attempt=1,
+                status=200,
+                request_id="request-id",
+            )
+        ]
+        assert events[0].end_time == 1000.25
+
+    def test_span_error(self) -> None:
+        "Test a span records the exception raised and re-raises it."
+        events: List[TraceEvent] = []
+        error = ValueError("Mock error.")
+        with pytest.raises(ValueError):
+            with trace_context(events).span(Phase.parse):
+                raise error
+        assert [(event.phase, event.error) for event in events] == [
+            (Phase.parse, error)
+        ]
+
+    def test_span_disabled(self) -> None:
+        "Test span without a trace context does not emit."
+        with span(None, Phase.sign) as sign_span:
+            assert isinstance(sign_span, Span)
+
+    @pytest.mark.asyncio
+    async def test_httpx_extensions(self) -> None:
+        "Test a connect phase is emitted from httpcore trace events when a connection is opened."
+        events: List[TraceEvent] = []
+        trace = trace_context(events).httpx_extensions(attempt=2)["trace"]
+        # A pooled connection is reused, no connect phase.
+        await trace("http11.send_request_headers.started", {})
+        assert events == []
+        await trace("connection.connect_tcp.started", {})
+        await trace("connection.connect_tcp.complete", {})
+        await trace("connection.start_tls.started", {})
+        await trace("connection.start_tls.complete", {})
+        await trace("http11.send_request_headers.started", {})
+        error = OSError("Mock error.")
+        await trace("connection.connect_tcp.started", {})
+        await trace("connection.connect_tcp.failed", {"exception": error})
+        assert [(event.phase, event.attempt, event.error) for event in events] == [
+            (Phase.connect, 2, None),
+            (Phase.connect, 2, error),
+        ]
+
+
+def test_combine() -> None:
+    "Test combine calls each tracer in order."
+    first: List[TraceEvent] = []
+    second: List[TraceEvent] = []
+    with trace_context([]).span(Phase.sign):
+        pass
+    context = TraceContext(
+        tracer=combine(first.append, second.append),
+        operation="Invoke",
+        service="lambda",
+        region="us-east-1",
+    )
+    with context.span(Phase.sign):
+        pass
+    assert len(first) == len(second) == 1
+    assert first == second